@@ -0,0 +1,281 @@
+"""
+AutoHomography.py – Arena homography from the detected border, kept up to date while running.
+
+``Homography.create_homography`` needs four clicks and the result is frozen in
+``homography.npy``; when the phone camera is bumped every coordinate silently shifts.
+Here the arena border is found with ``RobotAreaRecognition.detect_rectangles`` (the
+largest quadrilateral in view), each side is refitted to its edge pixels for sub-pixel
+corners, and H maps them onto the arena like the clicked points did.
+
+:class:`ArenaMonitor` keeps H valid during a run: every *check_every* frames it looks for
+the four corners in small windows around where they were (template matching, no full-frame
+work), and only when one has moved more than *tolerance_px* does it detect the border
+again and recompute H.
+
+```python
+monitor = ArenaMonitor(first_frame)           # raises RuntimeError if no arena is in view
+for frame in frames:
+    H = monitor.update(frame)                 # cheap; H changes only after real drift
+```
+
+or ``python src/ImageRecognition/AutoHomography.py --video-src 1 --save homography.npy``.
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from math import hypot
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ImageRecognition.RobotAreaRecognition import detect_rectangles
+
+__all__ = [
+    "ARENA_SIZE",
+    "order_corners",
+    "detect_arena_corners",
+    "homography_from_corners",
+    "auto_homography",
+    "ArenaMonitor",
+]
+
+ARENA_SIZE = (1200, 1800)   # (w, h) of the warped arena, as TRANSFORM_W, TRANSFORM_H in main.py
+MIN_AREA_FRACTION = 0.15    # the border encloses at least this much of the frame
+EDGE_BAND_PX = 2.0          # edge pixels this close to a side are used to refit it
+END_TRIM = 0.1              # ... except this fraction at each end (corners blur)
+MAX_REFINE_PX = 5.0         # a refitted corner further than this from the polygon is ignored
+MIN_MATCH = 0.6             # normalised correlation below this: corner not found in its ROI
+
+
+def order_corners(points) -> np.ndarray:
+    """Four points as float32 TL, TR, BR, BL (the click order of create_homography)."""
+    pts = np.asarray(points, dtype=np.float32).reshape(4, 2)
+    s, d = pts.sum(axis=1), pts[:, 1] - pts[:, 0]
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)],
+                     pts[np.argmax(d)]], dtype=np.float32)
+
+
+def _edges(frame: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)    # as detect_rectangles
+
+
+def _fit_side(edge_xy: np.ndarray, p: np.ndarray, q: np.ndarray):
+    """``(point, direction)`` of the line through the edge pixels along side p→q, or None."""
+    length = float(np.linalg.norm(q - p))
+    u = (q - p) / length
+    rel = edge_xy - p
+    along = rel @ u
+    across = rel @ np.array([-u[1], u[0]])
+    near = ((np.abs(across) <= EDGE_BAND_PX) & (along > END_TRIM * length)
+            & (along < (1 - END_TRIM) * length))
+    if np.count_nonzero(near) < 10:
+        return None
+    vx, vy, x0, y0 = cv2.fitLine(edge_xy[near], cv2.DIST_HUBER, 0, 0.01, 0.01).ravel()
+    return np.array([x0, y0]), np.array([vx, vy])
+
+
+def _intersect(a, b) -> Optional[np.ndarray]:
+    (p, u), (q, v) = a, b
+    m = np.array([u, -v]).T
+    if abs(np.linalg.det(m)) < 1e-6:
+        return None
+    t = np.linalg.solve(m, q - p)[0]
+    return p + t * u
+
+
+def detect_arena_corners(frame: np.ndarray, *,
+                         min_area_fraction: float = MIN_AREA_FRACTION) -> Optional[np.ndarray]:
+    """Sub-pixel TL, TR, BR, BL corners of the arena border in *frame*, or None."""
+    h, w = frame.shape[:2]
+    quads = [q for q in detect_rectangles(frame)
+             if cv2.contourArea(q) >= min_area_fraction * w * h]
+    if not quads:
+        return None
+    corners = order_corners(max(quads, key=cv2.contourArea))
+    ys, xs = np.nonzero(_edges(frame))
+    edge_xy = np.column_stack([xs, ys]).astype(np.float32)
+    sides = [_fit_side(edge_xy, corners[i], corners[(i + 1) % 4]) for i in range(4)]
+    refined = corners.copy()
+    for i in range(4):
+        if sides[i - 1] is None or sides[i] is None:
+            continue
+        p = _intersect(sides[i - 1], sides[i])
+        if p is not None and hypot(*(p - corners[i])) <= MAX_REFINE_PX:
+            refined[i] = p
+    return refined
+
+
+def homography_from_corners(corners, dst_size: Tuple[int, int] = ARENA_SIZE) -> np.ndarray:
+    """H taking TL, TR, BR, BL to (0,0), (w,0), (w,h), (0,h), like create_homography."""
+    w, h = dst_size
+    dst = np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float32)
+    return cv2.getPerspectiveTransform(np.asarray(corners, dtype=np.float32), dst)
+
+
+def auto_homography(frame: np.ndarray, dst_size: Tuple[int, int] = ARENA_SIZE) -> np.ndarray:
+    """Homography from the arena border in *frame*; raises RuntimeError if none is found."""
+    corners = detect_arena_corners(frame)
+    if corners is None:
+        raise RuntimeError("arena border not found")
+    return homography_from_corners(corners, dst_size)
+
+
+class ArenaMonitor:
+    """Keeps a homography in step with the camera (see module docstring).
+
+    Each check matches a (2·*roi_px*+1)² patch saved around every corner inside a window
+    *search_px* larger, so a check costs four tiny correlations.  :attr:`generation`
+    goes up whenever H is recomputed.
+    """
+
+    def __init__(self, frame: np.ndarray, *, corners=None,
+                 dst_size: Tuple[int, int] = ARENA_SIZE, check_every: int = 30,
+                 roi_px: int = 16, search_px: int = 24, tolerance_px: float = 2.0):
+        self.dst_size = dst_size
+        self.check_every = check_every
+        self.roi_px = roi_px
+        self.search_px = search_px
+        self.tolerance_px = tolerance_px
+        self.frames = 0
+        self.checks = 0
+        self.generation = 0
+        self.drift_px = 0.0             # largest corner movement at the last check
+        if corners is None:
+            corners = detect_arena_corners(frame)
+            if corners is None:
+                raise RuntimeError("arena border not found")
+        self._reset(frame, np.asarray(corners, dtype=np.float32))
+
+    def _reset(self, frame: np.ndarray, corners: np.ndarray) -> None:
+        self.corners = corners
+        self.H = homography_from_corners(corners, self.dst_size)
+        self._templates: List[Tuple[int, int, np.ndarray]] = []
+        for x, y in corners:
+            x0, y0, x1, y1 = self._window(frame, x, y, self.roi_px)
+            self._templates.append((x0, y0, _gray(frame[y0:y1, x0:x1])))
+
+    @staticmethod
+    def _window(frame: np.ndarray, x: float, y: float, r: int):
+        h, w = frame.shape[:2]
+        cx, cy = int(round(x)), int(round(y))
+        return max(0, cx - r), max(0, cy - r), min(w, cx + r + 1), min(h, cy + r + 1)
+
+    def _match(self, frame: np.ndarray, i: int) -> Optional[np.ndarray]:
+        """How far corner *i* moved (sub-pixel), or None if it is not in its window."""
+        tx, ty, template = self._templates[i]
+        th, tw = template.shape
+        s = self.search_px
+        h, w = frame.shape[:2]
+        x0, y0 = max(0, tx - s), max(0, ty - s)
+        x1, y1 = min(w, tx + tw + s), min(h, ty + th + s)
+        if x1 - x0 < tw or y1 - y0 < th:
+            return None
+        score = cv2.matchTemplate(_gray(frame[y0:y1, x0:x1]), template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(score)
+        if best < MIN_MATCH:
+            return None
+        return np.array([x0 + bx + _peak(score[by, bx - 1:bx + 2]) - tx,
+                         y0 + by + _peak(score[by - 1:by + 2, bx]) - ty])
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """Count *frame*, check the corners every *check_every* frames, return H."""
+        self.frames += 1
+        if self.frames % self.check_every == 0:
+            self.check(frame)
+        return self.H
+
+    def check(self, frame: np.ndarray) -> float:
+        """Measure corner drift now and recompute H if it exceeds the tolerance.
+
+        A corner that is not found in its window, or whose shift disagrees with the
+        others' (the robot or a hand over it matched something else), counts as covered
+        and is no reason to touch H.  When the visible corners moved, the border is
+        detected again and used only if it agrees with where they went; otherwise, if all
+        four were visible, they are moved by the measured shifts, and with a corner
+        covered H is kept.  With every corner lost the camera moved past the windows, and
+        any detected border is taken.
+        """
+        self.checks += 1
+        shifts = [self._match(frame, i) for i in range(4)]
+        found = [d for d in shifts if d is not None]
+        if found:
+            typical = np.median(found, axis=0)
+            limit = max(self.tolerance_px, 0.5 * hypot(*typical))
+            shifts = [d if d is not None and hypot(*(d - typical)) <= limit else None
+                      for d in shifts]
+        seen = [i for i in range(4) if shifts[i] is not None]
+        self.drift_px = max((hypot(*shifts[i]) for i in seen), default=float("inf"))
+        if self.drift_px <= self.tolerance_px:
+            return self.drift_px
+        moved = self.corners + np.array([shifts[i] if shifts[i] is not None else (0, 0)
+                                         for i in range(4)], dtype=np.float32)
+        corners = detect_arena_corners(frame)
+        if corners is not None and any(hypot(*(corners[i] - moved[i])) > self.tolerance_px
+                                       for i in seen):
+            corners = None                        # e.g. a partly covered border
+        if corners is None and len(seen) == 4:
+            corners = moved
+        if corners is not None:
+            self._reset(frame, corners)
+            self.generation += 1
+        return self.drift_px
+
+
+def _gray(img: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+def _peak(v: np.ndarray) -> float:
+    """Sub-sample offset of the maximum of three samples (parabola), 0 at the border."""
+    if len(v) != 3:
+        return 0.0
+    denom = v[0] - 2 * v[1] + v[2]
+    return float(0.5 * (v[0] - v[2]) / denom) if denom < 0 else 0.0
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Arena homography from the detected border")
+    parser.add_argument("--video-src", type=int, default=1)
+    parser.add_argument("--save", default="homography.npy", help="where to write H")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep checking the corners and re-save H when the camera moves")
+    parser.add_argument("--check-every", type=int, default=30)
+    parser.add_argument("--tolerance", type=float, default=2.0, help="corner drift in pixels")
+    args = parser.parse_args(argv)
+
+    from ImageRecognition.Homography import save_homography
+
+    cap = cv2.VideoCapture(args.video_src)
+    try:
+        ok, frame = cap.read()
+        if not ok:
+            raise SystemExit("Could not read a frame")
+        monitor = ArenaMonitor(frame, check_every=args.check_every,
+                               tolerance_px=args.tolerance)
+        frame_size = (frame.shape[1], frame.shape[0])
+        save_homography(monitor.H, args.save, frame_size)
+        generation = 0
+        while args.watch:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            monitor.update(frame)
+            if monitor.generation != generation:
+                generation = monitor.generation
+                print("Camera moved {:.1f} px".format(monitor.drift_px))
+                save_homography(monitor.H, args.save, frame_size)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 
 def detect_red_cross(image_path, show=True):
     """
@@ -71,6 +70,8 @@ def detect_red_cross(image_path, show=True):
     cx, cy          = centroids[best_idx]
 
     if show:
+        import matplotlib.pyplot as plt  # only for the preview window
+
         out = img.copy()
         cv2.rectangle(out, (x, y), (x + bw, y + bh), (0, 255, 0), 4)
         cv2.drawMarker(out, (int(cx), int(cy)), (255, 0, 0),
@@ -85,6 +86,7 @@ def detect_red_cross(image_path, show=True):
     return (int(x), int(y), int(bw), int(bh)), (int(cx), int(cy))
 
 # --- demo on the provided image -------------------------------------------
-bbox, centre = detect_red_cross("/mnt/data/test_image0.jpg")
-print("Bounding‐box:", bbox)
-print("Center:", centre)
\ No newline at end of file
+if __name__ == "__main__":
+    bbox, centre = detect_red_cross("/mnt/data/test_image0.jpg")
+    print("Bounding‐box:", bbox)
+    print("Center:", centre)
\ No newline at end of file
@@ -1,3 +1,5 @@
+import json
+
 import cv2
 import numpy as np
 from pathlib import Path
@@ -68,18 +70,27 @@ def create_homography(img_path: str | Path,
 
 
 # ───────────────────────────────────────── save ──
-def save_homography(H: np.ndarray, filename: str | Path) -> None:
+def save_homography(H: np.ndarray, filename: str | Path,
+                    frame_size: tuple[int, int] | None = None) -> None:
     """
     Save a 3×3 homography.  Extension decides the format:
 
     • *.npy*  – NumPy np.save / np.load  (default, loss-less)
     • *.txt*  – plain text via np.savetxt   (human-readable)
+
+    *frame_size* (w, h) of the image H was made on goes into ``<name>.size.json`` next to
+    it (see *load_homography_size*); without it an old size file is removed.
     """
     filename = Path(filename)
     if filename.suffix.lower() == ".txt":
         np.savetxt(filename, H, fmt="%.8f")
     else:                      # fall back to NumPy binary
         np.save(filename, H)
+    size_file = homography_size_file(filename)
+    if frame_size is not None:
+        size_file.write_text(json.dumps({"frame_size": [int(v) for v in frame_size]}))
+    elif size_file.exists():
+        size_file.unlink()     # it described the previous H
     print(f"Saved H → {filename}")
 
 
@@ -97,4 +108,20 @@ def load_homography(filename: str | Path) -> np.ndarray:
         H = np.load(filename)
     if H.shape != (3, 3):
         raise ValueError("File does not contain a 3×3 homography.")
-    return H
\ No newline at end of file
+    return H
+
+
+def homography_size_file(filename: str | Path) -> Path:
+    """Where *save_homography* records the frame size of *filename*."""
+    return Path(filename).with_suffix(".size.json")
+
+
+def load_homography_size(filename: str | Path) -> tuple[int, int] | None:
+    """
+    Frame size (w, h) the homography in *filename* was made on, or None if not recorded.
+    """
+    try:
+        w, h = json.loads(homography_size_file(filename).read_text())["frame_size"]
+    except FileNotFoundError:
+        return None
+    return int(w), int(h)
\ No newline at end of file
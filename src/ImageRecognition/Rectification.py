@@ -0,0 +1,289 @@
+"""
+Rectification.py – Lens undistortion and the arena homography in one remap, cached on disk.
+
+The phone's wide lens bends the arena edges, so an H from four corners is only right near
+the middle of the frame.  ``cv2.undistort`` followed by ``cv2.warpPerspective`` would fix
+that at the cost of two full-frame passes; here both are composed into one lookup table –
+for every arena pixel, where to sample the raw frame – and a frame is rectified with a
+single ``cv2.remap``.
+
+The table is built once per camera resolution and stored next to ``homography.npy`` as
+plain ``.npy`` files (fixed-point maps, 6 bytes per arena pixel) that
+:func:`load_rectification` memory-maps, so start-up does not pay for a rebuild.  The cache
+records a digest of the homography and lens files it was built from; after a re-click or
+an ``AutoHomography`` re-save it is stale and loading returns None instead of a wrong map.
+
+The lens file and ``homography.size.json`` record the resolution they were made at.  For
+another resolution of the same sensor (same aspect ratio) K and H are scaled to it; a
+different aspect ratio means an unknown crop, and building raises ValueError.
+
+```python
+K, dist, rms = calibrate_lens(chessboard_frames)              # once per phone
+save_lens("lens.npz", K, dist, (1920, 1080))
+build_rectification("homography.npy", (1920, 1080), "lens.npz")  # once per resolution
+
+rect = load_rectification("homography.npy", (1920, 1080), "lens.npz")
+arena = rect.apply(frame)                   # 1200×1800 arena image, one pass
+points_mm = rect.transform_points(detections)
+```
+
+or ``python src/ImageRecognition/Rectification.py --size 1920x1080 --lens lens.npz``.
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ImageRecognition.AutoHomography import ARENA_SIZE, homography_from_corners
+
+__all__ = [
+    "Rectification",
+    "calibrate_lens",
+    "save_lens",
+    "load_lens",
+    "undistorted_homography",
+    "rectification_maps",
+    "build_rectification",
+    "load_rectification",
+]
+
+CACHE_PREFIX = "rectify"
+_SUBPIX = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+
+
+# ───────────────────────────────────────── lens ──
+def calibrate_lens(frames: Iterable[np.ndarray], board: Tuple[int, int] = (9, 6),
+                   square: float = 1.0) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Camera matrix, distortion coefficients and RMS error (px) from chessboard frames.
+
+    *board* counts the inner corners.  Needs the board in at least three frames; raises
+    RuntimeError otherwise.
+    """
+    objp = np.zeros((board[0] * board[1], 3), np.float32)
+    objp[:, :2] = np.mgrid[0:board[0], 0:board[1]].T.reshape(-1, 2) * square
+    obj_pts, img_pts, size = [], [], None
+    for frame in frames:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        size = gray.shape[::-1]
+        found, corners = cv2.findChessboardCorners(gray, board)
+        if not found:
+            continue
+        obj_pts.append(objp)
+        img_pts.append(cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), _SUBPIX))
+    if len(img_pts) < 3:
+        raise RuntimeError(f"chessboard found in {len(img_pts)} frames, need at least 3")
+    rms, K, dist, _, _ = cv2.calibrateCamera(obj_pts, img_pts, size, None, None)
+    return K, dist.ravel(), rms
+
+
+def save_lens(filename: str | Path, K: np.ndarray, dist: np.ndarray,
+              frame_size: Tuple[int, int]) -> None:
+    """Store a lens model with the resolution (w, h) of the frames it was calibrated on."""
+    np.savez(filename, K=K, dist=np.asarray(dist).ravel(), frame_size=np.int32(frame_size))
+
+
+def load_lens(filename: str | Path) -> Tuple[np.ndarray, np.ndarray, Optional[Tuple[int, int]]]:
+    """``(K, dist, frame_size)``; frame_size is None for files saved before it was recorded."""
+    with np.load(filename) as data:
+        size = tuple(int(v) for v in data["frame_size"]) if "frame_size" in data else None
+        return data["K"], data["dist"], size
+
+
+def _rescale(from_size: Optional[Tuple[int, int]], to_size: Tuple[int, int],
+             what: str) -> np.ndarray:
+    """Pixel scaling S (3×3) from a calibration resolution to *to_size*.
+
+    Unrecorded sizes are taken to be *to_size*.  Raises ValueError when the aspect ratio
+    differs: the other resolution is then a crop, not a scaling.
+    """
+    if from_size is None or tuple(from_size) == tuple(to_size):
+        return np.eye(3)
+    (w0, h0), (w1, h1) = from_size, to_size
+    sx, sy = w1 / w0, h1 / h0
+    if abs(sx - sy) > 0.01 * max(sx, sy):
+        raise ValueError(f"{what} was calibrated at {w0}x{h0}; {w1}x{h1} has another "
+                         f"aspect ratio, calibrate it at that resolution")
+    return np.diag([sx, sy, 1.0])
+
+
+# ───────────────────────────────────────── maps ──
+def _dst_corners(dst_size: Tuple[int, int]) -> np.ndarray:
+    w, h = dst_size
+    return np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float32)
+
+
+def undistorted_homography(H: np.ndarray, K: np.ndarray, dist: np.ndarray,
+                           dst_size: Tuple[int, int] = ARENA_SIZE) -> np.ndarray:
+    """Re-base *H* (raw frame pixels → arena, e.g. clicked) onto undistorted pixels.
+
+    The four corners H was made from are recovered, undistorted and mapped again.
+    """
+    corners = cv2.perspectiveTransform(_dst_corners(dst_size).reshape(-1, 1, 2),
+                                       np.linalg.inv(H))
+    undistorted = cv2.undistortPoints(corners, K, dist, P=K)
+    return homography_from_corners(undistorted.reshape(4, 2), dst_size)
+
+
+def rectification_maps(H: np.ndarray, K: np.ndarray, dist: np.ndarray,
+                       dst_size: Tuple[int, int] = ARENA_SIZE):
+    """``(map1, map2)`` for ``cv2.remap``: raw frame → arena, lens and H in one step.
+
+    Every arena pixel goes back through H (on undistorted pixels) and then forward through
+    the lens model to the raw pixel it comes from.  Maps are fixed point (``CV_16SC2``).
+    """
+    w, h = dst_size
+    Hu = undistorted_homography(H, K, dist, dst_size)
+    grid = np.mgrid[0:h, 0:w][::-1].astype(np.float32)          # x, y planes
+    pix = cv2.perspectiveTransform(grid.reshape(2, -1).T.reshape(-1, 1, 2), np.linalg.inv(Hu))
+    rays = cv2.convertPointsToHomogeneous(
+        cv2.perspectiveTransform(pix, np.linalg.inv(K)))         # z = 1 camera rays
+    zero = np.zeros(3)
+    raw, _ = cv2.projectPoints(rays.astype(np.float64), zero, zero, K, dist)
+    return cv2.convertMaps(raw.reshape(h, w, 2).astype(np.float32), None, cv2.CV_16SC2)
+
+
+# ───────────────────────────────────────── cache ──
+class Rectification:
+    """Rectifies raw frames of one resolution into the arena (see module docstring)."""
+
+    def __init__(self, map1: np.ndarray, map2: np.ndarray, frame_size: Tuple[int, int],
+                 H_undistorted: np.ndarray, K: np.ndarray, dist: np.ndarray):
+        self.map1 = map1
+        self.map2 = map2
+        self.frame_size = tuple(frame_size)
+        self.H_undistorted = H_undistorted
+        self.K = K
+        self.dist = dist
+
+    @property
+    def dst_size(self) -> Tuple[int, int]:
+        return self.map1.shape[1], self.map1.shape[0]
+
+    def apply(self, frame: np.ndarray, out: Optional[np.ndarray] = None, *,
+              interpolation: int = cv2.INTER_LINEAR) -> np.ndarray:
+        """The arena image of raw *frame*; pass *out* to reuse a buffer across frames."""
+        if (frame.shape[1], frame.shape[0]) != self.frame_size:
+            raise ValueError(f"frame is {frame.shape[1]}x{frame.shape[0]}, "
+                             f"maps are for {self.frame_size[0]}x{self.frame_size[1]}")
+        return cv2.remap(frame, self.map1, self.map2, interpolation, dst=out)
+
+    def transform_points(self, points: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """Raw frame points (e.g. detections) → N×2 arena coordinates."""
+        pts = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+        undistorted = cv2.undistortPoints(pts, self.K, self.dist, P=self.K)
+        return cv2.perspectiveTransform(undistorted, self.H_undistorted).reshape(-1, 2)
+
+
+def _cache_stem(homography_file: str | Path, frame_size: Tuple[int, int]) -> Path:
+    w, h = frame_size
+    return Path(homography_file).parent / f"{CACHE_PREFIX}_{w}x{h}"
+
+
+def _digest(homography_file: str | Path, lens_file: Optional[str | Path],
+            dst_size: Tuple[int, int]) -> str:
+    from ImageRecognition.Homography import homography_size_file
+
+    sha = hashlib.sha1(Path(homography_file).read_bytes())
+    size_file = homography_size_file(homography_file)
+    if size_file.exists():
+        sha.update(size_file.read_bytes())
+    if lens_file is not None:
+        sha.update(Path(lens_file).read_bytes())
+    sha.update(repr(tuple(dst_size)).encode())
+    return sha.hexdigest()
+
+
+def build_rectification(homography_file: str | Path, frame_size: Tuple[int, int],
+                        lens_file: Optional[str | Path] = None, *,
+                        dst_size: Tuple[int, int] = ARENA_SIZE) -> Rectification:
+    """Compute the maps for *frame_size* (w, h) and store them next to *homography_file*.
+
+    Without *lens_file* the lens is taken to be distortion-free (then the remap is exactly
+    ``warpPerspective`` with H, in the same single pass).  H and the lens are scaled from
+    the resolution they were made at (ValueError if that is not a plain scaling).
+    """
+    from ImageRecognition.Homography import load_homography, load_homography_size
+
+    S = _rescale(load_homography_size(homography_file), frame_size, "the homography")
+    H = load_homography(homography_file) @ np.linalg.inv(S)
+    if lens_file is None:
+        K, dist = np.eye(3), np.zeros(5)
+    else:
+        K, dist, lens_size = load_lens(lens_file)
+        K = _rescale(lens_size, frame_size, "the lens") @ K
+    map1, map2 = rectification_maps(H, K, dist, dst_size)
+    stem = _cache_stem(homography_file, frame_size)
+    np.save(f"{stem}_xy.npy", map1)
+    np.save(f"{stem}_frac.npy", map2)
+    meta = {"frame_size": list(frame_size), "dst_size": list(dst_size),
+            "digest": _digest(homography_file, lens_file, dst_size),
+            "H_undistorted": undistorted_homography(H, K, dist, dst_size).tolist(),
+            "K": np.asarray(K).tolist(), "dist": np.asarray(dist).ravel().tolist()}
+    with open(f"{stem}.json", "w", encoding="utf8") as f:
+        json.dump(meta, f, indent=2)
+    return load_rectification(homography_file, frame_size, lens_file, dst_size=dst_size)
+
+
+def load_rectification(homography_file: str | Path, frame_size: Tuple[int, int],
+                       lens_file: Optional[str | Path] = None, *,
+                       dst_size: Tuple[int, int] = ARENA_SIZE) -> Optional[Rectification]:
+    """The cached maps for *frame_size*, memory-mapped; None if missing or stale."""
+    stem = _cache_stem(homography_file, frame_size)
+    try:
+        with open(f"{stem}.json", "r", encoding="utf8") as f:
+            meta = json.load(f)
+        if meta["digest"] != _digest(homography_file, lens_file, dst_size):
+            return None
+        map1 = np.load(f"{stem}_xy.npy", mmap_mode="r")
+        map2 = np.load(f"{stem}_frac.npy", mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    return Rectification(map1, map2, frame_size, np.array(meta["H_undistorted"]),
+                         np.array(meta["K"]), np.array(meta["dist"]))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build the lens + homography remap cache")
+    parser.add_argument("--homography", default="homography.npy")
+    parser.add_argument("--lens", default=None, help="lens.npz from calibrate_lens")
+    parser.add_argument("--size", required=True, help="camera resolution, e.g. 1920x1080")
+    parser.add_argument("--calibrate-lens", type=int, metavar="VIDEO_SRC", default=None,
+                        help="first calibrate the lens from a chessboard on this camera")
+    parser.add_argument("--frames", type=int, default=30, help="frames for lens calibration")
+    args = parser.parse_args(argv)
+    frame_size = tuple(int(v) for v in args.size.lower().split("x"))
+
+    if args.calibrate_lens is not None:
+        cap = cv2.VideoCapture(args.calibrate_lens)
+        frames = []
+        try:
+            while len(frames) < args.frames:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                frames.append(frame)
+        finally:
+            cap.release()
+        K, dist, rms = calibrate_lens(frames)
+        args.lens = args.lens or "lens.npz"
+        save_lens(args.lens, K, dist, (frames[0].shape[1], frames[0].shape[0]))
+        print(f"Lens calibrated, RMS {rms:.2f} px → {args.lens}")
+
+    rect = build_rectification(args.homography, frame_size, args.lens)
+    print(f"Saved {rect.dst_size[0]}x{rect.dst_size[1]} remap for "
+          f"{frame_size[0]}x{frame_size[1]} → {_cache_stem(args.homography, frame_size)}_*.npy")
+
+
+if __name__ == "__main__":
+    main()
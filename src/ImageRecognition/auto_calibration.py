@@ -0,0 +1,361 @@
+"""
+auto_calibration.py – Marker HSV ranges picked automatically from recorded frames.
+
+``track_robot.calibrate_markers`` needs a few clicks per disc and widens the min/max of
+those samples by a fixed margin.  Here a batch of frames with the robot in view (a list,
+a video file or any ``read()``-able capture) does the work instead: the discs are found
+with the current ranges, their core pixels and a subsample of everything else go into
+joint HSV histograms, and each disc gets the HSV box that keeps *recall* of its pixels
+while letting the fewest background pixels through.  Tighter ranges mean fewer spurious
+blobs for the tracker to reject.  Some frames are held out of the histograms so the
+reported scores are not measured on the data the ranges were fitted to.
+
+Hue is circular and the pink disc sits next to the red wall at the wrap, so a box that
+crosses hue 0 comes out as two ranges (the tracker ORs them).
+
+```python
+cal = calibrate_from_frames(cv2.VideoCapture("run.mp4"))
+print(format_report(cal))
+cal.save()                      # marker_hsv.json, used by the tracker from now on
+```
+
+or ``python src/ImageRecognition/auto_calibration.py run.mp4 --save``.
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import itertools
+import json
+from dataclasses import dataclass
+from math import hypot, pi, sqrt
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ImageRecognition import track_robot as tr
+
+__all__ = [
+    "MarkerCalibration",
+    "AutoCalibration",
+    "calibrate_from_frames",
+    "format_report",
+]
+
+H_BIN = 2               # hue units per histogram bin (hue is 0..179)
+SV_BIN = 8              # saturation / value units per bin
+CORE_FRACTION = 0.7     # disc pixels: within this fraction of the radius (no edge blend)
+CLEAR_FRACTION = 1.6    # background: farther than this many radii from both discs
+BG_STRIDE = 2           # background is subsampled every BG_STRIDE pixels in x and y
+MARGIN_BINS = (2, 2, 2) # free widening per side (H, S, V) while no background is added
+UNSEEN_PRIOR = 0.01     # colours not in the frames: this much background, spread over HSV
+
+_SHAPE = (180 // H_BIN, 256 // SV_BIN, 256 // SV_BIN)
+_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))    # as the tracker
+
+Range = Tuple[np.ndarray, np.ndarray]
+Disc = Tuple[float, float, float]          # x, y, radius (px)
+
+
+@dataclass
+class MarkerCalibration:
+    """Ranges for one disc and how they did on the held-out check frames (seed = before)."""
+
+    ranges: Tuple[Range, ...]
+    recall: float                   # disc core pixels inside the ranges
+    false_positive_rate: float      # background pixels inside the ranges
+    spurious_blobs: float           # marker-like blobs away from the disc, per frame
+    seed_false_positive_rate: float
+    seed_spurious_blobs: float
+
+
+@dataclass
+class AutoCalibration:
+    pink: MarkerCalibration
+    purple: MarkerCalibration
+    frames_used: int                # frames where both discs were found (fit + check)
+    frames_skipped: int
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the ranges in the tracker's JSON format (default: its own file, reloaded)."""
+        data = {name: _ranges_to_json(marker.ranges)
+                for name, marker in (("pink", self.pink), ("purple", self.purple))}
+        with open(path or tr.CALIB_FILE, "w", encoding="utf8") as f:
+            json.dump(data, f, indent=2)
+        if path is None:
+            tr.reload_calibration()
+
+
+def _ranges_to_json(ranges: Sequence[Range]) -> dict:
+    pairs = [{"lo": [int(v) for v in lo], "hi": [int(v) for v in hi]} for lo, hi in ranges]
+    return pairs[0] if len(pairs) == 1 else {"ranges": pairs}
+
+
+# ---------------------------------------------------------------------------
+# Sampling
+# ---------------------------------------------------------------------------
+
+def _iter_frames(source, max_frames: Optional[int]) -> Iterable[np.ndarray]:
+    if hasattr(source, "read"):
+        for _ in itertools.count() if max_frames is None else range(max_frames):
+            ok, frame = source.read()
+            if not ok:
+                return
+            yield frame
+    else:
+        yield from itertools.islice(source, max_frames)
+
+
+def _locate_discs(hsv: np.ndarray, seed, expected_d: Optional[float]):
+    """``(pink, purple)`` discs found with the *seed* ranges, paired as the tracker does."""
+    found = []
+    for ranges in seed:
+        mask = cv2.morphologyEx(tr.colour_mask(hsv, ranges), cv2.MORPH_OPEN, _KERNEL)
+        found.append(tr.find_markers(mask, subpixel=True))
+    exp = expected_d or 0.125 * hsv.shape[1]
+    best, best_score = None, None
+    for p in found[0]:
+        for u in found[1]:
+            d = hypot(p[0] - u[0], p[1] - u[1])
+            if 0.6 * exp <= d <= 1.4 * exp and (best is None or abs(d - exp) < best_score):
+                best, best_score = (p, u), abs(d - exp)
+    if best is None:
+        return None
+    return tuple((x, y, sqrt(area / pi)) for x, y, area in best)
+
+
+def _core(hsv: np.ndarray, disc: Disc) -> np.ndarray:
+    """N×3 HSV pixels within CORE_FRACTION of the disc radius."""
+    x, y, r = disc
+    rc = CORE_FRACTION * r
+    y0, y1 = max(0, int(y - rc)), min(hsv.shape[0], int(y + rc) + 2)
+    x0, x1 = max(0, int(x - rc)), min(hsv.shape[1], int(x + rc) + 2)
+    ys, xs = np.ogrid[y0:y1, x0:x1]
+    inside = (xs - x) ** 2 + (ys - y) ** 2 <= rc * rc
+    return hsv[y0:y1, x0:x1][inside]
+
+
+def _background(hsv: np.ndarray, discs: Sequence[Disc]) -> np.ndarray:
+    """N×3 HSV pixels (subsampled) clear of both discs."""
+    grid = hsv[::BG_STRIDE, ::BG_STRIDE]
+    ys, xs = np.ogrid[:grid.shape[0], :grid.shape[1]]
+    keep = np.ones(grid.shape[:2], dtype=bool)
+    for x, y, r in discs:
+        clear = CLEAR_FRACTION * r
+        keep &= (xs * BG_STRIDE - x) ** 2 + (ys * BG_STRIDE - y) ** 2 > clear * clear
+    return grid[keep]
+
+
+def _samples(hsv: np.ndarray, discs: Sequence[Disc], i: int):
+    """Disc *i*'s core pixels and its background (which includes the other disc)."""
+    return _core(hsv, discs[i]), np.concatenate([_background(hsv, discs),
+                                                 _core(hsv, discs[1 - i])])
+
+
+def _circular_hue_mean(pixels: np.ndarray) -> float:
+    a = pixels[:, 0].astype(np.float64) * (2 * pi / 180)
+    return float(np.degrees(np.arctan2(np.sin(a).mean(), np.cos(a).mean())) / 2 % 180)
+
+
+def _histogram(pixels: np.ndarray, shift: int) -> np.ndarray:
+    """Joint HSV histogram of *pixels* with hue rotated by *shift*."""
+    p = pixels.astype(np.int64)
+    h = (p[:, 0] + shift) % 180 // H_BIN
+    idx = (h * _SHAPE[1] + p[:, 1] // SV_BIN) * _SHAPE[2] + p[:, 2] // SV_BIN
+    return np.bincount(idx, minlength=_SHAPE[0] * _SHAPE[1] * _SHAPE[2]).reshape(_SHAPE)
+
+
+# ---------------------------------------------------------------------------
+# Range search
+# ---------------------------------------------------------------------------
+
+def _count(hist: np.ndarray, box) -> int:
+    return int(hist[box[0][0]:box[0][1], box[1][0]:box[1][1], box[2][0]:box[2][1]].sum())
+
+
+def _project(hist: np.ndarray, box, axis: int) -> np.ndarray:
+    """Counts along *axis* inside the box's extent on the other two axes."""
+    sl = [slice(lo, hi) for lo, hi in box]
+    sl[axis] = slice(None)
+    others = tuple(a for a in range(3) if a != axis)
+    return hist[tuple(sl)].sum(axis=others)
+
+
+def _best_box(fg: np.ndarray, bg: np.ndarray, recall: float):
+    """Bin box ``[(lo, hi), ...]`` (hi exclusive) holding *recall* of *fg*, least *bg*.
+
+    Coordinate descent: each axis in turn gets its best interval with the other two held,
+    scored on every (lo, hi) pair at once from cumulative sums.  A thin uniform prior
+    (*UNSEEN_PRIOR*) stands for background the frames did not show, so empty HSV volume is
+    not free and the box stays tight around the disc.
+    """
+    total = int(fg.sum())
+    need = recall * total
+    cost = bg + UNSEEN_PRIOR * bg.sum() / bg.size
+    box = []
+    for axis in range(3):
+        occupied = np.nonzero(fg.sum(axis=tuple(a for a in range(3) if a != axis)))[0]
+        box.append((int(occupied[0]), int(occupied[-1]) + 1))
+    for _ in range(10):
+        before = list(box)
+        for axis in range(3):
+            F = np.concatenate(([0], np.cumsum(_project(fg, box, axis))))
+            B = np.concatenate(([0], np.cumsum(_project(cost, box, axis))))
+            lo, hi = np.ogrid[:len(F), :len(F)]
+            score = np.where((hi > lo) & (F[hi] - F[lo] >= need), B[hi] - B[lo], np.inf)
+            box[axis] = divmod(int(np.argmin(score)), len(F))
+        if box == before:
+            break
+    # Widen into bins no background uses: headroom for lighting changes, for free.
+    for axis in range(3):
+        for side, step in ((0, -1), (1, 1)):
+            for _ in range(MARGIN_BINS[axis]):
+                trial = list(box)
+                edge = list(trial[axis])
+                edge[side] += step
+                if not 0 <= edge[side] <= _SHAPE[axis]:
+                    break
+                trial[axis] = tuple(edge)
+                if _count(bg, trial) > _count(bg, box):
+                    break
+                box = trial
+    return box
+
+
+def _box_to_ranges(box, shift: int) -> Tuple[Range, ...]:
+    s = (box[1][0] * SV_BIN, box[1][1] * SV_BIN - 1)
+    v = (box[2][0] * SV_BIN, box[2][1] * SV_BIN - 1)
+    h_lo = (box[0][0] * H_BIN - shift) % 180
+    h_hi = (box[0][1] * H_BIN - 1 - shift) % 180
+
+    def rng(h0, h1):
+        return (np.array([h0, s[0], v[0]], dtype=np.uint8),
+                np.array([h1, s[1], v[1]], dtype=np.uint8))
+
+    if h_lo <= h_hi:
+        return (rng(h_lo, h_hi),)
+    return rng(h_lo, 179), rng(0, h_hi)
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+def _inside(pixels: np.ndarray, ranges: Sequence[Range]) -> int:
+    px = np.ascontiguousarray(pixels).reshape(-1, 1, 3)
+    return int(np.count_nonzero(tr.colour_mask(px, ranges)))
+
+
+def _evaluate(checks, i: int, ranges: Sequence[Range]) -> Tuple[float, float, float]:
+    """``(recall, false_positive_rate, spurious_blobs)`` of *ranges* for disc *i*."""
+    if not checks:
+        return float("nan"), float("nan"), float("nan")
+    hits = core = fp = bg = blobs = 0
+    for hsv, discs in checks:
+        own, other = _samples(hsv, discs, i)
+        hits, core = hits + _inside(own, ranges), core + len(own)
+        fp, bg = fp + _inside(other, ranges), bg + len(other)
+        mask = cv2.morphologyEx(tr.colour_mask(hsv, ranges), cv2.MORPH_OPEN, _KERNEL)
+        x, y, r = discs[i]
+        blobs += sum(1 for bx, by, _ in tr.find_markers(mask, subpixel=True)
+                     if hypot(bx - x, by - y) > r)
+    return hits / max(1, core), fp / max(1, bg), blobs / len(checks)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def calibrate_from_frames(frames, *, seed=None, recall: float = 0.99,
+                          max_frames: Optional[int] = 200,
+                          check_frames: int = 10) -> AutoCalibration:
+    """Fit pink and purple ranges to *frames* (BGR) with the robot visible.
+
+    *frames* is an iterable of images or a capture with ``read()``.  *seed* are the
+    ``(pink_ranges, purple_ranges)`` used to find the discs (default: the tracker's current
+    ones).  Every other usable frame, up to *check_frames*, is held out of the fit and
+    used to measure the result against the seed; with a single usable frame there is
+    nothing to measure on and the scores are NaN.  Raises ValueError if the discs are
+    found in no frame.
+    """
+    seed = tr._hsv_ranges() if seed is None else seed
+    fg = [None, None]
+    bg = [None, None]
+    shift = [0, 0]
+    checks: List[Tuple[np.ndarray, tuple]] = []
+    used = skipped = 0
+    expected_d = None
+    for frame in _iter_frames(frames, max_frames):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        discs = _locate_discs(hsv, seed, expected_d)
+        if discs is None:
+            skipped += 1
+            continue
+        d = hypot(discs[0][0] - discs[1][0], discs[0][1] - discs[1][1])
+        expected_d = 0.8 * expected_d + 0.2 * d if expected_d else d
+        used += 1
+        if used % 2 == 0 and len(checks) < check_frames:
+            checks.append((hsv, discs))           # held out: measured, not fitted
+            continue
+        for i in range(2):
+            own, other = _samples(hsv, discs, i)
+            if fg[i] is None:
+                # Rotate hue so the disc sits mid-axis and its box never wraps in bins.
+                shift[i] = int(round(90 - _circular_hue_mean(own))) % 180
+                fg[i] = _histogram(own, shift[i])
+                bg[i] = _histogram(other, shift[i])
+            else:
+                fg[i] += _histogram(own, shift[i])
+                bg[i] += _histogram(other, shift[i])
+    if not used:
+        raise ValueError("robot markers not found in any of {} frames".format(skipped))
+
+    markers = []
+    for i in range(2):
+        ranges = _box_to_ranges(_best_box(fg[i], bg[i], recall), shift[i])
+        got_recall, fpr, blobs = _evaluate(checks, i, ranges)
+        _, seed_fpr, seed_blobs = _evaluate(checks, i, seed[i])
+        markers.append(MarkerCalibration(ranges, got_recall, fpr, blobs, seed_fpr, seed_blobs))
+    return AutoCalibration(markers[0], markers[1], used, skipped)
+
+
+def format_report(cal: AutoCalibration) -> str:
+    lines = ["{} frames used, {} without both discs".format(cal.frames_used, cal.frames_skipped),
+             "{:<7} {:<34} {:>7} {:>9} {:>7}   {}".format(
+                 "marker", "H S V ranges", "recall", "FP rate", "blobs", "seed FP rate, blobs")]
+    for name, m in (("pink", cal.pink), ("purple", cal.purple)):
+        text = " | ".join("{}-{} {}-{} {}-{}".format(lo[0], hi[0], lo[1], hi[1], lo[2], hi[2])
+                          for lo, hi in m.ranges)
+        lines.append("{:<7} {:<34} {:>6.1%} {:>9.3%} {:>7.2f}   {:.3%}, {:.2f}".format(
+            name, text, m.recall, m.false_positive_rate, m.spurious_blobs,
+            m.seed_false_positive_rate, m.seed_spurious_blobs))
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Fit marker HSV ranges from recorded frames")
+    parser.add_argument("source", help="video file, or camera index")
+    parser.add_argument("--frames", type=int, default=200, help="frames to read at most")
+    parser.add_argument("--recall", type=float, default=0.99,
+                        help="fraction of disc pixels the ranges must keep")
+    parser.add_argument("--save", action="store_true", help="write marker_hsv.json")
+    args = parser.parse_args(argv)
+
+    cap = cv2.VideoCapture(int(args.source) if args.source.isdigit() else args.source)
+    try:
+        cal = calibrate_from_frames(cap, recall=args.recall, max_frames=args.frames)
+    finally:
+        cap.release()
+    print(format_report(cal))
+    if args.save:
+        cal.save()
+        print("Saved calibration ➜", tr.CALIB_FILE)
+
+
+if __name__ == "__main__":
+    main()
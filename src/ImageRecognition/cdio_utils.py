@@ -9,12 +9,6 @@ import cv2  # type: ignore
 import numpy as np
 import math
 
-try:
-    # Only import if the user actually needs inference.
-    from inference_sdk import InferenceHTTPClient  # type: ignore
-except ImportError:  # pragma: no cover – makes linting/tests happy when package is absent
-    InferenceHTTPClient = None  # type: ignore
-
 __all__ = [
     "InferenceConfig",
     "load_image",
@@ -42,11 +36,14 @@ class InferenceConfig:
     model_id: str
 
     def client(self) -> "InferenceHTTPClient":
-        if InferenceHTTPClient is None:  # pragma: no cover
+        try:
+            # Only imported when inference is actually used; the SDK is slow to import.
+            from inference_sdk import InferenceHTTPClient  # type: ignore
+        except ImportError:  # pragma: no cover
             raise RuntimeError(
                 "inference‑sdk is not installed. Please `pip install inference‑sdk` "
                 "or add it to your project dependencies."
-            )
+            ) from None
         c = InferenceHTTPClient(api_url=self.api_url, api_key=self.api_key)
         c.select_model(self.model_id)
         return c
@@ -174,9 +171,17 @@ def draw_points(
     color: Tuple[int, int, int] = (0, 0, 255),
     radius: int = 10,
     thickness: int = -1,
+    out: np.ndarray | None = None,
 ) -> np.ndarray:
-    """Overlay *points* onto *image* and return a copy."""
-    out = image.copy()
+    """Overlay *points* onto *image* and return the result.
+
+    By default a copy of *image* is drawn on.  Pass a preallocated *out* buffer of the same
+    shape to reuse it across frames, or ``out=image`` to draw in place without copying.
+    """
+    if out is None:
+        out = image.copy()
+    elif out is not image:
+        np.copyto(out, image)
     for p in points:
         x, y = map(int, p)
         cv2.circle(out, (x, y), radius, color, thickness)
@@ -34,7 +34,7 @@ def main():
         H = create_homography(temp_frame_path, dst_size=(TRANSFORM_W, TRANSFORM_H))
         
         # Save the homography matrix
-        save_homography(H, HOMOGRAPHY_FILE)
+        save_homography(H, HOMOGRAPHY_FILE, frame_size=(frame.shape[1], frame.shape[0]))
         print(f"Successfully created and saved homography to {HOMOGRAPHY_FILE}")
         
     except Exception as e:
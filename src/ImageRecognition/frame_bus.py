@@ -0,0 +1,237 @@
+"""
+frame_bus.py – Zero-copy fan-out of camera frames through ``multiprocessing.shared_memory``.
+
+The producer writes every frame into a fixed ring of slots; consumers in other processes
+attach by :attr:`FrameBus.spec` and receive *read-only NumPy views* straight into shared
+memory, so no frame is ever pickled.
+
+Layout of the shared block::
+
+    [write_seq | slot_seq[slots] | slot_time[slots] | cursor[readers] | heartbeat[readers] | frames…]
+
+The producer never waits for anybody.  A reader that falls more than ``slots - 1`` frames
+behind has lost its frames to the ring; :meth:`FrameReader.next` notices that, skips ahead
+to the newest frame and counts the loss in :attr:`FrameReader.skipped`.  The producer can
+list such readers with :meth:`FrameBus.stalled_readers`.
+
+```python
+bus = FrameBus.create(frame.shape, slots=8)           # producer
+seq = bus.publish(frame)
+
+reader = FrameBus.attach(bus.spec).reader(0)          # consumer, any process
+seq, t, view = reader.next(timeout=1.0)
+```
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+__all__ = [
+    "FrameBusSpec",
+    "FrameBus",
+    "FrameReader",
+]
+
+_EMPTY = -1        # slot has never been written
+_WRITING = -2      # slot is being overwritten right now
+_FREE = -3         # reader cursor: reader not active
+
+
+@dataclass(frozen=True)
+class FrameBusSpec:
+    """Everything a process needs to attach to an existing bus (picklable)."""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    slots: int
+    readers: int
+
+
+def _align(n: int, to: int = 64) -> int:
+    return (n + to - 1) // to * to
+
+
+class FrameBus:
+    """Ring of frame slots in shared memory.  Use :meth:`create` or :meth:`attach`."""
+
+    def __init__(self, spec: FrameBusSpec, shm: shared_memory.SharedMemory, owner: bool):
+        self.spec = spec
+        self._shm = shm
+        self._owner = owner
+        buf = shm.buf
+        s, r = spec.slots, spec.readers
+
+        off = 0
+        self._write_seq = np.ndarray((1,), np.int64, buf, off); off += 8
+        self._slot_seq = np.ndarray((s,), np.int64, buf, off); off += 8 * s
+        self._slot_time = np.ndarray((s,), np.float64, buf, off); off += 8 * s
+        self._cursor = np.ndarray((r,), np.int64, buf, off); off += 8 * r
+        self._heartbeat = np.ndarray((r,), np.float64, buf, off); off += 8 * r
+        off = _align(off)
+        self._frames = np.ndarray((s,) + tuple(spec.shape), np.dtype(spec.dtype), buf, off)
+
+    # ------------------------------ construction ---------------------------
+    @staticmethod
+    def _size(shape, dtype, slots, readers) -> int:
+        header = _align(8 + 16 * slots + 16 * readers)
+        return header + slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+    @classmethod
+    def create(cls, shape: Tuple[int, ...], dtype=np.uint8, *, slots: int = 8,
+               readers: int = 8, name: Optional[str] = None) -> "FrameBus":
+        """Allocate a new bus for frames of *shape*/*dtype*."""
+        if slots < 2:
+            raise ValueError("FrameBus needs at least two slots")
+        dtype = np.dtype(dtype).str
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=cls._size(shape, dtype, slots, readers))
+        bus = cls(FrameBusSpec(shm.name, tuple(shape), dtype, slots, readers), shm, owner=True)
+        bus._write_seq[0] = _EMPTY
+        bus._slot_seq[:] = _EMPTY
+        bus._cursor[:] = _FREE
+        bus._heartbeat[:] = 0.0
+        return bus
+
+    @classmethod
+    def attach(cls, spec: FrameBusSpec) -> "FrameBus":
+        """Open an existing bus created by another process."""
+        return cls(spec, shared_memory.SharedMemory(name=spec.name), owner=False)
+
+    def close(self) -> None:
+        """Release this process's mapping; views handed out before become invalid.
+
+        If views are still referenced the mapping is left to the garbage collector.
+        """
+        self._write_seq = self._slot_seq = self._slot_time = None
+        self._cursor = self._heartbeat = self._frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        """Destroy the shared block (producer only, after :meth:`close`)."""
+        if self._owner:
+            self._shm.unlink()
+
+    # ------------------------------ producer -------------------------------
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the newest complete frame, or -1 before the first publish."""
+        return int(self._write_seq[0])
+
+    def publish(self, frame: np.ndarray, t: Optional[float] = None) -> int:
+        """Copy *frame* into the next slot and return its sequence number.  Never blocks."""
+        seq = self.latest_seq + 1
+        slot = seq % self.spec.slots
+        self._slot_seq[slot] = _WRITING
+        np.copyto(self._frames[slot], frame, casting="no")
+        self._slot_time[slot] = time.time() if t is None else t
+        self._slot_seq[slot] = seq
+        self._write_seq[0] = seq
+        return seq
+
+    def stalled_readers(self, max_age_s: Optional[float] = None) -> List[int]:
+        """Readers whose cursor is overrun by the ring (or silent for *max_age_s*)."""
+        latest = self.latest_seq
+        now = time.time()
+        stalled = []
+        for rid in range(self.spec.readers):
+            cursor = int(self._cursor[rid])
+            if cursor == _FREE:
+                continue
+            overrun = latest - cursor >= self.spec.slots - 1
+            silent = max_age_s is not None and now - self._heartbeat[rid] > max_age_s
+            if overrun or silent:
+                stalled.append(rid)
+        return stalled
+
+    # ------------------------------ consumer -------------------------------
+    def reader(self, reader_id: int, *, from_latest: bool = True) -> "FrameReader":
+        """Return a cursor for consumer *reader_id* (0 ≤ id < ``spec.readers``)."""
+        if not 0 <= reader_id < self.spec.readers:
+            raise ValueError(f"reader_id must be in [0, {self.spec.readers})")
+        return FrameReader(self, reader_id, from_latest)
+
+    def _view(self, seq: int) -> Optional[Tuple[float, np.ndarray]]:
+        slot = seq % self.spec.slots
+        if self._slot_seq[slot] != seq:
+            return None
+        view = self._frames[slot].view()
+        view.flags.writeable = False
+        return float(self._slot_time[slot]), view
+
+    def is_valid(self, seq: int) -> bool:
+        """True while frame *seq* has not been overwritten – check after using a view."""
+        return self._slot_seq[seq % self.spec.slots] == seq
+
+
+class FrameReader:
+    """Per-consumer cursor into a :class:`FrameBus`."""
+
+    def __init__(self, bus: FrameBus, reader_id: int, from_latest: bool):
+        self.bus = bus
+        self.reader_id = reader_id
+        self.skipped = 0
+        start = bus.latest_seq if from_latest else _EMPTY
+        bus._cursor[reader_id] = max(start, _EMPTY)
+        bus._heartbeat[reader_id] = time.time()
+
+    @property
+    def cursor(self) -> int:
+        return int(self.bus._cursor[self.reader_id])
+
+    def _advance(self, seq: int) -> None:
+        self.bus._cursor[self.reader_id] = seq
+        self.bus._heartbeat[self.reader_id] = time.time()
+
+    def get(self, seq: int) -> Optional[np.ndarray]:
+        """View of frame *seq* if it is still in the ring, else None."""
+        hit = self.bus._view(seq)
+        self._advance(max(seq, self.cursor))
+        return None if hit is None else hit[1]
+
+    def latest(self) -> Optional[Tuple[int, float, np.ndarray]]:
+        """Jump to the newest frame: ``(seq, t, view)`` or None if nothing was published."""
+        seq = self.bus.latest_seq
+        if seq < 0:
+            return None
+        hit = self.bus._view(seq)
+        if hit is None:
+            return None
+        self.skipped += max(0, seq - self.cursor - 1)
+        self._advance(seq)
+        return (seq, hit[0], hit[1])
+
+    def next(self, timeout: Optional[float] = None,
+             poll_s: float = 0.001) -> Optional[Tuple[int, float, np.ndarray]]:
+        """Next unread frame in order, skipping frames lost to the ring; None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            latest = self.bus.latest_seq
+            cursor = self.cursor
+            if latest > cursor:
+                want = cursor + 1
+                oldest_safe = latest - (self.bus.spec.slots - 2)
+                if want < oldest_safe:          # stalled: those frames are gone
+                    self.skipped += oldest_safe - want
+                    want = oldest_safe
+                hit = self.bus._view(want)
+                if hit is not None:
+                    self._advance(want)
+                    return (want, hit[0], hit[1])
+                continue                        # slot flipped underneath us, retry
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            self.bus._heartbeat[self.reader_id] = time.time()
+            time.sleep(poll_s)
+
+    def release(self) -> None:
+        """Mark this reader inactive so it is not reported as stalled."""
+        self.bus._cursor[self.reader_id] = _FREE
@@ -1,4 +1,15 @@
-from cdio_utils import (
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from functools import partial
+import cv2
+import numpy as np
+import time
+from pathlib import Path
+from ImageRecognition.cdio_utils import (
     InferenceConfig,
     load_image,
     run_inference,
@@ -6,13 +17,10 @@ from cdio_utils import (
     warp_image,
     draw_points,
 )
-import cv2
-import numpy as np
-import os
-import time
-from pathlib import Path
 from ImageRecognition.Homography import load_homography
-from track_robot import get_robot_pose
+from ImageRecognition.track_robot import get_robot_pose
+from ImageRecognition.pipeline import Pipeline, PipelineStop, Stage
+from ImageRecognition.frame_bus import FrameBus
 
 # Example usage
 API_KEY = "BdmadiDKNX7YzP4unsUm"
@@ -20,9 +28,11 @@ TRANSFORM_W, TRANSFORM_H = 1200, 1800
 OUTPUT_DIR = "transformed_images"
 HOMOGRAPHY_FILE = "homography.npy"
 TARGET_FPS = 10  # Process 5 frames per second
-
-# Create output directory if it doesn't exist
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+VIDEO_SRC = 1    # Use iriun.com to get the camera working.
+WINDOW_NAME = "Detected Balls & Robot - Live Feed"
+# Headless production mode: no overlays, no GUI calls.  Also set by --headless.
+HEADLESS = os.environ.get("GOLFBOT_HEADLESS", "0") == "1"
+DISPLAY_HZ = 5   # display is a low-rate subscriber when enabled
 
 config = InferenceConfig(
     api_url="http://localhost:9001",
@@ -30,72 +40,224 @@ config = InferenceConfig(
     model_id="tabletennis-ball-detection/1",
 )
 
-# Load existing homography matrix
-try:
-    H = load_homography(HOMOGRAPHY_FILE)
-except Exception as e:
-    print(f"Error loading homography: {e}")
-    exit(1)
-
-# Initialize video capture, Use iriun.com to get the camera working.
-cap = cv2.VideoCapture(1)
-
-frame_count = 0
-last_frame_time = time.time()
-frame_interval = 1.0 / TARGET_FPS
-last_saved_time = time.time()
-save_interval = 1.0  # seconds
-save_count = 0
-
-while True:
-    # Calculate time since last frame
-    current_time = time.time()
-    elapsed = current_time - last_frame_time
-    
-    # Skip frame if not enough time has passed
-    if elapsed < frame_interval:
-        time.sleep(0.001)  # Small sleep to prevent CPU hogging
-        continue
-    
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Update last frame time
-    last_frame_time = current_time
-
-    # Save a frame every second
-    if current_time - last_saved_time >= save_interval:
-        save_path = os.path.join(OUTPUT_DIR, f"source_frame_{save_count:04d}.jpg")
-        cv2.imwrite(save_path, frame)
-        save_count += 1
-        last_saved_time = current_time
-
-    # Convert frame to RGB for processing
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    
-    # Process frame: run inference, transform detections, and draw
-    result = run_inference(frame_rgb, config)
-    detections = [(p["x"], p["y"]) for p in result.get("predictions", [])]
-    # Draw detections directly on the original frame
-    frame_with_balls = draw_points(frame, detections)
-
-    # --- Use get_robot_pose from track_robot_v2 for robot pose ---
-    pose = get_robot_pose(frame)
-    frame_with_balls = draw_points(frame, detections)
+
+# ----------------------------------------------------------------------
+# Stages (module level so they can be pickled into worker processes)
+# ----------------------------------------------------------------------
+
+def capture_frames(video_src=VIDEO_SRC, target_fps=TARGET_FPS, save_interval=1.0):
+    """Yield ``{"frame", "t"}`` items from the camera, saving a source frame every *save_interval* s."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    cap = cv2.VideoCapture(video_src)
+    frame_interval = 1.0 / target_fps
+    last_frame_time = 0.0
+    last_saved_time = time.time()
+    save_count = 0
+    try:
+        while True:
+            # Skip frame if not enough time has passed
+            current_time = time.time()
+            if current_time - last_frame_time < frame_interval:
+                time.sleep(0.001)  # Small sleep to prevent CPU hogging
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                return
+            last_frame_time = current_time
+
+            # Save a frame every second
+            if current_time - last_saved_time >= save_interval:
+                save_path = os.path.join(OUTPUT_DIR, f"source_frame_{save_count:04d}.jpg")
+                cv2.imwrite(save_path, frame)
+                save_count += 1
+                last_saved_time = current_time
+
+            yield {"frame": frame, "t": current_time}
+    finally:
+        cap.release()
+
+
+def publish_frames(video_src=VIDEO_SRC, slots=8):
+    """Like :func:`capture_frames`, but frames go to a shared-memory bus.
+
+    Items only carry ``{"bus", "seq", "t"}`` so nothing large is pickled between stages.
+    """
+    bus = None
+    try:
+        for item in capture_frames(video_src):
+            frame = item.pop("frame")
+            if bus is None:
+                bus = FrameBus.create(frame.shape, frame.dtype, slots=slots)
+            item["seq"] = bus.publish(frame, item["t"])
+            item["bus"] = bus.spec
+            yield item
+    finally:
+        if bus is not None:
+            bus.close()
+            bus.unlink()
+
+
+_readers = {}
+
+
+def frame_of(item, reader_id=0):
+    """Return the frame of *item*, from the item itself or from the frame bus.
+
+    Returns None if the bus has already overwritten the frame (the item is stale).
+    """
+    if "frame" in item:
+        return item["frame"]
+    spec = item["bus"]
+    reader = _readers.get((spec.name, reader_id))
+    if reader is None:
+        reader = _readers[(spec.name, reader_id)] = FrameBus.attach(spec).reader(reader_id)
+    return reader.get(item["seq"])
+
+
+def frame_intact(item, reader_id=0):
+    """True unless the bus reused *item*'s slot since `frame_of` (a torn read).
+
+    Bus frames are live views and the producer never waits, so check after copying or
+    converting the frame and drop the item if this fails.
+    """
+    if "frame" in item:
+        return True
+    return _readers[(item["bus"].name, reader_id)].bus.is_valid(item["seq"])
+
+
+def make_inference_stage(reader_id=0):
+    """Create the inference client once per worker and return the stage callable."""
+    client = config.client()
+
+    def infer(item):
+        frame = frame_of(item, reader_id)
+        if frame is None:
+            return None
+        # Convert frame to RGB for processing
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if not frame_intact(item, reader_id):
+            return None
+        result = run_inference(frame_rgb, config, client=client)
+        item["detections"] = [(p["x"], p["y"]) for p in result.get("predictions", [])]
+        return item
+
+    return infer
+
+
+def track_stage(item, reader_id=1):
+    frame = frame_of(item, reader_id)
+    if frame is None:
+        return None
+    if "bus" in item:
+        frame = frame.copy()            # the tracker reads it several times
+        if not frame_intact(item, reader_id):
+            return None
+    item["pose"] = get_robot_pose(frame)
+    return item
+
+
+_overlay = None
+
+
+def render_overlay(frame, detections, pose):
+    """Draw detections and the robot pose into a reusable overlay buffer and return it."""
+    global _overlay
+    if _overlay is None or _overlay.shape != frame.shape:
+        _overlay = np.empty_like(frame)
+    out = draw_points(frame, detections, out=_overlay)
     if pose:
         (cx, cy), heading = pose
-        cv2.circle(frame_with_balls, (int(cx), int(cy)), 5, (0,255,255), -1)
-        cv2.putText(frame_with_balls, f"{heading:+6.1f} deg",
+        cv2.circle(out, (int(cx), int(cy)), 5, (0,255,255), -1)
+        cv2.putText(out, f"{heading:+6.1f} deg",
                     (int(cx)+10, int(cy)-10), cv2.FONT_HERSHEY_SIMPLEX,
                     0.5, (255,255,255), 1)
-    # Show the frame in a window
-    cv2.imshow("Detected Balls & Robot - Live Feed", frame_with_balls)
+    return out
 
+
+def display_stage(item, reader_id=2):
+    frame = frame_of(item, reader_id)
+    if frame is None:
+        return None
+    overlay = render_overlay(frame, item.get("detections", []), item.get("pose"))
+    if not frame_intact(item, reader_id):
+        return None
+    cv2.imshow(WINDOW_NAME, overlay)
     # Press 'q' to quit
     if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        cv2.destroyAllWindows()
+        raise PipelineStop
+
+
+# ----------------------------------------------------------------------
+# Runners
+# ----------------------------------------------------------------------
+
+def run_serial(video_src=VIDEO_SRC, headless=HEADLESS, display_hz=DISPLAY_HZ):
+    """Original single-threaded loop: capture → inference → tracking → display.
+
+    With *headless* nothing is drawn or shown; otherwise the display runs at most
+    *display_hz* times per second (None = every frame).
+    """
+    infer = make_inference_stage()
+    display_interval = 1.0 / display_hz if display_hz else 0.0
+    last_display = 0.0
+    try:
+        for item in capture_frames(video_src):
+            item = infer(item)
+            item = track_stage(item)
+            if headless or item["t"] - last_display < display_interval:
+                continue
+            last_display = item["t"]
+            display_stage(item)
+    except PipelineStop:
+        pass
+    finally:
+        # Release resources
+        if not headless:
+            cv2.destroyAllWindows()
+
+
+def run_pipeline(video_src=VIDEO_SRC, display_hz=DISPLAY_HZ, headless=HEADLESS):
+    """Run every stage in its own process; frame rate is bounded by the slowest stage.
+
+    Frames travel through a shared-memory :class:`FrameBus`; each stage reads them with
+    its own reader id.  In *headless* mode the display stage is left out entirely.
+    """
+    stages = [
+        Stage("inference", factory=partial(make_inference_stage, reader_id=0)),
+        Stage("tracking", fn=partial(track_stage, reader_id=1)),
+    ]
+    if not headless:
+        stages.append(Stage("display", fn=partial(display_stage, reader_id=2), max_hz=display_hz))
+    pipe = Pipeline(source=partial(publish_frames, video_src), stages=stages)
+    pipe.run()
+    print("Pipeline stats:", pipe.stats())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live ball detection and robot tracking.")
+    parser.add_argument("--video-src", type=int, default=VIDEO_SRC)
+    parser.add_argument("--pipeline", action="store_true",
+                        help="run capture, inference, tracking and display in separate processes")
+    parser.add_argument("--display-hz", type=float, default=DISPLAY_HZ,
+                        help="rate limit for the live display (0 = every frame)")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="skip all overlays and GUI calls (or set GOLFBOT_HEADLESS=1)")
+    args = parser.parse_args(argv)
+
+    # Load existing homography matrix
+    try:
+        H = load_homography(HOMOGRAPHY_FILE)
+    except Exception as e:
+        print(f"Error loading homography: {e}")
+        sys.exit(1)
+
+    if args.pipeline:
+        run_pipeline(args.video_src, args.display_hz or None, args.headless)
+    else:
+        run_serial(args.video_src, args.headless, args.display_hz or None)
+
 
-# Release resources
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+pipeline.py – Run vision stages in separate processes connected by bounded queues.
+
+Each stage gets its own process, so throughput is limited by the slowest stage instead of
+the sum of all of them.  Queues hold at most ``depth`` items and use a *latest-wins*
+policy: when a consumer falls behind, the oldest waiting item is dropped so downstream
+stages always work on the freshest frame.
+
+```python
+pipe = Pipeline(source=capture_frames, stages=[
+    Stage("inference", factory=make_inference),
+    Stage("tracking", fn=track),
+    Stage("display", fn=show, max_hz=10),
+])
+pipe.run()            # blocks until a stage raises PipelineStop or Ctrl-C
+print(pipe.stats())
+```
+
+Stage callables and factories must be picklable (module-level functions) because worker
+processes may be started with *spawn* (default on Windows/macOS).
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+__all__ = [
+    "PipelineStop",
+    "Stage",
+    "Pipeline",
+    "put_latest",
+]
+
+_POLL_S = 0.05
+
+
+class PipelineStop(Exception):
+    """Raise from a source or stage to shut the whole pipeline down cleanly."""
+
+
+@dataclass
+class Stage:
+    """One processing step.
+
+    Exactly one of *fn* or *factory* is required.  *factory* is called once inside the
+    worker process and must return the per-item callable – use it for expensive set-up
+    such as an inference client.  Returning ``None`` from the callable drops the item.
+    """
+
+    name: str
+    fn: Optional[Callable[[Any], Any]] = None
+    factory: Optional[Callable[[], Callable[[Any], Any]]] = None
+    max_hz: Optional[float] = None
+
+    def build(self) -> Callable[[Any], Any]:
+        if (self.fn is None) == (self.factory is None):
+            raise ValueError(f"Stage {self.name!r} needs exactly one of fn or factory")
+        return self.factory() if self.factory is not None else self.fn
+
+
+def put_latest(q, item) -> int:
+    """Put *item* on bounded queue *q*, discarding older items if full.
+
+    Returns the number of dropped items.
+    """
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+
+def _throttle(last_start: float, max_hz: Optional[float]) -> None:
+    if max_hz:
+        wait = 1.0 / max_hz - (time.perf_counter() - last_start)
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _source_worker(name, source, out_q, stop, counters, max_hz):
+    processed, dropped = counters
+    try:
+        items: Iterable[Any] = source()
+        last = 0.0
+        for item in items:
+            if stop.is_set():
+                break
+            _throttle(last, max_hz)
+            last = time.perf_counter()
+            n = put_latest(out_q, item)
+            with processed.get_lock():
+                processed.value += 1
+            with dropped.get_lock():
+                dropped.value += n
+    except PipelineStop:
+        pass
+    except Exception as e:
+        print(f"[pipeline] source {name!r} failed:", e)
+    finally:
+        stop.set()
+
+
+def _stage_worker(stage: Stage, in_q, out_q, stop, counters):
+    processed, dropped = counters
+    try:
+        fn = stage.build()
+        last = 0.0
+        while not stop.is_set():
+            _throttle(last, stage.max_hz)
+            try:
+                item = in_q.get(timeout=_POLL_S)
+            except queue.Empty:
+                continue
+            last = time.perf_counter()
+            try:
+                result = fn(item)
+            except PipelineStop:
+                break
+            except Exception as e:
+                print(f"[pipeline] stage {stage.name!r} error:", e)
+                continue
+            with processed.get_lock():
+                processed.value += 1
+            if result is not None and out_q is not None:
+                n = put_latest(out_q, result)
+                with dropped.get_lock():
+                    dropped.value += n
+    except PipelineStop:
+        pass
+    except Exception as e:
+        print(f"[pipeline] stage {stage.name!r} failed:", e)
+    finally:
+        stop.set()
+
+
+class Pipeline:
+    """A source process followed by a chain of stage processes."""
+
+    def __init__(self, source: Callable[[], Iterable[Any]], stages: List[Stage], *,
+                 depth: int = 1, source_max_hz: Optional[float] = None,
+                 keep_results: bool = False, context=None):
+        """
+        Args:
+            source: Picklable callable returning an iterable of items (e.g. frames).
+            stages: Processing steps, executed in order.
+            depth: Capacity of every inter-stage queue.
+            source_max_hz: Optional rate limit for the source.
+            keep_results: Expose the last stage's output through :meth:`results`.
+            context: ``multiprocessing`` context; defaults to the platform default.
+        """
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self._ctx = context or mp.get_context()
+        self.source = source
+        self.stages = stages
+        self.source_max_hz = source_max_hz
+        self._stop = self._ctx.Event()
+        self._queues = [self._ctx.Queue(maxsize=depth) for _ in stages]
+        self._out_q = self._ctx.Queue(maxsize=depth) if keep_results else None
+        names = ["source"] + [s.name for s in stages]
+        self._counters = {n: (self._ctx.Value("l", 0), self._ctx.Value("l", 0)) for n in names}
+        self._procs: List[mp.Process] = []
+
+    # ------------------------------ lifecycle ------------------------------
+    def start(self) -> "Pipeline":
+        self._procs.append(self._ctx.Process(
+            target=_source_worker, name="pipeline-source", daemon=True,
+            args=("source", self.source, self._queues[0], self._stop,
+                  self._counters["source"], self.source_max_hz)))
+        for i, stage in enumerate(self.stages):
+            out_q = self._queues[i + 1] if i + 1 < len(self.stages) else self._out_q
+            self._procs.append(self._ctx.Process(
+                target=_stage_worker, name=f"pipeline-{stage.name}", daemon=True,
+                args=(stage, self._queues[i], out_q, self._stop, self._counters[stage.name])))
+        for p in self._procs:
+            p.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Signal all workers to finish and wait for them; stragglers are terminated."""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for p in self._procs:
+            p.join(max(0.0, deadline - time.monotonic()))
+        for p in self._procs:
+            if p.is_alive():
+                p.terminate()
+                p.join()
+        for q in self._queues + ([self._out_q] if self._out_q is not None else []):
+            q.cancel_join_thread()
+            q.close()
+        self._procs = []
+
+    def run(self) -> None:
+        """Start, block until any worker stops the pipeline (or Ctrl-C), then shut down."""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(0.1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._procs) and not self._stop.is_set()
+
+    def __enter__(self) -> "Pipeline":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ------------------------------ inspection -----------------------------
+    def results(self, timeout: Optional[float] = None):
+        """Return the next output of the last stage (requires ``keep_results=True``)."""
+        if self._out_q is None:
+            raise RuntimeError("Pipeline was created without keep_results=True")
+        return self._out_q.get(timeout=timeout)
+
+    def stats(self) -> dict:
+        """``{stage: {"processed": n, "dropped": m}}`` – *dropped* counts stale items discarded."""
+        return {name: {"processed": p.value, "dropped": d.value}
+                for name, (p, d) in self._counters.items()}
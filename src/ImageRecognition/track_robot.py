@@ -6,23 +6,32 @@ New features (June 2025)
 -----------------------
 * **Interactive calibration** – sample the sticker colours straight from your
   live webcam feed. Click a few times on each disc, press **S** to save.
-* **Automatic reload** – the tracker will look for *marker_hsv.json* every time
-  it is imported. If it exists, those ranges override the built-ins.
+* **Automatic reload** – the tracker will look for *marker_hsv.json* the first
+  time it is used. If it exists, those ranges override the built-ins.
 * **On-screen guidance** – the picker shows where you clicked and which disc
   you are sampling (pink ⇆ purple with keys 1/2).
 
 API
 ---
 ```
-get_robot_pose(frame_bgr, debug=False) -> ((cx, cy), heading_deg)
-                                               or
-                                           ((cx, cy), heading_deg, overlay_img)
+get_robot_pose(frame_bgr, debug=False, overlay=None) -> ((cx, cy), heading_deg)
+get_robot_pose(frame_bgr, homography=H)    -> TrackedPose ((x_mm, y_mm), heading_deg)
+                                              with .covariance (3×3: x, y, heading)
+get_robot_pose(frame_bgr, debug=True, ...) -> (pose, overlay_img), pose as above
 calibrate_markers(video_src=0)             # run once to create marker_hsv.json
+auto_calibration.calibrate_from_frames(frames).save()   # or fit it from recorded frames
 reload_calibration()                       # call if you changed the file
 reset_tracker()                            # forget any learned state
+colour_mask(hsv, ranges), find_markers(mask)   # the detection steps, for other tools
 ```
 *Heading 0 °* points to the right, positive clockwise (OpenCV image coords).  If
-either disc is not visible, **None** is returned.
+either disc is not visible, **None** is returned (``(None, overlay_img)`` with *debug*).
+
+With a *homography* (image pixels → arena, e.g. from `Homography.load_homography`) the
+disc centroids are kept sub-pixel, mapped into the arena and the heading is computed
+there, so the pose is in the same millimetres as ``drive_straight_mm``.  The covariance
+propagates the centroid noise (*CENTROID_SIGMA_PX*, less for bigger blobs) through the
+homography.
 
 Typical usage
 -------------
@@ -58,24 +67,34 @@ _DEFAULT_PINK_HSV = ((np.array([155, 60, 60]), np.array([179, 255, 255])),)
 _DEFAULT_PURPLE_HSV = ((np.array([110, 40, 40]), np.array([140, 255, 255])),)
 
 
+def _json_ranges(entry):
+    """``{"lo", "hi"}`` or ``{"ranges": [{"lo", "hi"}, ...]}`` (hue wrapping past 179)."""
+    pairs = entry["ranges"] if "ranges" in entry else [entry]
+    return tuple((np.asarray(r["lo"], dtype=np.uint8), np.asarray(r["hi"], dtype=np.uint8))
+                 for r in pairs)
+
+
 def _load_hsv_ranges():
-    """Return ((pink_lo, pink_hi),), ((purple_lo, purple_hi),) tuples."""
+    """Return ((pink_lo, pink_hi), ...), ((purple_lo, purple_hi), ...) tuples."""
     if os.path.isfile(CALIB_FILE):
         try:
             with open(CALIB_FILE, "r", encoding="utf8") as f:
                 data = json.load(f)
-            pink_lo = np.asarray(data["pink"]["lo"], dtype=np.uint8)
-            pink_hi = np.asarray(data["pink"]["hi"], dtype=np.uint8)
-            purp_lo = np.asarray(data["purple"]["lo"], dtype=np.uint8)
-            purp_hi = np.asarray(data["purple"]["hi"], dtype=np.uint8)
-            return ((pink_lo, pink_hi),), ((purp_lo, purp_hi),)
+            return _json_ranges(data["pink"]), _json_ranges(data["purple"])
         except Exception as e:
             print("[robot_tracker] WARNING: could not load HSV calibration:", e)
     return _DEFAULT_PINK_HSV, _DEFAULT_PURPLE_HSV
 
 
-# will be replaced by reload_calibration() if the user recalibrates
-PINK_HSV, PURPLE_HSV = _load_hsv_ranges()
+# loaded on first use (importing has no side effects); reload_calibration() replaces them
+PINK_HSV = PURPLE_HSV = None
+
+
+def _hsv_ranges():
+    global PINK_HSV, PURPLE_HSV
+    if PINK_HSV is None:
+        PINK_HSV, PURPLE_HSV = _load_hsv_ranges()
+    return PINK_HSV, PURPLE_HSV
 
 # ---------------------------------------------------------------------------
 # --- GEOMETRIC FILTERS (unchanged) ----------------------------------------
@@ -84,6 +103,87 @@ MAX_AREA = 3000         # ignore blobs bigger than a marker (e.g. arena rail)
 MIN_CIRC = 0.40         # 4πA / P², 1.0 is a perfect circle
 ROI_RADIUS = 100        # search window half-size once we have a track
 RESET_AFTER_MISSES = 15 # frames without a hit → full-frame search again
+CENTROID_SIGMA_PX = 0.5 # centroid noise of a MIN_AREA blob (metric poses only)
+
+
+class TrackedPose(tuple):
+    """``((x, y), heading_deg)`` in arena units, plus :attr:`covariance`.
+
+    Unpacks like the plain pose tuple; *covariance* is the 3×3 covariance of
+    (x, y, heading_deg) in units², degrees² for the heading.
+    """
+
+    def __new__(cls, position, heading, covariance):
+        pose = super().__new__(cls, (position, heading))
+        pose.covariance = covariance
+        return pose
+
+    @property
+    def position_sigma(self) -> float:
+        """RMS position error (square root of the larger covariance eigenvalue)."""
+        return float(np.sqrt(np.linalg.eigvalsh(self.covariance[:2, :2])[-1]))
+
+    @property
+    def heading_sigma(self) -> float:
+        return float(np.sqrt(self.covariance[2, 2]))
+
+
+def _to_arena(H: np.ndarray, x: float, y: float):
+    """Map pixel (x, y) through *H*; returns the arena point and the 2×2 Jacobian."""
+    u, v, w = H @ (x, y, 1.0)
+    X, Y = u / w, v / w
+    J = np.array([[H[0, 0] - X * H[2, 0], H[0, 1] - X * H[2, 1]],
+                  [H[1, 0] - Y * H[2, 0], H[1, 1] - Y * H[2, 1]]]) / w
+    return np.array([X, Y]), J
+
+
+def _metric_pose(H: np.ndarray, front, back) -> TrackedPose:
+    """Pose and covariance from sub-pixel ``(x, y, area)`` disc centroids."""
+    f, Jf = _to_arena(H, front[0], front[1])
+    b, Jb = _to_arena(H, back[0], back[1])
+    Sf = Jf @ Jf.T * (CENTROID_SIGMA_PX ** 2 * MIN_AREA / max(front[2], MIN_AREA))
+    Sb = Jb @ Jb.T * (CENTROID_SIGMA_PX ** 2 * MIN_AREA / max(back[2], MIN_AREA))
+    d = f - b
+    g = np.array([-d[1], d[0]]) / max(float(d @ d), 1e-9)   # ∂heading/∂front (rad)
+    g = np.degrees(g)
+    cov = np.empty((3, 3))
+    cov[:2, :2] = (Sf + Sb) / 4.0
+    cov[:2, 2] = cov[2, :2] = (Sf @ g - Sb @ g) / 2.0
+    cov[2, 2] = g @ (Sf + Sb) @ g
+    centre = (f + b) / 2.0
+    heading = degrees(atan2(d[1], d[0]))
+    return TrackedPose((float(centre[0]), float(centre[1])), heading, cov)
+
+
+# ---------------------------------------------------------------------------
+# --- MARKER DETECTION (also used by auto_calibration) ---------------------
+def colour_mask(hsv: np.ndarray, ranges) -> np.ndarray:
+    """Binary mask of the *hsv* pixels inside any of the ``(lo, hi)`` *ranges*."""
+    mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+    for lo, hi in ranges:
+        mask |= cv2.inRange(hsv, lo, hi)
+    return mask
+
+
+def find_markers(mask: np.ndarray, subpixel: bool = False):
+    """Return (x, y, area) for blobs that look like our circular stickers.
+
+    Centroids are whole pixels unless *subpixel* is set.
+    """
+    good = []
+    cnts, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for c in cnts:
+        area = cv2.contourArea(c)
+        if area < MIN_AREA or area > MAX_AREA:
+            continue
+        peri = cv2.arcLength(c, True)
+        circ = 4 * np.pi * area / (peri * peri) if peri else 0
+        if circ < MIN_CIRC:
+            continue
+        m = cv2.moments(c)
+        x, y = m["m10"] / m["m00"], m["m01"] / m["m00"]
+        good.append((x, y, area) if subpixel else (int(x), int(y), area))
+    return good
 
 
 # ---------------------------------------------------------------------------
@@ -97,30 +197,6 @@ class _RobotTracker:
         self._missed: int = 0                      # frames since last hit
 
     # ------------------------------- utilities -----------------------------
-    @staticmethod
-    def _colour_mask(hsv: np.ndarray, ranges):
-        mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
-        for lo, hi in ranges:
-            mask |= cv2.inRange(hsv, lo, hi)
-        return mask
-
-    @staticmethod
-    def _find_markers(mask: np.ndarray):
-        """Return (x, y, area) for blobs that look like our circular stickers."""
-        good = []
-        cnts, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        for c in cnts:
-            area = cv2.contourArea(c)
-            if area < MIN_AREA or area > MAX_AREA:
-                continue
-            peri = cv2.arcLength(c, True)
-            circ = 4 * np.pi * area / (peri * peri) if peri else 0
-            if circ < MIN_CIRC:
-                continue
-            m = cv2.moments(c)
-            good.append((int(m["m10"] / m["m00"]), int(m["m01"] / m["m00"]), area))
-        return good
-
     def _roi_slices(self, shape):
         if self._centroid is None:
             return None  # whole frame
@@ -130,45 +206,55 @@ class _RobotTracker:
         return (slice(max(0, y - r), min(h, y + r)),
                 slice(max(0, x - r), min(w, x + r)))
 
-    def _register_miss(self):
+    def _miss(self, frame_bgr, debug, overlay):
         self._missed += 1
         if self._missed > RESET_AFTER_MISSES:
             self._centroid = None  # reset ROI search
+        if not debug:
+            return None
+        return None, frame_bgr.copy() if overlay is None else overlay
 
     # ------------------------------ main update ---------------------------
-    def update(self, frame_bgr: np.ndarray, debug=False):
-        """Return pose or None; with *debug=True* also returns an overlay img."""
+    def update(self, frame_bgr: np.ndarray, debug=False, overlay: Optional[np.ndarray] = None,
+               homography: Optional[np.ndarray] = None):
+        """Return pose or None; with *debug=True* ``(pose, overlay_img)`` instead.
+
+        The overlay is drawn on a copy of the frame unless *overlay* is given, in which case
+        it is drawn in place into that buffer (which may be *frame_bgr* itself).  With a
+        *homography* the pose is a metric :class:`TrackedPose`.
+        """
+        subpixel = homography is not None
         roi = self._roi_slices(frame_bgr.shape)
         crop = frame_bgr[roi] if roi else frame_bgr
 
         hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
         kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
 
-        pink_m   = cv2.morphologyEx(self._colour_mask(hsv, PINK_HSV),   cv2.MORPH_OPEN, kernel)
-        purple_m = cv2.morphologyEx(self._colour_mask(hsv, PURPLE_HSV), cv2.MORPH_OPEN, kernel)
+        pink_hsv, purple_hsv = _hsv_ranges()
+        pink_m   = cv2.morphologyEx(colour_mask(hsv, pink_hsv),   cv2.MORPH_OPEN, kernel)
+        purple_m = cv2.morphologyEx(colour_mask(hsv, purple_hsv), cv2.MORPH_OPEN, kernel)
 
-        pinks  = self._find_markers(pink_m)
-        purps  = self._find_markers(purple_m)
+        pinks  = find_markers(pink_m, subpixel)
+        purps  = find_markers(purple_m, subpixel)
         if not pinks or not purps:
-            self._register_miss()
-            return None
+            return self._miss(frame_bgr, debug, overlay)
 
         # ---------- choose the best magenta–purple pair -------------------
         exp = self._expected_d or (0.125 * frame_bgr.shape[1])  # 1/8 of width
         best, best_score = None, 1e9
-        for (px, py, _), (ux, uy, _) in [(p, u) for p in pinks for u in purps]:
-            d = hypot(px - ux, py - uy)
+        for pink, purp in [(p, u) for p in pinks for u in purps]:
+            d = hypot(pink[0] - purp[0], pink[1] - purp[1])
             if not (0.6 * exp <= d <= 1.4 * exp):
                 continue
             score = abs(d - exp)
             if score < best_score:
-                best_score, best = score, ((px, py), (ux, uy), d)
+                best_score, best = score, (pink, purp, d)
 
         if best is None:
-            self._register_miss()
-            return None
+            return self._miss(frame_bgr, debug, overlay)
 
-        (fx, fy), (bx, by), d = best
+        front, back, d = best
+        (fx, fy), (bx, by) = (int(front[0]), int(front[1])), (int(back[0]), int(back[1]))
         cx, cy = (fx + bx) // 2, (fy + by) // 2
         heading = degrees(atan2(fy - by, fx - bx))  # +ve = clockwise
 
@@ -179,15 +265,20 @@ class _RobotTracker:
         self._missed   = 0
         self._expected_d = 0.8 * self._expected_d + 0.2 * d if self._expected_d else d
 
+        pose = (self._centroid, heading)
+        if subpixel:
+            pose = _metric_pose(homography, (front[0] + offx, front[1] + offy, front[2]),
+                                (back[0] + offx, back[1] + offy, back[2]))
+
         if not debug:
-            return (self._centroid, heading)
+            return pose
 
-        dbg = frame_bgr.copy()
+        dbg = frame_bgr.copy() if overlay is None else overlay
         cv2.circle(dbg, (fx + offx, fy + offy), 8, (  0,   0, 255), -1)  # red front
         cv2.circle(dbg, (bx + offx, by + offy), 8, (255,   0,   0), -1)  # blue back
         cv2.line  (dbg, (bx + offx, by + offy), (fx + offx, fy + offy), (  0, 255,   0), 2)
         cv2.circle(dbg,  self._centroid,          6, (  0, 255, 255), -1)  # yellow centre
-        return (self._centroid, heading, dbg)
+        return pose, dbg
 
 
 # ---------------------------------------------------------------------------
@@ -195,9 +286,11 @@ class _RobotTracker:
 _tracker = _RobotTracker()
 
 
-def get_robot_pose(frame_bgr: np.ndarray, debug: bool = False):
+def get_robot_pose(frame_bgr: np.ndarray, debug: bool = False,
+                   overlay: Optional[np.ndarray] = None, *,
+                   homography: Optional[np.ndarray] = None):
     """Stateless façade around the internal tracker (see module docstring)."""
-    return _tracker.update(frame_bgr, debug)
+    return _tracker.update(frame_bgr, debug, overlay, homography)
 
 
 def reset_tracker():
@@ -10,14 +10,11 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from ImageRecognition.Homography import create_homography, save_homography
-from ImageRecognition.ImagePoints import get_transformed_points_from_image
-
-import ImageRecognition.ArrowDetection as arrow_det
-
 from PathFinding.PointsGenerator import get_closest_path_point
 
-from CommandLoop import collect_balls, move_to_goal
+from Movement.CommandLoop import collect_balls, move_to_goal, follow_path
+from Movement.commands import CommandSequence
+from Movement import wire
 
 
 print_lock = threading.Lock()
@@ -25,6 +22,8 @@ EV3_IP = "192.168.147.36"   # ← IP address of your brick
 PORT = 5532                  # Must match the server's port
 TIMEOUT = 5.0               # Timeout in seconds for socket operations
 MAX_RETRIES = 3             # Maximum number of connection retries
+KEEPALIVE_S = 2.0           # Ping the brick after this much idle time
+BINARY_COMMANDS = True      # Send plain command scripts as opcodes (False = text/exec, for debugging)
 
 HELLO_SCRIPT = 'print("Hello from PC Client")\n'
 
@@ -52,8 +51,8 @@ def create_socket() -> socket.socket:
     sock.settimeout(TIMEOUT)
     return sock
 
-def send_and_receive(script: str) -> str:
-    """Send *script* to the EV3 and return its textual reply."""
+def send_and_receive_oneshot(script: str) -> str:
+    """Send *script* over a fresh connection (original protocol) and return the reply."""
     for attempt in range(MAX_RETRIES):
         try:
             sock = create_socket()
@@ -93,13 +92,381 @@ def send_and_receive(script: str) -> str:
             except:
                 pass
 
+# ----------------------------------------------------------------------
+# Persistent session
+# ----------------------------------------------------------------------
+
+def _encode(commands) -> bytes:
+    """MSG_COMMANDS payload; a `CommandSequence` reuses its cached encoding."""
+    if isinstance(commands, CommandSequence):
+        return commands.payload()
+    return wire.encode_commands(commands)
+
+
+class _Pending:
+    __slots__ = ("event", "reply")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.reply: bytes | None = None
+
+
+_STATUS_ORDER = {"sent": 0, "queued": 1, "started": 2, "done": 3, "failed": 3, "cancelled": 3}
+_FINAL = ("done", "failed", "cancelled")
+
+
+class CommandTicket:
+    """Progress of one pipelined submission (see :meth:`Ev3Session.submit`).
+
+    ``status`` moves through ``"sent"`` → ``"queued"`` → ``"started"`` → ``"done"``,
+    ``"failed"`` or ``"cancelled"`` (see :meth:`Ev3Session.abort`); ``times`` records when
+    each status arrived (``time.monotonic``).
+    """
+    __slots__ = ("seq", "status", "error", "times", "on_status", "_done")
+
+    def __init__(self, seq: int, on_status=None):
+        self.seq = seq
+        self.status = "sent"
+        self.error: str | None = None
+        self.times: dict[str, float] = {"sent": time.monotonic()}
+        self.on_status = on_status
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def _update(self, status: str, error: str | None = None) -> None:
+        if _STATUS_ORDER[status] <= _STATUS_ORDER[self.status]:
+            return                                # stale or repeated update
+        self.status = status
+        self.times[status] = time.monotonic()
+        if error:
+            self.error = error
+        if self.on_status is not None:
+            try:
+                self.on_status(self)
+            except Exception as e:
+                with print_lock:
+                    print("status callback failed:", e)
+        if status in _FINAL:
+            self._done.set()
+
+    def wait(self, timeout: float | None = None) -> str:
+        """Block until the command has finished; return the final status."""
+        if not self._done.wait(timeout):
+            raise socket.timeout("command {} still {}".format(self.seq, self.status))
+        return self.status
+
+    def __repr__(self) -> str:
+        return "CommandTicket(seq={}, status={!r})".format(self.seq, self.status)
+
+
+class Ev3Session:
+    """Long-lived framed connection to the EV3 command server.
+
+    Requests carry an id so replies are matched even if they arrive late.  A background
+    thread reads replies; another pings the brick when the link is idle so a dead
+    connection is noticed before the next command.  Broken connections are re-opened on
+    the next request.
+
+    :meth:`request` waits for each script to finish.  :meth:`submit` instead queues work on
+    the brick and returns a :class:`CommandTicket` right away, so the next leg is already
+    waiting when the current one ends.
+    """
+
+    def __init__(self, host: str = EV3_IP, port: int = PORT, *,
+                 timeout: float = TIMEOUT, keepalive_s: float | None = KEEPALIVE_S,
+                 binary: bool = BINARY_COMMANDS):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.keepalive_s = keepalive_s
+        self.binary = binary
+        self._sock: socket.socket | None = None
+        self._lock = threading.Lock()         # guards _sock, _pending and sending
+        self._pending: dict[int, _Pending] = {}
+        self._tickets: dict[int, CommandTicket] = {}
+        self._next_id = 1
+        self._last_activity = 0.0
+        self._closed = False
+        if keepalive_s:
+            threading.Thread(target=self._keepalive_loop, daemon=True).start()
+
+    # ------------------------------ connection -----------------------------
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def connect(self) -> None:
+        with self._lock:
+            self._connect_locked()
+
+    def _connect_locked(self) -> None:
+        if self._sock is not None:
+            return
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.settimeout(None)                 # the reader blocks; requests time out on events
+        self._sock = sock
+        self._last_activity = time.monotonic()
+        threading.Thread(target=self._reader_loop, args=(sock,), daemon=True).start()
+
+    def _drop(self, sock: socket.socket) -> None:
+        """Forget *sock* (if still current) and fail everything waiting on it."""
+        with self._lock:
+            if self._sock is not sock:
+                return
+            self._sock = None
+            pending, self._pending = self._pending, {}
+            tickets, self._tickets = self._tickets, {}
+        try:
+            sock.close()
+        except OSError:
+            pass
+        for p in pending.values():
+            p.reply = None
+            p.event.set()
+        # The brick may still run these, but nobody will hear about it any more.
+        for t in tickets.values():
+            t._update("failed", "connection to EV3 lost")
+
+    def close(self) -> None:
+        self._closed = True
+        sock = self._sock
+        if sock is not None:
+            self._drop(sock)
+
+    # ------------------------------ threads --------------------------------
+    def _reader_loop(self, sock: socket.socket) -> None:
+        try:
+            while True:
+                msg = wire.recv_message(sock)
+                if msg is None:
+                    break
+                msg_type, request_id, payload = msg
+                self._last_activity = time.monotonic()
+                if msg_type == wire.MSG_STATUS:
+                    self._on_status(request_id, payload)
+                    continue
+                with self._lock:
+                    p = self._pending.pop(request_id, None)
+                if p is not None:
+                    p.reply = payload
+                    p.event.set()
+        except (OSError, wire.ProtocolError):
+            pass
+        self._drop(sock)
+
+    def _on_status(self, seq: int, payload: bytes) -> None:
+        status, detail = wire.unpack_status(payload)
+        name = wire.STATUS_NAMES.get(status)
+        if name is None:
+            raise wire.ProtocolError("unknown status {}".format(status))
+        with self._lock:
+            ticket = self._tickets.get(seq)
+            if ticket is not None and name in _FINAL:
+                del self._tickets[seq]
+        if ticket is not None:
+            ticket._update(name, detail or None)
+
+    def _keepalive_loop(self) -> None:
+        while not self._closed:
+            time.sleep(self.keepalive_s / 2)
+            sock = self._sock
+            if sock is None or time.monotonic() - self._last_activity < self.keepalive_s:
+                continue
+            try:
+                self._call(wire.MSG_PING, b"", self.timeout)
+            except socket.timeout:
+                self._drop(sock)          # link is dead; reconnect on next request
+            except OSError:
+                pass
+
+    # ------------------------------ requests -------------------------------
+    def _next_request_id(self) -> int:
+        request_id = self._next_id
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF or 1
+        return request_id
+
+    def _call(self, msg_type: int, payload: bytes, timeout: float) -> bytes:
+        pending = _Pending()
+        with self._lock:
+            self._connect_locked()
+            sock = self._sock
+            request_id = self._next_request_id()
+            self._pending[request_id] = pending
+            try:
+                wire.send_message(sock, msg_type, request_id, payload)
+            except OSError:
+                self._pending.pop(request_id, None)
+                raise
+            self._last_activity = time.monotonic()
+        if not pending.event.wait(timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise socket.timeout("no reply to request {}".format(request_id))
+        if pending.reply is None:
+            raise ConnectionResetError("connection to EV3 lost")
+        return pending.reply
+
+    def request(self, script, timeout: float | None = None) -> str:
+        """Send *script* and return the brick's reply text.
+
+        In binary mode, scripts that are plain primitive calls are sent as opcodes; anything
+        else falls back to text.  A `CommandSequence` goes as its cached binary batch.
+        Connection failures before the script is sent are retried (with reconnect) up to
+        ``MAX_RETRIES`` times.  Once a script has been sent it is never re-sent, because
+        motion commands are not idempotent.
+        """
+        if isinstance(script, CommandSequence):
+            if self.binary:
+                return self.send_commands(script, timeout)
+            script = script.script()
+        commands = wire.parse_script(script) if self.binary else None
+        if commands is not None:
+            return self.send_commands(commands, timeout)
+        return self._request(wire.MSG_SCRIPT, script.encode("utf-8"), timeout)
+
+    def send_commands(self, commands, timeout: float | None = None) -> str:
+        """Send ``[(name, args), ...]`` as one binary batch and return the reply text."""
+        return self._request(wire.MSG_COMMANDS, _encode(commands), timeout)
+
+    def _request(self, msg_type: int, payload: bytes, timeout: float | None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        self._ensure_connected()
+        return self._call(msg_type, payload, timeout).decode("utf-8")
+
+    def _ensure_connected(self) -> None:
+        for attempt in range(MAX_RETRIES):
+            try:
+                with self._lock:
+                    self._connect_locked()
+                return
+            except (ConnectionRefusedError, socket.timeout, OSError):
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                time.sleep(0.5)  # Wait before retrying
+
+    # ------------------------------ pipelining -----------------------------
+    def submit(self, script, on_status=None) -> CommandTicket:
+        """Queue *script* on the brick without waiting for it to run.
+
+        *script* is script text, a ``[(name, args), ...]`` batch or a `CommandSequence`;
+        text is sent as opcodes when it parses (see :meth:`request`).  Commands run in
+        submission order.
+        *on_status* is called from the reader thread with the ticket on every update.
+        """
+        return self._enqueue(wire.MSG_ENQUEUE, b"", script, on_status)
+
+    def replace(self, script, abort_current: bool = True, on_status=None) -> CommandTicket:
+        """Like :meth:`submit`, but first cancel everything still queued on the brick.
+
+        With *abort_current* the command executing right now is stopped as well, so the
+        robot switches to *script* at once – e.g. when a fresh camera frame shows the plan
+        is stale.  Superseded tickets finish as ``"cancelled"``.
+        """
+        flags = wire.REPLACE_ABORT_CURRENT if abort_current else 0
+        return self._enqueue(wire.MSG_REPLACE, bytes([flags]), script, on_status)
+
+    def _enqueue(self, msg_type: int, header: bytes, script, on_status) -> CommandTicket:
+        if isinstance(script, CommandSequence) and not self.binary:
+            script = script.script()
+        if isinstance(script, str):
+            commands = wire.parse_script(script) if self.binary else None
+        else:
+            commands = script
+        if commands is not None:
+            payload = header + bytes([wire.KIND_COMMANDS]) + _encode(commands)
+        else:
+            payload = header + bytes([wire.KIND_SCRIPT]) + script.encode("utf-8")
+        self._ensure_connected()
+        with self._lock:
+            self._connect_locked()
+            seq = self._next_request_id()
+            ticket = CommandTicket(seq, on_status)
+            self._tickets[seq] = ticket
+            try:
+                wire.send_message(self._sock, msg_type, seq, payload)
+            except OSError:
+                del self._tickets[seq]
+                raise
+            self._last_activity = time.monotonic()
+        return ticket
+
+    def abort(self, clear_queue: bool = False,
+              timeout: float | None = None) -> tuple[int, bool]:
+        """Stop the command executing on the brick (and with *clear_queue*, all queued ones).
+
+        Returns ``(cancelled, aborted)``: how many queued commands were dropped and whether
+        a running command was interrupted.
+        """
+        flags = wire.ABORT_CLEAR_QUEUE if clear_queue else 0
+        self._ensure_connected()
+        reply = self._call(wire.MSG_ABORT, bytes([flags]),
+                           self.timeout if timeout is None else timeout)
+        cancelled, aborted = wire.DEPTH.unpack(reply)
+        return cancelled, bool(aborted)
+
+    def stop(self, timeout: float | None = None) -> str:
+        """Brake the drive motors now, ahead of anything queued (the brick's priority lane).
+
+        The running command is aborted; queued ones still run afterwards, so pair this with
+        ``abort(clear_queue=True)`` for an emergency stop.
+        """
+        return self._request(wire.MSG_PRIORITY, wire.encode_commands([("stop_drive", ())]),
+                             timeout)
+
+    def queue_depth(self, timeout: float | None = None) -> int:
+        """Commands waiting on the brick, counting the one executing right now."""
+        reply = self._call(wire.MSG_QUERY_DEPTH, b"", self.timeout if timeout is None else timeout)
+        queued, busy = wire.DEPTH.unpack(reply)
+        return queued + busy
+
+    def health(self, timeout: float | None = None) -> wire.Health:
+        """Ask the brick whether it is ready: uptime, worker restarts, last fault, queue."""
+        self._ensure_connected()
+        reply = self._call(wire.MSG_QUERY_HEALTH, b"",
+                           self.timeout if timeout is None else timeout)
+        return wire.unpack_health(reply)
+
+    def outstanding(self) -> list[CommandTicket]:
+        """Submitted tickets that have not finished yet, oldest first."""
+        with self._lock:
+            return [self._tickets[seq] for seq in sorted(self._tickets)]
+
+
+_session: Ev3Session | None = None
+
+
+def get_session() -> Ev3Session:
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = Ev3Session()
+    return _session
+
+
+def send_and_receive(script: str) -> str:
+    """Send *script* to the EV3 over the persistent session and return its textual reply."""
+    try:
+        return get_session().request(script)
+    except socket.timeout:
+        return "Timeout waiting for response from EV3"
+    except ConnectionRefusedError:
+        return "Connection refused by EV3"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
 # ----------------------------------------------------------------------
 
 def build_commands_from_points( 
     reference_point, 
     destination_points, 
     action: str = "collect", 
-    goal_point = None
+    goal_point = None,
+    heading_deg: float = 0.0
 ) -> str:
     """
     Generate movement commands from image recognition inputs.
@@ -108,8 +475,10 @@ def build_commands_from_points(
         image: The current image frame (BGR).
         arrow_template: Grayscale image of the arrow template.
         transformed_points: List or array of transformed points from the image.
-        action: 'collect' to use collect_balls or 'move' to use move_to_goal.
+        action: 'collect' to use collect_balls, 'move' to use move_to_goal or 'follow' to
+            drive through destination_points in order with follow_path.
         goal_point: Required if action is 'move'; specifies the target goal point.
+        heading_deg: Current robot heading, used by 'follow'.
 
     Returns:
         A string with the commands, or an empty string if generation fails.
@@ -120,6 +489,8 @@ def build_commands_from_points(
         if goal_point is None:
             raise ValueError("goal_point must be provided when action is 'move'")
         commands = move_to_goal(reference_point, goal_point)
+    elif action == "follow":
+        commands = follow_path(reference_point, destination_points, heading_deg)
     else:
         commands = ""
     return commands
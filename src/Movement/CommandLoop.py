@@ -4,10 +4,15 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from PathFinding.PointsGenerator import get_closest_path_point
-from PathFinding.ArrowVector import ArrowVector
+from PathFinding.ArrowVector import ArrowVector, heading_diff
+from PathFinding.PurePursuit import PurePursuit
+from Movement import drive_model as dm
+from Movement.commands import Command, CommandSequence, CAPTURE, DELIVER, drive, path, turn
 
+import math
 
-def collect_balls(reference_point, destination_points):
+
+def collect_balls(reference_point, destination_points, approach_library=None, heading_deg=0.0):
     """
     Create an input dictionary for the pathfinding algorithm.
 
@@ -15,10 +20,26 @@ def collect_balls(reference_point, destination_points):
         image (np.ndarray): The input image (BGR).
         arrow_template (np.ndarray): Grayscale arrow template image.
         transformed_points (list or np.ndarray): List of (x, y) points.
+        approach_library (ApproachLibrary, optional): Precomputed approach poses. When given,
+            balls near walls or the cross are approached from a collision-free direction.
+        heading_deg (float): Current robot heading, only used with *approach_library*.
 
     Returns:
         dict: Input dictionary containing transformed points and arrow vectors.
     """
+    commands = collect_ball_commands(reference_point, destination_points, approach_library,
+                                     heading_deg)
+    return None if commands is None else commands.script()
+
+
+def collect_ball_commands(reference_point, destination_points, approach_library=None,
+                          heading_deg=0.0):
+    """
+    Like `collect_balls`, but return the `CommandSequence` instead of script text.
+
+    Returns:
+        CommandSequence: Turn, approach and capture commands, or None.
+    """
 
     tip = reference_point
 
@@ -26,6 +47,13 @@ def collect_balls(reference_point, destination_points):
         return None
 
     closest = get_closest_path_point(destination_points, tip)
+
+    if approach_library is not None:
+        from PathFinding.ApproachPoses import approach_commands  # numpy, like the library
+
+        approach = approach_library.lookup(closest, ArrowVector(tip, closest).get_angle())
+        if approach is not None:
+            return approach_commands(tip, heading_deg, approach).optimised()
     vector = ArrowVector(tip, closest)
     distance = vector.get_size()
     angle = vector.get_angle()
@@ -36,23 +64,19 @@ def collect_balls(reference_point, destination_points):
     print(f"Distance: {distance}, Angle: {angle}, Normalized Angle: {normalized_angle}")
 
     if normalized_angle < 180:
-        input = f"turn_left_deg({normalized_angle})\n"
+        commands = CommandSequence([Command("turn_left_deg", normalized_angle)])
     else:
-        input = f"turn_right_deg({normalized_angle})\n"
-
-    input += f"drive_straight_mm({distance - 50})\n"
-
-    input += f"open_gate()\n"
+        commands = CommandSequence([Command("turn_right_deg", normalized_angle)])
 
-    input += f"drive_straight_mm({50})\n"
+    commands += drive(distance - 50)
 
-    input += f"close_gate()\n"
+    commands += CAPTURE
 
     print(f"CommandLoop: Remaining destination points: {destination_points}", 
           "\n Length of destination points:", len(destination_points), 
           "\n Removed former closest point:", closest)
 
-    return input
+    return commands.optimised()
 
 def move_to_goal(reference_point, goal_point):
     """
@@ -66,6 +90,17 @@ def move_to_goal(reference_point, goal_point):
     Returns:
         dict: Input dictionary containing transformed points and arrow vectors.
     """
+    commands = goal_commands(reference_point, goal_point)
+    return None if commands is None else commands.script()
+
+
+def goal_commands(reference_point, goal_point):
+    """
+    Like `move_to_goal`, but return the `CommandSequence` instead of script text.
+
+    Returns:
+        CommandSequence: Turn, drive and delivery commands, or None.
+    """
 
     tip = reference_point
 
@@ -82,18 +117,135 @@ def move_to_goal(reference_point, goal_point):
     print(f"Distance: {distance}, Angle: {angle}, Normalized Angle: {normalized_angle}")
 
     if normalized_angle < 180:
-        input = f"turn_left_deg({normalized_angle})\n"
+        commands = CommandSequence([Command("turn_left_deg", normalized_angle)])
     else:
-        input = f"turn_right_deg({normalized_angle})\n"
+        commands = CommandSequence([Command("turn_right_deg", normalized_angle)])
     
-    input += f"drive_straight_mm({distance - 5})\n"
+    commands += drive(distance - 5)
 
-    input += f"open_gate()\n"
+    return (commands + DELIVER).optimised()
 
-    input += f"push_out()\n"
 
-    input += f"push_return()\n"
-    
-    input += f"close_gate()\n"
+def blend_polyline(reference_point, waypoints, corner_radius_mm=150.0, max_blend_deg=120.0):
+    """
+    Split a waypoint polyline into blended motion pieces.
 
-    return input
\ No newline at end of file
+    Corners up to *max_blend_deg* are rounded with an arc of *corner_radius_mm* (shrunk
+    where the legs are too short for it); sharper corners, and corners whose shrunk arc
+    would be tighter than half the wheel base, stop for an in-place turn.
+
+    Args:
+        reference_point: Start of the polyline (robot position).
+        waypoints: Points to pass through, in order.
+
+    Returns:
+        list: ``[("turn", angle_deg), ("path", [(radius_mm, distance_mm), ...]), ...]``
+        with the turn *before* the first leg included, relative to the first leg's direction
+        (the caller adds the robot's own heading, see `drive_polyline`).  Radius 0 is a
+        straight line, > 0 an arc to the right, < 0 to the left.
+    """
+    points = [tuple(map(float, reference_point))] + [tuple(map(float, p)) for p in waypoints]
+    # Drop zero-length legs.
+    pts = [points[0]]
+    for p in points[1:]:
+        if math.hypot(p[0] - pts[-1][0], p[1] - pts[-1][1]) > 1e-6:
+            pts.append(p)
+    if len(pts) < 2:
+        return []
+    lengths = [math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(pts, pts[1:])]
+    angles = [math.degrees(math.atan2(b[1] - a[1], b[0] - a[0])) for a, b in zip(pts, pts[1:])]
+
+    # Tangent length cut from each end of every leg.
+    cut_start = [0.0] * len(lengths)
+    cut_end = [0.0] * len(lengths)
+    arcs = [None] * (len(lengths) - 1)
+    for i, turn in enumerate(heading_diff(b, a) for a, b in zip(angles, angles[1:])):
+        if abs(turn) < 1e-6 or abs(turn) > max_blend_deg:
+            continue
+        half = math.radians(abs(turn)) / 2.0
+        tangent = min(corner_radius_mm * math.tan(half), lengths[i] / 2.0, lengths[i + 1] / 2.0)
+        radius = tangent / math.tan(half)
+        if radius < dm.WHEEL_DISTANCE_MM / 2:     # tighter than the brick can arc
+            continue
+        cut_end[i] = cut_start[i + 1] = tangent
+        arcs[i] = (math.copysign(radius, turn), radius * math.radians(abs(turn)))
+
+    pieces = []
+    path = []
+    for i, length in enumerate(lengths):
+        straight = length - cut_start[i] - cut_end[i]
+        if straight > 1e-6:
+            path.append((0.0, straight))
+        if i == len(arcs):
+            break
+        if arcs[i] is not None:
+            path.append(arcs[i])
+            continue
+        turn = heading_diff(angles[i + 1], angles[i])
+        if abs(turn) > 1e-6:                      # too sharp to blend: stop and turn
+            pieces.append(("path", path))
+            pieces.append(("turn", turn))
+            path = []
+    if path:
+        pieces.append(("path", path))
+    return pieces
+
+
+def drive_polyline(reference_point, waypoints, heading_deg, corner_radius_mm=150.0,
+                   max_blend_deg=120.0, min_turn_deg=1.0):
+    """
+    Create the command script that drives through *waypoints* without stopping at corners.
+
+    Args:
+        reference_point: Current robot position.
+        waypoints: Points to pass through, in order.
+        heading_deg: Current robot heading, same convention as `get_robot_pose`.
+
+    Returns:
+        str: Script of ``drive_path`` commands (with in-place turns where needed), or None.
+    """
+    pieces = blend_polyline(reference_point, waypoints, corner_radius_mm, max_blend_deg)
+    if not pieces:
+        return None
+    first = next(p for p in waypoints
+                 if math.hypot(p[0] - reference_point[0], p[1] - reference_point[1]) > 1e-6)
+    commands = CommandSequence()
+    diff = heading_diff(ArrowVector(reference_point, first).get_angle(), heading_deg)
+    if abs(diff) > min_turn_deg:
+        commands += turn(diff)
+    return (commands + _pieces_commands(pieces)).optimised().script()
+
+
+def follow_path(reference_point, waypoints, heading_deg, step_mm=100.0, **pursuit_options):
+    """
+    Create the command script that follows *waypoints* with a pure-pursuit controller.
+
+    Unlike `drive_polyline`, which fillets each corner with a fixed radius, the route is
+    planned by running `PathFinding.PurePursuit` open-loop from the current pose, so
+    corners are cut by the lookahead distance and the robot starts from its real heading.
+
+    Args:
+        reference_point: Current robot position.
+        waypoints: Points to pass through, in order.
+        heading_deg: Current robot heading, same convention as `get_robot_pose`.
+        step_mm: Length of each planned arc.
+        **pursuit_options: Passed to `PurePursuit` (lookahead_mm, goal_tolerance_mm, ...).
+
+    Returns:
+        str: Script of ``drive_path`` commands (with in-place turns where needed), or None.
+    """
+    if reference_point is None or not waypoints:
+        return None
+    pursuit = PurePursuit(waypoints, start=reference_point, **pursuit_options)
+    pieces = pursuit.rollout((reference_point, heading_deg), step_mm)
+    return _pieces_commands(pieces).optimised().script() or None
+
+
+def _pieces_commands(pieces):
+    commands = CommandSequence()
+    for kind, value in pieces:
+        if kind == "turn":
+            commands += turn(value)
+            continue
+        commands += path(value)
+    return commands
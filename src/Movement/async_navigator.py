@@ -0,0 +1,271 @@
+"""
+async_navigator.py – `FrameNavigator` with capture, pose estimation and dispatch overlapped.
+
+The blocking navigator reads a frame, decides, then waits in ``send_and_receive`` until the
+brick has finished, so every decision is made on a frame taken before the previous command
+ran.  :class:`AsyncFrameNavigator` runs three asyncio stages instead, each blocking call on
+its own worker thread:
+
+* **capture** keeps reading the camera and publishes only the newest frame;
+* **pose** turns the newest frame into a pose (older frames are dropped, see
+  :attr:`AsyncFrameNavigator.dropped_frames`);
+* **control** decides on the newest pose taken *after* the last command finished and
+  dispatches it.  While a command is in flight no new one is issued, unless the targets were
+  changed with :meth:`AsyncFrameNavigator.set_targets` – then the brick's queue is replaced
+  (with an :class:`~Movement.AutonomousClient.Ev3Session`) or the new command is queued
+  behind the old one (with a plain *send* callable).
+
+Every decision is recorded as a :class:`CycleTiming`; :meth:`AsyncFrameNavigator.timing_summary`
+reduces them to mean / p95 / max.
+
+```python
+nav = AsyncFrameNavigator(balls, session=get_session())
+nav.run()                                   # or: await nav.run_async()
+print(nav.timing_summary()["age_s"])        # how old the pose was when we acted on it
+```
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import socket
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ImageRecognition.track_robot import get_robot_pose
+from Movement.AutonomousClient import send_and_receive
+from Movement.frame_navigator import CAPTURE_SEQ, calculate_next_command
+
+__all__ = [
+    "CycleTiming",
+    "AsyncFrameNavigator",
+]
+
+
+@dataclass
+class CycleTiming:
+    """One control decision; times are ``time.monotonic`` seconds."""
+
+    frame_t: float                     # when the frame was read
+    pose_s: float                      # time spent estimating the pose
+    age_s: float                       # frame age when the command was chosen
+    command: str
+    dispatch_s: Optional[float] = None # until the brick reported the command finished
+    preempted: bool = False            # sent while another command was in flight
+
+
+class _Latest:
+    """Single-slot mailbox: writers overwrite, readers wait for a newer version."""
+
+    def __init__(self):
+        self.value = None
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    def put(self, value) -> None:
+        self.value = value
+        self.version += 1
+        self._changed.set()
+
+    async def newer(self, seen: int):
+        while self.version == seen:
+            self._changed.clear()
+            await self._changed.wait()
+        return self.version, self.value
+
+
+class AsyncFrameNavigator:
+    def __init__(self, balls: List[Tuple[int, int]], *,
+                 angle_threshold: float = 10.0,
+                 capture_distance: float = 80.0,
+                 step_mm: float = 80.0,
+                 video_src: int = 0,
+                 capture=None,
+                 send: Optional[Callable[[str], str]] = None,
+                 session=None,
+                 pose_fn: Callable = get_robot_pose,
+                 command_timeout_s: float = 15.0,
+                 history: int = 1000,
+                 log: Callable[..., None] = print):
+        """*capture*, *send* as for `FrameNavigator`; *session* (an `Ev3Session`) takes
+        precedence over *send* and allows in-flight commands to be replaced.  A session
+        command still running after *command_timeout_s* is aborted, and reported to *log*."""
+        self.balls = list(balls)
+        self.angle_threshold = angle_threshold
+        self.capture_distance = capture_distance
+        self.step_mm = step_mm
+        self.cap = capture if capture is not None else cv2.VideoCapture(video_src)
+        self.send = send or send_and_receive
+        self.session = session
+        self.pose_fn = pose_fn
+        self.command_timeout_s = command_timeout_s
+        self.log = log
+        self.timings: deque[CycleTiming] = deque(maxlen=history)
+        self.frames_read = 0
+        self.dropped_frames = 0
+        self._idx = 0
+        self._targets_version = 0
+        self._settled_at = 0.0           # poses from frames older than this are stale
+        self._inflight: Optional[asyncio.Task] = None
+        self._inflight_version = 0
+        self._frames: Optional[_Latest] = None
+        self._poses: Optional[_Latest] = None
+        # One thread per stage so a slow command never holds up the camera.
+        self._camera_pool = ThreadPoolExecutor(1, thread_name_prefix="nav-camera")
+        self._pose_pool = ThreadPoolExecutor(1, thread_name_prefix="nav-pose")
+        self._command_pool = ThreadPoolExecutor(1, thread_name_prefix="nav-command")
+
+    # ------------------------------ public ---------------------------------
+    def run(self) -> None:
+        asyncio.run(self.run_async())
+
+    async def run_async(self) -> None:
+        """Navigate to every ball, then stop the camera and return."""
+        self._frames, self._poses = _Latest(), _Latest()
+        stages = [asyncio.create_task(self._capture_loop()),
+                  asyncio.create_task(self._pose_loop())]
+        try:
+            await self._control_loop()
+            if self._inflight is not None:
+                await self._inflight
+        finally:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            self.close()
+
+    def set_targets(self, balls: List[Tuple[int, int]]) -> None:
+        """Replace the remaining targets; the command in flight may be superseded."""
+        self.balls = list(balls)
+        self._idx = 0
+        self._targets_version += 1
+
+    @property
+    def remaining(self) -> List[Tuple[int, int]]:
+        return self.balls[self._idx:]
+
+    def timing_summary(self) -> Dict[str, Dict[str, float]]:
+        """Mean, 95th percentile and max of each timing field over the recorded cycles."""
+        timings = list(self.timings)
+        columns = {
+            "pose_s": [t.pose_s for t in timings],
+            "age_s": [t.age_s for t in timings],
+            "dispatch_s": [t.dispatch_s for t in timings if t.dispatch_s is not None],
+            "cycle_s": list(np.diff([t.frame_t + t.age_s for t in timings])),
+        }
+        summary = {}
+        for name, values in columns.items():
+            if values:
+                a = np.asarray(values, dtype=float)
+                summary[name] = {"mean": float(a.mean()),
+                                 "p95": float(np.percentile(a, 95)),
+                                 "max": float(a.max())}
+        return summary
+
+    def close(self) -> None:
+        # A cancelled capture stage can leave its thread inside cap.read(); VideoCapture
+        # must not be released under it.
+        self._camera_pool.shutdown(wait=True)
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+        for pool in (self._pose_pool, self._command_pool):
+            pool.shutdown(wait=False)
+
+    # ------------------------------ stages ---------------------------------
+    async def _capture_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self.cap is not None and self.cap.isOpened():
+                ret, frame = await loop.run_in_executor(self._camera_pool, self.cap.read)
+                if not ret:
+                    break
+                self.frames_read += 1
+                self._frames.put((time.monotonic(), frame))
+        finally:
+            self._frames.put(None)
+
+    async def _pose_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        seen = 0
+        try:
+            while True:
+                version, item = await self._frames.newer(seen)
+                self.dropped_frames += version - seen - 1
+                seen = version
+                if item is None:
+                    break
+                frame_t, frame = item
+                t0 = time.monotonic()
+                pose = await loop.run_in_executor(self._pose_pool, self.pose_fn, frame)
+                self._poses.put((frame_t, pose, time.monotonic() - t0))
+        finally:
+            self._poses.put(None)
+
+    async def _control_loop(self) -> None:
+        seen = 0
+        while self._idx < len(self.balls):
+            seen, item = await self._poses.newer(seen)
+            if item is None:
+                break                                 # camera closed
+            frame_t, pose, pose_s = item
+            if not pose or frame_t < self._settled_at:
+                continue
+            busy = self._inflight is not None and not self._inflight.done()
+            if busy and self._inflight_version == self._targets_version:
+                continue
+            (cx, cy), heading = pose
+            cmd = calculate_next_command((cx, cy), heading, self.balls[self._idx],
+                                         angle_threshold=self.angle_threshold,
+                                         capture_distance=self.capture_distance,
+                                         step_mm=self.step_mm)
+            timing = CycleTiming(frame_t, pose_s, time.monotonic() - frame_t, cmd,
+                                 preempted=busy)
+            self.timings.append(timing)
+            if cmd == "capture":
+                cmd = CAPTURE_SEQ
+                self._idx += 1
+            self._inflight_version = self._targets_version
+            self._inflight = asyncio.create_task(self._dispatch(cmd, timing))
+
+    async def _dispatch(self, script: str, timing: CycleTiming) -> None:
+        loop = asyncio.get_running_loop()
+        t0 = time.monotonic()
+        if self.session is not None:
+            submit = self.session.replace if timing.preempted else self.session.submit
+            ticket = submit(script)
+            await loop.run_in_executor(self._command_pool, self._wait_or_abort, ticket)
+        else:
+            await loop.run_in_executor(self._command_pool, self.send, script)
+        timing.dispatch_s = time.monotonic() - t0
+        self._settled_at = max(self._settled_at, time.monotonic())
+
+    def _wait_or_abort(self, ticket) -> str:
+        """Wait for *ticket*; past the timeout abort it and wait as long again for it to end.
+
+        A command that outlives its abort too is reported and given up on, so the
+        navigator never hangs on a brick that stopped answering.
+        """
+        try:
+            return ticket.wait(self.command_timeout_s)
+        except socket.timeout as e:
+            self.log("{} after {:.1f} s, aborting it".format(e, self.command_timeout_s))
+        try:
+            self.session.abort(clear_queue=True)
+        except OSError as e:
+            self.log("abort failed: {}".format(e))  # connection lost: the ticket fails with it
+        try:
+            return ticket.wait(self.command_timeout_s)
+        except socket.timeout as e:
+            self.log("{} after the abort, giving up on it".format(e))
+            return ticket.status
@@ -0,0 +1,263 @@
+"""
+commands.py – Typed brick commands with cached script and wire encodings.
+
+Planners used to build scripts by concatenating f-strings, after which nothing could be
+inspected, costed or optimised.  A :class:`Command` is one call of a primitive in
+`wire.OPCODES`; a :class:`CommandSequence` is an ordered batch of them.  Both render to
+script text (text sessions, the simulator) and to a ``MSG_COMMANDS`` payload
+(`EV3Session`), each computed once and cached – the objects are immutable, so the cache
+never goes stale.
+
+:meth:`CommandSequence.optimised` runs peephole passes over a sequence:
+
+* consecutive in-place turns merge into one net turn,
+* zero-length drives, turns and arcs are dropped and consecutive straight drives merge,
+* the capture macro after an approach, ``drive_straight_mm(a); open_gate();
+  drive_straight_mm(b)``, fuses into ``open_gate(); drive_straight_mm(a + b)`` so the
+  robot opens the gate first and drives in without stopping in front of the ball.
+
+```python
+seq = CommandSequence([turn(30), turn(-5), drive(0), drive(120)]) + CAPTURE
+seq = seq.optimised()
+seq.script()       # 'turn_right_deg(25)\\nopen_gate()\\ndrive_straight_mm(170)\\nclose_gate()\\n'
+seq.duration_s()   # modelled run time, see Movement.drive_model
+session.submit(seq)
+```
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Iterable, Optional, Tuple
+
+from Movement import wire
+from Movement.drive_model import command_duration_s
+
+__all__ = [
+    "MAX_PATH_SEGMENTS",
+    "Command",
+    "CommandSequence",
+    "turn",
+    "drive",
+    "arc",
+    "path",
+    "OPEN_GATE",
+    "CLOSE_GATE",
+    "PUSH_OUT",
+    "PUSH_RETURN",
+    "CAPTURE",
+    "DELIVER",
+]
+
+MAX_PATH_SEGMENTS = wire.OPCODES[wire.OPCODE_BY_NAME["drive_path"]][1] // 2
+
+_EPS = 1e-6
+_TURNS = ("turn_left_deg", "turn_right_deg")
+_DISTANCE_ARG = {"drive_straight_mm": 0, "reverse_drive_mm": 0, "turn_deg": 0,
+                 "arc_left_mm": 1, "arc_right_mm": 1}
+
+
+def _fmt(value: float) -> str:
+    return "{:.6g}".format(value)
+
+
+class Command:
+    """One primitive call, e.g. ``Command("drive_straight_mm", 120)``.
+
+    Unpacks like the ``(name, args)`` pairs of `wire.parse_script`, so it can be passed
+    wherever such pairs are accepted.
+    """
+
+    __slots__ = ("name", "args", "_text", "_payload")
+
+    def __init__(self, name: str, *args: float):
+        op = wire.OPCODE_BY_NAME.get(name)
+        if op is None:
+            raise ValueError(f"unknown primitive {name!r}")
+        if len(args) > wire.OPCODES[op][1]:
+            raise ValueError(f"too many arguments for {name}")
+        self.name = name
+        self.args: Tuple[float, ...] = tuple(float(a) for a in args)
+        self._text: Optional[str] = None
+        self._payload: Optional[bytes] = None
+
+    def __iter__(self):
+        yield self.name
+        yield self.args
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, Command) and self.name == other.name
+                and self.args == other.args)
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.args))
+
+    def __repr__(self) -> str:
+        return f"Command({self.name!r}{''.join(', ' + _fmt(a) for a in self.args)})"
+
+    def script(self) -> str:
+        """Script line, e.g. ``"drive_straight_mm(120)\\n"``."""
+        if self._text is None:
+            self._text = f"{self.name}({', '.join(_fmt(a) for a in self.args)})\n"
+        return self._text
+
+    def payload(self) -> bytes:
+        """``MSG_COMMANDS`` payload for this command alone."""
+        if self._payload is None:
+            self._payload = wire.encode_commands([(self.name, self.args)])
+        return self._payload
+
+    @property
+    def turn_deg(self) -> Optional[float]:
+        """Signed angle of a ``turn_left_deg`` / ``turn_right_deg`` (+ve: right), else None."""
+        if self.name not in _TURNS or not self.args:
+            return None
+        return self.args[0] if self.name == "turn_right_deg" else -self.args[0]
+
+    def is_noop(self) -> bool:
+        """True for motion commands that do not move the robot (zero angle or distance)."""
+        if self.name in _TURNS:
+            return abs(self.args[0]) < _EPS if self.args else False
+        if self.name in _DISTANCE_ARG:
+            i = _DISTANCE_ARG[self.name]
+            return len(self.args) > i and abs(self.args[i]) < _EPS
+        if self.name == "drive_path":
+            return all(abs(d) < _EPS for d in self.args[1::2])
+        return False
+
+
+class CommandSequence:
+    """Immutable, ordered batch of :class:`Command`; also accepts ``(name, args)`` pairs."""
+
+    __slots__ = ("commands", "_text", "_payload", "_duration")
+
+    def __init__(self, commands: Iterable = ()):
+        self.commands: Tuple[Command, ...] = tuple(
+            c if isinstance(c, Command) else Command(c[0], *c[1]) for c in commands)
+        self._text: Optional[str] = None
+        self._payload: Optional[bytes] = None
+        self._duration: Optional[float] = None
+
+    @classmethod
+    def parse(cls, script: str) -> Optional[CommandSequence]:
+        """Sequence for plain script text, or None when it is not only primitive calls."""
+        commands = wire.parse_script(script)
+        return None if commands is None else cls(commands)
+
+    def __iter__(self):
+        return iter(self.commands)
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CommandSequence(self.commands[index])
+        return self.commands[index]
+
+    def __add__(self, other) -> CommandSequence:
+        if isinstance(other, Command):
+            other = (other,)
+        return CommandSequence(self.commands + tuple(CommandSequence(other)))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CommandSequence) and self.commands == other.commands
+
+    def __hash__(self) -> int:
+        return hash(self.commands)
+
+    def __repr__(self) -> str:
+        return f"CommandSequence({list(self.commands)!r})"
+
+    def script(self) -> str:
+        """Script text for `send_and_receive` and the simulator."""
+        if self._text is None:
+            self._text = "".join(c.script() for c in self.commands)
+        return self._text
+
+    def payload(self) -> bytes:
+        """``MSG_COMMANDS`` payload of the whole batch."""
+        if self._payload is None:
+            self._payload = b"".join(c.payload() for c in self.commands)
+        return self._payload
+
+    def duration_s(self) -> float:
+        """Modelled run time on the brick (`Movement.drive_model` timings)."""
+        if self._duration is None:
+            self._duration = command_duration_s(self.commands)
+        return self._duration
+
+    def optimised(self, fuse_capture: bool = True) -> CommandSequence:
+        """Peephole-optimised copy: merge turns and drives, drop no-ops, fuse the capture."""
+        out = []
+        for cmd in self.commands:
+            if cmd.is_noop():
+                continue
+            prev = out[-1] if out else None
+            if prev is not None and prev.turn_deg is not None and cmd.turn_deg is not None:
+                out.pop()
+                net = (prev.turn_deg + cmd.turn_deg + 180.0) % 360.0 - 180.0
+                merged = turn(180.0 if net == -180.0 else net)
+                if not merged.is_noop():
+                    out.append(merged)
+                continue
+            if (prev is not None and prev.name == cmd.name == "drive_straight_mm"
+                    and prev.args[1:] == cmd.args[1:]):
+                out.pop()
+                merged = Command("drive_straight_mm", prev.args[0] + cmd.args[0], *cmd.args[1:])
+                if not merged.is_noop():
+                    out.append(merged)
+                continue
+            if (fuse_capture and len(out) >= 2 and out[-1].name == "open_gate"
+                    and _forward(out[-2]) and _forward(cmd)):
+                out[-2:] = [out[-1], drive(out[-2].args[0] + cmd.args[0])]
+                continue
+            out.append(cmd)
+        return CommandSequence(out)
+
+
+def _forward(cmd: Command) -> bool:
+    return cmd.name == "drive_straight_mm" and len(cmd.args) == 1 and cmd.args[0] > 0
+
+
+# ------------------------------ constructors --------------------------------
+
+def turn(angle_deg: float) -> Command:
+    """In-place turn by *angle_deg*, +ve clockwise (right) like `get_robot_pose` headings."""
+    if angle_deg > 0:
+        return Command("turn_right_deg", angle_deg)
+    return Command("turn_left_deg", abs(angle_deg))
+
+
+def drive(distance_mm: float) -> Command:
+    """Straight drive; negative distances reverse."""
+    return Command("drive_straight_mm", distance_mm)
+
+
+def arc(radius_mm: float, distance_mm: float) -> Command:
+    """Arc of *radius_mm* (> 0 right, < 0 left, 0 straight) for *distance_mm*."""
+    if radius_mm > 0:
+        return Command("arc_right_mm", radius_mm, distance_mm)
+    if radius_mm < 0:
+        return Command("arc_left_mm", -radius_mm, distance_mm)
+    return drive(distance_mm)
+
+
+def path(segments) -> CommandSequence:
+    """``drive_path`` commands for ``[(radius_mm, distance_mm), ...]``, split at the opcode limit."""
+    segments = list(segments)
+    return CommandSequence(
+        Command("drive_path", *[v for seg in segments[i:i + MAX_PATH_SEGMENTS] for v in seg])
+        for i in range(0, len(segments), MAX_PATH_SEGMENTS))
+
+
+OPEN_GATE = Command("open_gate")
+CLOSE_GATE = Command("close_gate")
+PUSH_OUT = Command("push_out")
+PUSH_RETURN = Command("push_return")
+
+CAPTURE = CommandSequence([OPEN_GATE, drive(50), CLOSE_GATE])
+DELIVER = CommandSequence([OPEN_GATE, PUSH_OUT, PUSH_RETURN, CLOSE_GATE])
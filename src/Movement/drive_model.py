@@ -0,0 +1,171 @@
+"""
+drive_model.py – Geometry and timing of the EV3 drive base, without any hardware.
+
+The numbers mirror the MoveDifferential set-up in ``Movement/main.py``; keep the two in
+sync.  Everything here is plain Python so it can be used by the simulator, the planners
+and anything else on the PC that needs to predict what the brick will do.
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+from typing import List, Optional, Tuple
+
+from Movement import wire
+
+__all__ = [
+    "WHEEL_DIAMETER_MM",
+    "WHEEL_WIDTH_MM",
+    "WHEEL_DISTANCE_MM",
+    "MAX_SPEED_DEG_S",
+    "DEFAULT_DRIVE_RPM",
+    "DEFAULT_TURN_RPM",
+    "DEFAULT_RAMP_MS",
+    "GATE_TIME_S",
+    "PUSH_TIME_S",
+    "COMMAND_OVERHEAD_S",
+    "wheel_speed_mm_s",
+    "motion_time_s",
+    "drive_time_s",
+    "turn_time_s",
+    "turn_wheel_travel_mm",
+    "arc_wheel_travel_mm",
+    "arc_time_s",
+    "path_time_s",
+    "wheel_speeds_dps",
+    "primitive_steps",
+    "command_duration_s",
+]
+
+# ── Geometry (Tire68836ZR on ports B/C, see Movement/main.py) ─────────────
+WHEEL_DIAMETER_MM = 68.8
+WHEEL_WIDTH_MM = 36.0
+WHEEL_DISTANCE_MM = 50.0
+
+# ── Motor / primitive defaults ────────────────────────────────────────────
+MAX_SPEED_DEG_S = 1050.0     # EV3 large motor max_speed; ramp_*_sp is relative to this
+DEFAULT_DRIVE_RPM = 60.0     # drive_straight_mm default
+DEFAULT_TURN_RPM = 40.0      # turn_deg default
+DEFAULT_RAMP_MS = 300        # _apply_ramps default
+GATE_TIME_S = 0.6            # open_gate / close_gate incl. wait_until_not_moving
+PUSH_TIME_S = 0.6            # push_out / push_return
+COMMAND_OVERHEAD_S = 0.05    # wait_until_stopped poll and bookkeeping per primitive
+
+
+def wheel_speed_mm_s(speed_rpm: float) -> float:
+    """Linear rim speed of one wheel at *speed_rpm*."""
+    return abs(speed_rpm) / 60.0 * math.pi * WHEEL_DIAMETER_MM
+
+
+def motion_time_s(travel_mm: float, speed_rpm: float, ramp_ms: float = DEFAULT_RAMP_MS) -> float:
+    """Time for one wheel to cover *travel_mm* with a trapezoidal (or triangular) profile.
+
+    ev3dev interprets ``ramp_up_sp``/``ramp_down_sp`` as the time from 0 to *max speed*, so the
+    actual ramp to *speed_rpm* is proportionally shorter.
+    """
+    travel_mm = abs(travel_mm)
+    v = wheel_speed_mm_s(speed_rpm)
+    if travel_mm == 0 or v == 0:
+        return 0.0
+    if ramp_ms <= 0:
+        return travel_mm / v
+    max_mm_s = MAX_SPEED_DEG_S / 360.0 * math.pi * WHEEL_DIAMETER_MM
+    accel = max_mm_s / (ramp_ms / 1000.0)
+    if travel_mm >= v * v / accel:
+        return travel_mm / v + v / accel
+    return 2.0 * math.sqrt(travel_mm / accel)
+
+
+def turn_wheel_travel_mm(angle_deg: float) -> float:
+    """Distance each wheel travels when MoveDifferential turns in place by *angle_deg*."""
+    return math.pi * WHEEL_DISTANCE_MM * abs(angle_deg) / 360.0
+
+
+def drive_time_s(distance_mm: float, speed_rpm: float = DEFAULT_DRIVE_RPM,
+                 ramp_ms: float = DEFAULT_RAMP_MS) -> float:
+    """Expected duration of ``drive_straight_mm`` including per-command overhead."""
+    return motion_time_s(distance_mm, speed_rpm, ramp_ms) + COMMAND_OVERHEAD_S
+
+
+def turn_time_s(angle_deg: float, speed_rpm: float = DEFAULT_TURN_RPM,
+                ramp_ms: float = DEFAULT_RAMP_MS) -> float:
+    """Expected duration of ``turn_deg`` including per-command overhead."""
+    return motion_time_s(turn_wheel_travel_mm(angle_deg), speed_rpm, ramp_ms) + COMMAND_OVERHEAD_S
+
+
+def arc_wheel_travel_mm(radius_mm: float, distance_mm: float) -> float:
+    """Distance the outer wheel travels while the robot centre covers *distance_mm* of an arc.
+
+    ``on_arc_left``/``on_arc_right`` run the outer wheel at the requested speed.  Radius 0
+    means a straight line.
+    """
+    if radius_mm == 0:
+        return abs(distance_mm)
+    return abs(distance_mm) * (1.0 + WHEEL_DISTANCE_MM / (2.0 * abs(radius_mm)))
+
+
+def arc_time_s(radius_mm: float, distance_mm: float, speed_rpm: float = DEFAULT_DRIVE_RPM,
+               ramp_ms: float = DEFAULT_RAMP_MS) -> float:
+    """Expected duration of ``arc_left_mm``/``arc_right_mm`` including overhead."""
+    return (motion_time_s(arc_wheel_travel_mm(radius_mm, distance_mm), speed_rpm, ramp_ms)
+            + COMMAND_OVERHEAD_S)
+
+
+def path_time_s(segments, speed_rpm: float = DEFAULT_DRIVE_RPM,
+                ramp_ms: float = DEFAULT_RAMP_MS) -> float:
+    """Expected duration of ``drive_path`` over ``[(radius_mm, distance_mm), ...]``.
+
+    The segments blend into one motion, so there is a single ramp up/down and a single
+    command overhead.
+    """
+    travel = sum(arc_wheel_travel_mm(r, d) for r, d in segments)
+    return motion_time_s(travel, speed_rpm, ramp_ms) + COMMAND_OVERHEAD_S
+
+
+def wheel_speeds_dps(speed_mm_s: float, turn_rate_deg_s: float) -> tuple[float, float]:
+    """Left/right wheel speeds (deg/s) for a forward speed and a turn rate (+ve clockwise)."""
+    deg_per_mm = 360.0 / (math.pi * WHEEL_DIAMETER_MM)
+    half = math.radians(turn_rate_deg_s) * WHEEL_DISTANCE_MM / 2.0
+    return (speed_mm_s + half) * deg_per_mm, (speed_mm_s - half) * deg_per_mm
+
+
+def primitive_steps(commands) -> List[Tuple[float, float, float, float]]:
+    """(duration, turn_deg, radius_mm, distance_mm) for each primitive in ``[(name, args)]``.
+
+    Turns are +ve clockwise; radius 0 is straight, > 0 an arc right, < 0 left.  The
+    segments of a ``drive_path`` share its duration by travel.  Unknown names are skipped.
+    """
+    steps = []
+    for name, args in commands:
+        opts = tuple(args[1:3])
+        if name in ("drive_straight_mm", "reverse_drive_mm"):
+            d = args[0] if name == "drive_straight_mm" else -abs(args[0])
+            steps.append((drive_time_s(d, *opts), 0.0, 0.0, d))
+        elif name in ("turn_deg", "turn_right_deg", "turn_left_deg"):
+            a = -args[0] if name == "turn_left_deg" else args[0]
+            steps.append((turn_time_s(a, *opts), a, 0.0, 0.0))
+        elif name in ("arc_right_mm", "arc_left_mm"):
+            r = abs(args[0]) if name == "arc_right_mm" else -abs(args[0])
+            steps.append((arc_time_s(r, args[1], *tuple(args[2:4])), 0.0, r, args[1]))
+        elif name == "drive_path":
+            pairs = list(zip(args[::2], args[1::2]))
+            total = path_time_s(pairs)
+            travel = sum(abs(d) for _, d in pairs) or 1.0
+            steps.extend((total * abs(d) / travel, 0.0, r, d) for r, d in pairs)
+        elif name in ("open_gate", "close_gate"):
+            steps.append((GATE_TIME_S, 0.0, 0.0, 0.0))
+        elif name in ("push_out", "push_return"):
+            steps.append((PUSH_TIME_S, 0.0, 0.0, 0.0))
+    return steps
+
+
+def command_duration_s(command) -> Optional[float]:
+    """Modelled run time of script text or ``[(name, args), ...]`` (None if not plain calls)."""
+    commands = wire.parse_script(command) if isinstance(command, str) else command
+    if commands is None:
+        return None
+    return sum(step[0] for step in primitive_steps(commands))
@@ -0,0 +1,557 @@
+"""
+ev3_server.py – The command server from ``Movement/main.py``, without any hardware.
+
+Runs on the brick (ev3dev Python 3.5: no f-strings, no annotations) and on the PC, where
+``Movement/ev3_standin.py`` serves simulated primitives through the very same code.
+
+The server speaks both protocols described in ``wire.py``: framed sessions (scripts,
+opcode batches, pipelined queue, pings) and the original one-shot clients.  All commands go
+through one queue and run on one thread, in arrival order.
+
+Worker threads are supervised: if one dies (an uncaught exception, or a script calling
+``exit()``) it is started again within :attr:`CommandServer.restart_delay_s`, while the
+listening socket, open sessions and the hardware stay as they are.  A command cut short by
+a crash is reported as failed.  ``MSG_QUERY_HEALTH`` reports readiness, uptime, restart
+counts and the last fault.
+
+Subclasses can hook in by overriding :meth:`CommandServer.handle_message`,
+:meth:`CommandServer.send`, :meth:`CommandServer.execute` and
+:meth:`CommandServer.received`.
+"""
+
+import socket
+import time
+import _thread
+from queue import Queue, Empty
+
+try:
+    import wire                       # on the brick, files are deployed side by side
+except ImportError:
+    from Movement import wire
+
+
+class Session(object):
+    """One persistent, framed connection from the PC (see wire.py)."""
+
+    def __init__(self, conn, addr):
+        self.conn = conn
+        self.addr = addr
+        self.send_lock = _thread.allocate_lock()
+        self.open = True
+
+    def send(self, msg_type, request_id, payload=b""):
+        with self.send_lock:
+            wire.send_message(self.conn, msg_type, request_id, payload)
+
+    def close(self):
+        self.open = False
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class MotionAborted(Exception):
+    """Raised inside a primitive when the PC aborts the running command."""
+
+
+def _read_legacy(conn, prefix):
+    command_data = prefix
+    while True:
+        data = conn.recv(1024)
+        if not data:
+            break
+        command_data += data
+    return command_data.decode("utf-8")
+
+
+def _decode_enqueue(payload):
+    if not payload:
+        raise wire.ProtocolError("empty enqueue payload")
+    if payload[0] == wire.KIND_COMMANDS:
+        return wire.decode_commands(payload[1:])
+    return payload[1:].decode("utf-8")
+
+
+class CommandServer(object):
+    """Accepts PC connections and runs their commands against *namespace*.
+
+    *namespace* holds the names text scripts may use; *dispatch* maps opcodes to callables
+    (by default looked up in *namespace* by ``wire.OPCODES`` name).  *telemetry*, if given,
+    is called ``telemetry_hz`` times a second and returns ``(values, states)``: the eight
+    position/speed integers and four ``motor.state`` lists of a telemetry sample.
+
+    *velocity*, if given, receives streamed wheel setpoints ``(left_dps, right_dps)``
+    from UDP port *velocity_port*; *velocity_stop* is called when they stop arriving for
+    the datagram's ttl (at most *velocity_timeout_s*).  A zero setpoint is applied once
+    and not watched.  While a queued command is running it owns the motors: setpoints are
+    ignored and the watchdog leaves them alone.
+
+    Primitives that take a while should poll :attr:`abort_requested` and raise
+    :class:`MotionAborted`; *on_abort* is called as soon as an abort arrives (e.g. to cut
+    the motors).
+
+    Workers that die are restarted after *restart_delay_s* (see :meth:`health`).
+    """
+
+    def __init__(self, host, port, namespace, dispatch=None, telemetry=None,
+                 telemetry_hz=20, telemetry_port=wire.TELEMETRY_PORT,
+                 velocity=None, velocity_stop=None, velocity_port=wire.VELOCITY_PORT,
+                 velocity_timeout_s=0.5, on_abort=None, backlog=1, restart_delay_s=0.05):
+        self.namespace = namespace
+        if dispatch is None:
+            dispatch = dict((op, namespace[name]) for op, (name, _) in wire.OPCODES.items()
+                            if name in namespace)
+        self.dispatch = dispatch
+        self.telemetry = telemetry
+        self.telemetry_hz = telemetry_hz
+        self.telemetry_port = telemetry_port
+        self.telemetry_target = None   # (host, port) of the last framed session
+        self.velocity = velocity
+        if velocity is not None and velocity_stop is None:
+            velocity_stop = lambda: velocity(0.0, 0.0)
+        self.velocity_stop = velocity_stop
+        self.velocity_timeout_s = velocity_timeout_s
+        self.velocity_socket = None
+        if velocity is not None:
+            self.velocity_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.velocity_socket.bind((host, velocity_port))
+            self.velocity_socket.settimeout(0.02)
+        self.command_queue = Queue()
+        self.busy = False              # a command from command_queue is executing right now
+        self.abort_requested = False   # the running command should stop as soon as it can
+        self._queue_lock = _thread.allocate_lock()
+        self._queued = 0               # stamp of the last command put in command_queue
+        self._cancelled_upto = 0       # commands stamped up to here must not start
+        self.on_abort = on_abort
+        self.running = False
+        self.restart_delay_s = restart_delay_s
+        self.started_at = None
+        self.alive = {}                # worker name -> running right now
+        self.restarts = {}             # worker name -> times it had to be restarted
+        self.last_fault = ""
+        self.completed = 0
+        self.failed = 0
+        self._current = None           # queue item the processor is executing
+
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((host, port))
+        self.server_socket.listen(backlog)
+        self.address = self.server_socket.getsockname()
+
+    # ------------------------------ lifecycle ------------------------------
+    def start(self):
+        self.running = True
+        self.started_at = time.time()
+        self._spawn("listener", self.listener)
+        self._spawn("command_processor", self.command_processor)
+        if self.telemetry is not None:
+            self._spawn("telemetry_publisher", self.telemetry_publisher)
+        if self.velocity is not None:
+            self._spawn("velocity_listener", self.velocity_listener)
+        return self
+
+    def close(self):
+        self.running = False
+        for sock in (self.server_socket, self.velocity_socket):
+            try:
+                if sock is not None:
+                    sock.close()
+            except Exception:
+                pass
+        self.command_queue.put(None)
+
+    def serve_forever(self, period_s=1.0):
+        """Park the main thread while the workers run; Ctrl-C stops the motors and closes."""
+        try:
+            while self.running:
+                time.sleep(period_s)
+        except KeyboardInterrupt:
+            pass
+        if self.on_abort is not None:
+            try:
+                self.on_abort()
+            except Exception as e:
+                self.log("Abort error:", e)
+        self.close()
+
+    # ------------------------------ supervision ----------------------------
+    def _spawn(self, name, target):
+        self.alive[name] = True
+        self.restarts.setdefault(name, 0)
+        _thread.start_new_thread(self._supervised, (name, target))
+
+    def _supervised(self, name, target):
+        """Run *target* until the server closes, restarting it whenever it dies."""
+        while True:
+            self.alive[name] = True
+            try:
+                target()
+                fault = "{} exited".format(name)
+            except BaseException as e:          # SystemExit from a script included
+                fault = "{} crashed: {!r}".format(name, e)
+            self.alive[name] = False
+            if not self.running:
+                return
+            self.restarts[name] += 1
+            self.last_fault = fault
+            try:
+                self._recover(name, fault)
+                self.log("Restarting", name, "after", fault)
+            except Exception:
+                pass                            # even print can fail once stdout is gone
+            time.sleep(self.restart_delay_s)
+            if not self.running:
+                return
+
+    def _recover(self, name, fault):
+        """Clean up after worker *name* died: fail its command, stop a stale stream."""
+        if name == "command_processor":
+            with self._queue_lock:
+                item, self._current = self._current, None
+                self.busy = False
+            if item is not None:
+                self.failed += 1
+                self._finish(item[1], item[2], item[3], wire.STATUS_FAILED, fault,
+                             "Execution error: {}\n".format(fault))
+        elif name == "velocity_listener" and not self.busy:
+            self.velocity_stop()
+
+    def health(self):
+        """Return a wire.Health snapshot; ready means every worker is up."""
+        ready = self.running and all(self.alive.values())
+        uptime = time.time() - self.started_at if self.started_at is not None else 0.0
+        return wire.Health(ready, uptime, sum(self.restarts.values()), self.completed,
+                           self.failed, self.command_queue.qsize(), self.busy,
+                           self.last_fault)
+
+    # ------------------------------ hooks ----------------------------------
+    def received(self, kind, request_id, command):
+        """Called for every command as it is queued; *kind* is 'script', 'commands',
+        'enqueue', 'replace', 'legacy' or 'priority'."""
+
+    def log(self, *args):
+        print(*args)
+
+    def send(self, session, msg_type, request_id, payload=b""):
+        session.send(msg_type, request_id, payload)
+
+    def execute(self, command):
+        """Run one queued command (opcode list or script text) and return the reply text."""
+        if isinstance(command, list):
+            self.run_commands(command)
+            return "Command executed successfully.\n"
+        exec(command, dict(self.namespace))
+        return "Command executed successfully.\n {command}".format(command=command)
+
+    def run_commands(self, commands):
+        for op, args in commands:
+            if self.abort_requested:
+                raise MotionAborted("aborted")
+            self.dispatch[op](*args)
+
+    # ------------------------------ preemption -----------------------------
+    def _enqueue(self, command, target, request_id, pipelined):
+        with self._queue_lock:
+            self._queued += 1
+            self.command_queue.put((command, target, request_id, pipelined, self._queued))
+
+    def abort(self):
+        """Ask the running command to stop; returns False if nothing was running."""
+        with self._queue_lock:
+            if not self.busy:
+                return False
+            self.abort_requested = True
+        if self.on_abort is not None:
+            try:
+                self.on_abort()
+            except Exception as e:
+                self.log("Abort error:", e)
+        return True
+
+    def clear_queue(self):
+        """Cancel everything waiting in the queue and tell the senders; returns the count.
+
+        A command the processor has already taken but not yet started is cancelled too
+        (by its stamp), though it is not counted here.
+        """
+        with self._queue_lock:
+            self._cancelled_upto = self._queued
+        cancelled = 0
+        while True:
+            try:
+                item = self.command_queue.get_nowait()
+            except Empty:
+                break
+            if item is None:                    # shutting down: keep the sentinel
+                self.command_queue.put(None)
+                break
+            cancelled += 1
+            self._cancel(*item[:4])
+        return cancelled
+
+    def _cancel(self, command, target, request_id, pipelined):
+        if pipelined:
+            self._status(target, request_id, wire.STATUS_CANCELLED, "cancelled")
+        else:
+            try:
+                self._reply(target, request_id, "Execution error: cancelled\n")
+            except Exception as e:
+                self.log("Error sending response:", e)
+
+    # ------------------------------ network --------------------------------
+    def listener(self):
+        while self.running:
+            try:
+                conn, addr = self.server_socket.accept()
+            except OSError:
+                break
+            try:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                prefix = wire.recv_exact(conn, len(wire.MAGIC))
+                if prefix != wire.MAGIC:
+                    # One-shot client: script text until EOF, reply, close.
+                    command = _read_legacy(conn, prefix)
+            except (OSError, UnicodeDecodeError) as e:
+                # The client went away (or sent garbage) before saying anything useful:
+                # a normal disconnect, not a listener fault.
+                self.log("Connection from", addr, "dropped:", e)
+                conn.close()
+                continue
+            if prefix == wire.MAGIC:
+                self.log("Framed session from", addr)
+                self.telemetry_target = (addr[0], self.telemetry_port)
+                _thread.start_new_thread(self._session_reader, (Session(conn, addr), prefix))
+                continue
+            self.log("Received command:", command)
+            self.received("legacy", None, command)
+            self._enqueue(command, conn, None, False)
+
+    def _session_reader(self, session, prefix):
+        """Read framed requests until the PC disconnects."""
+        try:
+            while session.open:
+                msg = wire.recv_message(session.conn, prefix)
+                prefix = b""
+                if msg is None:
+                    break
+                self.handle_message(session, *msg)
+        except Exception as e:
+            self.log("Session", session.addr, "closed:", e)
+        session.close()
+
+    def handle_message(self, session, msg_type, request_id, payload):
+        if msg_type == wire.MSG_PING:
+            self.send(session, wire.MSG_PONG, request_id)
+        elif msg_type == wire.MSG_SCRIPT:
+            command = payload.decode("utf-8")
+            self.log("Received command:", command)
+            self.received("script", request_id, command)
+            self._enqueue(command, session, request_id, False)
+        elif msg_type == wire.MSG_COMMANDS:
+            try:
+                command = wire.decode_commands(payload)
+            except wire.ProtocolError as e:
+                self.send(session, wire.MSG_REPLY, request_id,
+                          "Execution error: {}\n".format(e).encode("utf-8"))
+                return
+            self.received("commands", request_id, command)
+            self._enqueue(command, session, request_id, False)
+        elif msg_type in (wire.MSG_ENQUEUE, wire.MSG_REPLACE):
+            flags = 0
+            if msg_type == wire.MSG_REPLACE:
+                flags, payload = (payload[0] if payload else 0), payload[1:]
+            try:
+                command = _decode_enqueue(payload)
+            except (wire.ProtocolError, UnicodeDecodeError) as e:
+                self.send(session, wire.MSG_STATUS, request_id,
+                          wire.pack_status(wire.STATUS_FAILED, str(e)))
+                return
+            if msg_type == wire.MSG_REPLACE:
+                self.clear_queue()
+                if flags & wire.REPLACE_ABORT_CURRENT:
+                    self.abort()
+            self.received("replace" if msg_type == wire.MSG_REPLACE else "enqueue",
+                          request_id, command)
+            # Ack before queueing so 'queued' can never arrive after 'started'.
+            self.send(session, wire.MSG_STATUS, request_id, wire.pack_status(wire.STATUS_QUEUED))
+            self._enqueue(command, session, request_id, True)
+        elif msg_type == wire.MSG_ABORT:
+            flags = payload[0] if payload else 0
+            # Empty the queue first so the processor cannot move on to a stale command.
+            cancelled = self.clear_queue() if flags & wire.ABORT_CLEAR_QUEUE else 0
+            aborted = self.abort()
+            self.send(session, wire.MSG_DEPTH, request_id,
+                      wire.DEPTH.pack(cancelled, 1 if aborted else 0))
+        elif msg_type == wire.MSG_PRIORITY:
+            # Runs right here on the reader thread, bypassing the FIFO queue.
+            try:
+                commands = wire.decode_commands(payload)
+                for op, _ in commands:
+                    if wire.OPCODES[op][0] not in wire.PRIORITY_COMMANDS:
+                        raise wire.ProtocolError("{} is not a priority command".format(
+                            wire.OPCODES[op][0]))
+                self.received("priority", request_id, commands)
+                self.abort()
+                for op, args in commands:
+                    self.dispatch[op](*args)
+                response = "Command executed successfully.\n"
+            except Exception as e:
+                response = "Execution error: {}\n".format(e)
+            self.send(session, wire.MSG_REPLY, request_id, response.encode("utf-8"))
+        elif msg_type == wire.MSG_QUERY_DEPTH:
+            self.send(session, wire.MSG_DEPTH, request_id,
+                      wire.DEPTH.pack(self.command_queue.qsize(), 1 if self.busy else 0))
+        elif msg_type == wire.MSG_QUERY_HEALTH:
+            self.send(session, wire.MSG_HEALTH, request_id, wire.pack_health(self.health()))
+        else:
+            self.log("Ignoring message type", msg_type)
+
+    def _reply(self, target, request_id, response):
+        if request_id is None:
+            try:
+                target.sendall(response.encode("utf-8"))
+            finally:
+                target.close()
+        elif target.open:
+            self.send(target, wire.MSG_REPLY, request_id, response.encode("utf-8"))
+
+    def _status(self, target, seq, status, detail=""):
+        """Report the state of pipelined command *seq*; the command runs even if the PC left."""
+        if not target.open:
+            return
+        try:
+            self.send(target, wire.MSG_STATUS, seq, wire.pack_status(status, detail))
+        except Exception as e:
+            self.log("Error sending status:", e)
+
+    def _finish(self, target, request_id, pipelined, status, detail, response):
+        if pipelined:
+            self._status(target, request_id, status, detail)
+        else:
+            try:
+                self._reply(target, request_id, response)
+            except Exception as e:
+                self.log("Error sending response:", e)
+
+    # ------------------------------ workers --------------------------------
+    def command_processor(self):
+        while True:
+            item = self.command_queue.get()
+            if item is None:
+                break
+            command, target, request_id, pipelined, stamp = item
+            with self._queue_lock:
+                stale = stamp <= self._cancelled_upto
+                if not stale:
+                    self.abort_requested = False
+                    self.busy = True
+                    self._current = item
+            if stale:                           # cleared while we were taking it
+                self._cancel(command, target, request_id, pipelined)
+                continue
+            failed = None
+            status = wire.STATUS_DONE
+            if pipelined:
+                self._status(target, request_id, wire.STATUS_STARTED)
+            try:
+                response = self.execute(command)
+            except MotionAborted as e:
+                failed, status = str(e), wire.STATUS_CANCELLED
+                response = "Execution error: {}\n".format(e)
+            except Exception as e:
+                failed, status = str(e), wire.STATUS_FAILED
+                response = "Execution error: {}\n".format(e)
+            with self._queue_lock:
+                self.busy = False
+                self._current = None
+            if failed is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._finish(target, request_id, pipelined, status, failed or "", response)
+            self.log("Finished processing command.")
+
+    def velocity_listener(self):
+        """Apply streamed wheel setpoints; stop the motors when the stream goes quiet."""
+        sock = self.velocity_socket
+        last_seq = None
+        last_time = 0.0
+        deadline = None
+        moving = False                          # the last applied setpoint was not zero
+        while self.running:
+            try:
+                data = sock.recvfrom(64)[0]
+            except socket.timeout:
+                data = None
+            except OSError:
+                break
+            now = time.time()
+            setpoint = None
+            if data is not None:
+                try:
+                    setpoint = wire.unpack_velocity(data)
+                except wire.ProtocolError:
+                    pass
+            if setpoint is not None:
+                seq, left, right, ttl_ms = setpoint
+                # Newer than the last one, or a new stream after a pause.
+                if last_seq is None or seq > last_seq or now - last_time > self.velocity_timeout_s:
+                    last_seq, last_time = seq, now
+                    if left == 0 and right == 0:
+                        # Stopped: brake once, not on every repeat (a queued command may
+                        # own the motors by now), and nothing left for the watchdog.
+                        deadline = None
+                        if moving and not self.busy:
+                            self._velocity_call(self.velocity, 0.0, 0.0)
+                        moving = False
+                    elif self.busy:
+                        # Late, or a stream resumed too early: the command keeps the motors.
+                        deadline = None
+                        moving = False
+                    else:
+                        deadline = now + min(ttl_ms / 1000.0, self.velocity_timeout_s)
+                        moving = True
+                        self._velocity_call(self.velocity, left, right)
+            if deadline is not None and now > deadline:
+                deadline = None
+                moving = False
+                if self.busy:
+                    self.log("Velocity stream timed out while a command runs, leaving it")
+                else:
+                    self.log("Velocity stream timed out, stopping")
+                    self._velocity_call(self.velocity_stop)
+
+    def _velocity_call(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            self.log("Velocity error:", e)
+
+    def telemetry_publisher(self):
+        """Send a motor sample to the PC every 1/telemetry_hz s (UDP, fire and forget)."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        period = 1.0 / self.telemetry_hz
+        seq = 0
+        next_t = time.time()
+        while self.running:
+            next_t += period
+            target = self.telemetry_target
+            if target is not None:
+                try:
+                    t0 = time.time()
+                    values, states = self.telemetry()
+                    t = (t0 + time.time()) / 2      # sysfs reads take a few ms
+                    sample = (seq, t) + tuple(values) + (wire.motor_flags(states),)
+                    sock.sendto(wire.pack_telemetry(sample), target)
+                    seq += 1
+                except Exception as e:
+                    self.log("Telemetry error:", e)
+            delay = next_t - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.time()                # fell behind: skip, don't burst
+        sock.close()
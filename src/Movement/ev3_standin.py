@@ -0,0 +1,315 @@
+"""
+ev3_standin.py – The brick's command server running on the PC against the simulator.
+
+`Ev3StandIn` is :class:`Movement.ev3_server.CommandServer` (the exact protocol code of
+``Movement/main.py``) with the hardware primitives replaced by `SimulatedEV3` ones.  Each
+primitive blocks for the duration :mod:`Movement.drive_model` predicts, so clients see
+realistic timing.  Network trouble can be injected with :class:`Faults`, and every command
+received is recorded in :attr:`Ev3StandIn.received_commands`.  Streamed wheel setpoints
+(see :mod:`Movement.velocity_stream`) drive the simulator in real time.
+
+```python
+with Ev3StandIn(faults=Faults(latency_s=0.02, drop_rate=0.01)) as brick:
+    session = Ev3Session("127.0.0.1", brick.port)
+    session.request("drive_straight_mm(100)\\n")
+```
+
+or from a shell, in place of the brick::
+
+    python src/Movement/ev3_standin.py --port 5532 --latency 0.02 --drop 0.01
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from Movement import wire
+from Movement.ev3_server import CommandServer, MotionAborted
+from Movement.simulator import SimulatedEV3
+
+__all__ = [
+    "Faults",
+    "ReceivedCommand",
+    "Ev3StandIn",
+]
+
+DEFAULT_PORT = 5532     # same as Movement/main.py
+
+
+@dataclass
+class Faults:
+    """Adverse conditions, all off by default."""
+
+    latency_s: float = 0.0         # added to every frame the server sends
+    jitter_s: float = 0.0          # extra uniform 0..jitter_s delay (frames stay in order)
+    drop_rate: float = 0.0         # probability a reply/status frame is never sent
+    error_rate: float = 0.0        # probability a command fails instead of running
+    disconnect_rate: float = 0.0   # probability a request makes the server hang up
+    seed: Optional[int] = None
+
+
+@dataclass
+class ReceivedCommand:
+    t: float                       # time.time() when it was queued
+    kind: str                      # 'script', 'commands', 'enqueue', 'replace', 'priority' or 'legacy'
+    request_id: Optional[int]
+    command: object                # script text or [(name, args), ...]
+
+
+_SCALED_FIRST_ARG = {"drive_straight_mm", "reverse_drive_mm", "turn_deg",
+                     "turn_left_deg", "turn_right_deg"}
+
+
+def _partial_args(name: str, args: tuple, frac: float) -> Optional[tuple]:
+    """Arguments that redo the first *frac* of a motion primitive (None: nothing to redo)."""
+    if name in _SCALED_FIRST_ARG:
+        return (args[0] * frac,) + tuple(args[1:])
+    if name in ("arc_left_mm", "arc_right_mm"):
+        return (args[0], args[1] * frac) + tuple(args[2:])
+    if name == "drive_path":
+        budget = frac * sum(abs(d) for d in args[1::2])
+        partial: list = []
+        for radius, distance in zip(args[::2], args[1::2]):
+            if budget <= 0:
+                break
+            step = min(abs(distance), budget)
+            partial += [radius, step if distance >= 0 else -step]
+            budget -= step
+        return tuple(partial)
+    return None                     # gate/push motors: treat as done
+
+
+class Ev3StandIn(CommandServer):
+    """Simulated brick on a local TCP port (port 0 picks a free one, see :attr:`port`)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *,
+                 sim: Optional[SimulatedEV3] = None, faults: Optional[Faults] = None,
+                 time_scale: float = 1.0, telemetry: bool = True,
+                 telemetry_hz: int = 20, telemetry_port: int = wire.TELEMETRY_PORT,
+                 velocity_port: Optional[int] = 0,
+                 verbose: bool = False):
+        self.sim = sim if sim is not None else SimulatedEV3()
+        self.faults = faults if faults is not None else Faults()
+        self.time_scale = time_scale
+        self.verbose = verbose
+        self.received_commands: list[ReceivedCommand] = []
+        self.dropped = 0
+        self.injected_errors = 0
+        self.disconnects = 0
+        self._rng = random.Random(self.faults.seed)
+        self._sim_lock = threading.Lock()
+        self._motion = None                  # (start, duration, wheels before, wheels after)
+        self._drive_cut = False              # a zero setpoint braked the running drive
+        self._stream_t = time.monotonic()    # sim integrated up to here while streaming
+        self._outbox: queue.Queue = queue.Queue()
+        self._last_due = 0.0
+        namespace = {name: self._timed(fn) for name, fn in self.sim.namespace().items()}
+        super().__init__(host, port, namespace,
+                         telemetry=self._sample_wheels if telemetry else None,
+                         telemetry_hz=telemetry_hz, telemetry_port=telemetry_port,
+                         velocity=self._set_velocity if velocity_port is not None else None,
+                         velocity_port=velocity_port or 0,
+                         velocity_timeout_s=self.sim.stream_timeout_s, backlog=8)
+
+    @property
+    def port(self) -> int:
+        return self.address[1]
+
+    @property
+    def velocity_port(self) -> Optional[int]:
+        """UDP port for streamed setpoints (None if streaming is disabled)."""
+        return None if self.velocity_socket is None else self.velocity_socket.getsockname()[1]
+
+    def start(self) -> "Ev3StandIn":
+        threading.Thread(target=self._sender, daemon=True).start()
+        return super().start()
+
+    def close(self) -> None:
+        super().close()
+        self._outbox.put(None)
+
+    def __enter__(self) -> "Ev3StandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------ simulated hardware ---------------------
+    def _timed(self, fn):
+        """Wrap a simulator primitive so it takes its modelled time in real time.
+
+        Like the brick's primitives it polls :attr:`abort_requested` while "moving"; an
+        abort rewinds the simulator to the part of the motion done so far and raises
+        :class:`MotionAborted`.  A zero wheel setpoint cuts a drive the same way but, as
+        ``mdiff.off`` does under ``_wait_motion`` on the brick, the primitive then returns
+        as if it had finished.
+        """
+        def run(*args, **kwargs):
+            drives = _partial_args(fn.__name__, args, 1.0) is not None
+            with self._sim_lock:
+                self._drive_cut = False
+                snapshot = self._snapshot()
+                clock, before = self.sim.clock, tuple(self.sim.wheel_deg)
+                fn(*args, **kwargs)
+                duration = (self.sim.clock - clock) * self.time_scale
+                started = time.time()
+                self._motion = (started, duration, before, tuple(self.sim.wheel_deg))
+            end = time.monotonic() + duration
+            while True:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    return
+                if self.abort_requested or (drives and self._drive_cut):
+                    break
+                time.sleep(min(remaining, 0.01))
+            with self._sim_lock:
+                frac = 1.0 - remaining / duration
+                self._restore(snapshot)
+                partial = _partial_args(fn.__name__, args, frac)
+                if partial is not None:
+                    fn(*partial, **kwargs)
+                self._motion = (started, time.time() - started, before,
+                                tuple(self.sim.wheel_deg))
+            if not self.abort_requested:
+                return                               # braked from outside: looks finished
+            raise MotionAborted("aborted")
+        run.__name__ = fn.__name__
+        return run
+
+    def _snapshot(self):
+        sim = self.sim
+        return (sim.x, sim.y, sim.heading, list(sim.wheel_deg), sim.clock,
+                len(sim.history), sim.collisions)
+
+    def _restore(self, snapshot) -> None:
+        sim = self.sim
+        sim.x, sim.y, sim.heading, sim.wheel_deg, sim.clock, n, sim.collisions = snapshot
+        del sim.history[n:]
+
+    def sync(self) -> None:
+        """Integrate streamed wheel speeds up to now (real time)."""
+        with self._sim_lock:
+            now = time.monotonic()
+            dt, self._stream_t = now - self._stream_t, now
+            if self.sim.wheel_speed_dps != (0.0, 0.0):
+                self.sim.advance(dt)
+
+    def _set_velocity(self, left_dps: float, right_dps: float) -> None:
+        self.sync()
+        with self._sim_lock:
+            self.sim.set_wheel_speeds(left_dps, right_dps)
+            if left_dps == 0 and right_dps == 0:
+                self._drive_cut = True               # brakes a running drive too
+
+    def _sample_wheels(self):
+        self.sync()
+        wheels = self.sim.wheel_deg
+        speeds = self.sim.wheel_speed_dps
+        values = [int(round(wheels[0])), int(round(speeds[0])),
+                  int(round(wheels[1])), int(round(speeds[1])), 0, 0, 0, 0]
+        streaming = ["running"] if speeds != (0.0, 0.0) else []
+        states = [streaming, streaming, [], []]
+        motion = self._motion
+        if motion is None:
+            return values, states
+        start, duration, before, after = motion
+        frac = 1.0 if duration <= 0 else min(max((time.time() - start) / duration, 0.0), 1.0)
+        if frac < 1.0:                               # a blocking primitive is still running
+            for i in range(2):
+                values[2 * i] = int(round(before[i] + frac * (after[i] - before[i])))
+                values[2 * i + 1] = int(round((after[i] - before[i]) / duration))
+                states[i] = ["running"]
+        return values, states
+
+    # ------------------------------ server hooks ---------------------------
+    def log(self, *args) -> None:
+        if self.verbose:
+            print(*args)
+
+    def received(self, kind, request_id, command) -> None:
+        if isinstance(command, list):
+            command = [(wire.OPCODES[op][0], args) for op, args in command]
+        self.received_commands.append(ReceivedCommand(time.time(), kind, request_id, command))
+
+    def handle_message(self, session, msg_type, request_id, payload) -> None:
+        if (msg_type != wire.MSG_PING and self.faults.disconnect_rate
+                and self._rng.random() < self.faults.disconnect_rate):
+            self.disconnects += 1
+            session.close()
+            return
+        super().handle_message(session, msg_type, request_id, payload)
+
+    def execute(self, command):
+        if self.faults.error_rate and self._rng.random() < self.faults.error_rate:
+            self.injected_errors += 1
+            raise RuntimeError("injected error")
+        return super().execute(command)
+
+    def send(self, session, msg_type, request_id, payload=b"") -> None:
+        f = self.faults
+        if (msg_type in (wire.MSG_REPLY, wire.MSG_STATUS) and f.drop_rate
+                and self._rng.random() < f.drop_rate):
+            self.dropped += 1
+            return
+        delay = f.latency_s + (self._rng.uniform(0.0, f.jitter_s) if f.jitter_s else 0.0)
+        if delay <= 0:
+            session.send(msg_type, request_id, payload)
+            return
+        # TCP never reorders, so jitter only ever pushes a frame further back.
+        due = max(time.monotonic() + delay, self._last_due)
+        self._last_due = due
+        self._outbox.put((due, session, msg_type, request_id, payload))
+
+    def _sender(self) -> None:
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            due, session, msg_type, request_id, payload = item
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            if session.open:
+                try:
+                    session.send(msg_type, request_id, payload)
+                except OSError:
+                    pass
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Simulated EV3 command server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added per frame")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--drop", type=float, default=0.0, help="reply drop probability")
+    parser.add_argument("--error", type=float, default=0.0, help="command failure probability")
+    parser.add_argument("--disconnect", type=float, default=0.0)
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="multiply modelled command durations (0 = instant)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    faults = Faults(args.latency, args.jitter, args.drop, args.error, args.disconnect, args.seed)
+    brick = Ev3StandIn(args.host, args.port, faults=faults, time_scale=args.time_scale,
+                       velocity_port=wire.VELOCITY_PORT, verbose=args.verbose).start()
+    print("EV3 stand-in listening on {}:{}".format(*brick.address))
+    brick.serve_forever()
+    print("{} commands, {} dropped, {} injected errors, {} disconnects; pose {}".format(
+        len(brick.received_commands), brick.dropped, brick.injected_errors,
+        brick.disconnects, brick.sim.pose))
+
+
+if __name__ == "__main__":
+    main()
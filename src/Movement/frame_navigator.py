@@ -1,11 +1,24 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple, Union
 import cv2
 
-from track_robot import get_robot_pose
+from ImageRecognition.track_robot import get_robot_pose
 from PathFinding.ArrowVector import ArrowVector
-from AutonomousClient import send_and_receive
+from PathFinding.PurePursuit import PurePursuit
+from Movement.AutonomousClient import send_and_receive
+from Movement import drive_model as dm
+from Movement.commands import CAPTURE, CommandSequence
+from Movement.pose_prediction import PosePredictor
 
 
 # --- helper ---------------------------------------------------------------
@@ -36,55 +49,299 @@ def calculate_next_command(robot_pos: Tuple[int, int], heading_deg: float,
             return f"turn_right_deg({abs(int(diff))})\n"
         return f"turn_left_deg({abs(int(diff))})\n"
 
-    if distance > capture_distance:
-        step = min(step_mm, distance - capture_distance)
-        return f"drive_straight_mm({int(step)})\n"
+    step = int(min(step_mm, distance - capture_distance))
+    if step > 0:                       # a sub-millimetre remainder counts as arrived
+        return f"drive_straight_mm({step})\n"
 
     return "capture"
 
 
+def calculate_wheel_speeds(robot_pos: Tuple[int, int], heading_deg: float,
+                           target_pos: Tuple[int, int], *,
+                           angle_threshold: float = 10.0,
+                           capture_distance: float = 80.0,
+                           max_speed_mm_s: float = 150.0,
+                           turn_gain: float = 3.0,
+                           max_turn_deg_s: float = 120.0,
+                           slow_radius: float = 200.0) -> Union[Tuple[float, float], str]:
+    """Streaming counterpart of `calculate_next_command`.
+
+    Returns ``(left_dps, right_dps)`` that steer towards *target_pos*, or "capture".
+    The turn rate is proportional to the heading error; forward speed falls off with
+    the heading error (none beyond 90°) and within *slow_radius* of the capture point.
+    """
+    vector = ArrowVector(robot_pos, target_pos)
+    distance = vector.get_size()
+
+    diff = (vector.get_angle() - heading_deg + 360) % 360
+    if diff > 180:
+        diff -= 360
+
+    if distance <= capture_distance and abs(diff) <= angle_threshold:
+        return "capture"
+
+    turn = max(-max_turn_deg_s, min(max_turn_deg_s, turn_gain * diff))
+    if distance <= capture_distance:
+        speed = 0.0                                   # close enough: turn in place
+    else:
+        approach = min(1.0, max(0.25, (distance - capture_distance) / slow_radius))
+        speed = max_speed_mm_s * max(0.0, math.cos(math.radians(diff))) * approach
+    return dm.wheel_speeds_dps(speed, turn)
+
+
+@dataclass
+class AdaptiveStepPolicy:
+    """Drop-in for `calculate_next_command` that sizes steps and tolerances to the situation.
+
+    The angle tolerance is the heading error that still brings the ball within
+    *capture_tolerance_mm* of the gate if the robot drove straight to it – tight far away,
+    loose close up.  Within it the whole leg is driven in one command.  Far away, headings
+    that are good enough to drive but not to arrive get a partial step (*step_fraction* of
+    the leg, less when the pose is unreliable) and a correction later – unless the rest of
+    the leg would take less time than the round trip the correction costs.
+    """
+
+    capture_distance: float = 80.0
+    capture_tolerance_mm: float = 20.0     # lateral miss the gate still catches
+    min_angle_deg: float = 3.0             # never correct finer than this (pose noise)
+    max_angle_deg: float = 25.0
+    step_fraction: float = 0.85
+    min_step_mm: float = 15.0
+    max_step_mm: float = 1500.0
+    speed_rpm: float = dm.DEFAULT_DRIVE_RPM
+
+    def angle_tolerance(self, distance: float) -> float:
+        tol = math.degrees(math.atan2(self.capture_tolerance_mm, max(distance, 1.0)))
+        return min(max(tol, self.min_angle_deg), self.max_angle_deg)
+
+    def next_command(self, robot_pos: Tuple[int, int], heading_deg: float,
+                     target_pos: Tuple[int, int], *, confidence: float = 1.0,
+                     latency_s: float = 0.0) -> str:
+        """Same contract as `calculate_next_command`.
+
+        *confidence* (0..1) is how much the pose can be trusted, e.g. the share of recent
+        frames in which the robot was found; *latency_s* is the measured per-command
+        overhead on top of the modelled motion time.
+        """
+        vector = ArrowVector(robot_pos, target_pos)
+        distance = vector.get_size()
+        diff = (vector.get_angle() - heading_deg + 360) % 360
+        if diff > 180:
+            diff -= 360
+
+        if abs(diff) > self.angle_tolerance(distance):
+            turn = max(1, int(round(abs(diff))))
+            return f"turn_right_deg({turn})\n" if diff > 0 else f"turn_left_deg({turn})\n"
+
+        remaining = distance - self.capture_distance
+        if remaining < 1.0:
+            return "capture"
+        miss = remaining * math.sin(math.radians(abs(diff)))
+        step = remaining
+        if miss > self.capture_tolerance_mm:
+            step = remaining * self.step_fraction * min(max(confidence, 0.3), 1.0)
+            rest_s = dm.drive_time_s(remaining - step, self.speed_rpm)
+            correction_s = latency_s + dm.COMMAND_OVERHEAD_S + dm.turn_time_s(abs(diff))
+            if rest_s < correction_s:
+                step = remaining
+        step = min(max(step, min(self.min_step_mm, remaining)), self.max_step_mm)
+        return f"drive_straight_mm({int(math.ceil(step))})\n"
+
+
 # --- main navigation class -----------------------------------------------
 
+CAPTURE_SEQ = CAPTURE.script()
+
+
 class FrameNavigator:
     def __init__(self, balls: List[Tuple[int, int]], *,
                  angle_threshold: float = 10.0,
                  capture_distance: float = 80.0,
                  step_mm: float = 80.0,
-                 video_src: int = 0):
+                 video_src: int = 0,
+                 capture=None,
+                 send: Optional[Callable[[str], str]] = None,
+                 mode: str = "step",
+                 drive: Optional[Callable[[float, float], None]] = None,
+                 max_speed_mm_s: float = 150.0,
+                 predictor: Optional[PosePredictor] = None,
+                 policy: Optional[AdaptiveStepPolicy] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 frame_clock: Optional[Callable[[], float]] = None,
+                 homography=None):
+        """*capture* replaces the camera and *send* replaces `send_and_receive`,
+        e.g. with `Movement.simulator.SimulatedCamera` / `SimulatedEV3.send_and_receive`.
+
+        *mode* "step" sends one discrete command per frame; "stream" steers continuously
+        through *drive(left_dps, right_dps)* – by default a `VelocityStreamer` – and only
+        uses *send* for the capture sequence.
+
+        With a *predictor* every frame is timestamped with *frame_clock* (default: *clock*
+        right after the read) and commands are computed from the pose predicted for when
+        they will run.  In simulation pass ``clock=lambda: sim.clock`` and
+        ``frame_clock=camera.frame_time``.
+
+        A *policy* (`AdaptiveStepPolicy`) replaces the fixed thresholds of
+        `calculate_next_command` in step mode; it is fed the share of recent frames with a
+        pose and the measured command latency (:attr:`command_latency_s`).
+
+        With a *homography* (image pixels → arena mm) poses are tracked sub-pixel in arena
+        millimetres, see `get_robot_pose`; *balls* must then be in arena mm too.
+        """
+        if mode not in ("step", "stream"):
+            raise ValueError(f"unknown mode {mode!r}")
         self.balls = list(balls)
         self.angle_threshold = angle_threshold
         self.capture_distance = capture_distance
         self.step_mm = step_mm
-        self.cap = cv2.VideoCapture(video_src)
+        self.max_speed_mm_s = max_speed_mm_s
+        self.mode = mode
+        self.cap = capture if capture is not None else cv2.VideoCapture(video_src)
+        self.send = send or send_and_receive
+        self._streamer = None
+        if mode == "stream" and drive is None:
+            from Movement.velocity_stream import VelocityStreamer
+            self._streamer = VelocityStreamer().start()
+            drive = self._streamer.set
+        self.drive = drive
+        self.predictor = predictor
+        self.clock = clock
+        self.frame_clock = frame_clock or clock
+        self.policy = policy
+        self.homography = homography
+        self.commands_sent = 0
+        self.command_latency_s = 0.0          # round trip minus modelled motion (EWMA)
+        self._tracked: deque = deque(maxlen=30)
 
     def close(self) -> None:
+        if self.drive is not None:
+            self.drive(0.0, 0.0)
+        if self._streamer is not None:
+            self._streamer.close()
+            self._streamer = None
         if self.cap:
             self.cap.release()
             self.cap = None
 
+    def _stream_step(self, pose, target) -> bool:
+        """Update the wheel speeds for one frame; True once *target* was captured."""
+        if not pose:
+            self.drive(0.0, 0.0)                      # blind: stop until the markers are back
+            return False
+        (cx, cy), heading = pose
+        speeds = calculate_wheel_speeds((cx, cy), heading, target,
+                                        angle_threshold=self.angle_threshold,
+                                        capture_distance=self.capture_distance,
+                                        max_speed_mm_s=self.max_speed_mm_s)
+        if speeds == "capture":
+            self._halt()
+            self._send(CAPTURE)
+            return True
+        self.drive(*speeds)
+        return False
+
+    def _halt(self) -> None:
+        """Stop the wheels for good before a queued command takes the motors."""
+        if self._streamer is not None:
+            self._streamer.halt()             # no zero repeats arriving during the capture
+        else:
+            self.drive(0.0, 0.0)
+
+    def follow_path(self, waypoints: List[Tuple[int, int]], *, step_mm: float = 150.0,
+                    pursuit: Optional[PurePursuit] = None) -> bool:
+        """Drive through *waypoints* without stopping at each one; True once the end is reached.
+
+        Steering comes from a `PurePursuit` controller (one is built from the first pose
+        unless given): arc commands of up to *step_mm* in "step" mode, continuous wheel
+        speeds in "stream" mode.  The camera stays open, so `run` can follow on.
+        """
+        while self.cap.isOpened():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            pose = self._pose(frame)
+            if not pose:
+                if self.mode == "stream":
+                    self.drive(0.0, 0.0)
+                continue
+            if pursuit is None:
+                pursuit = PurePursuit(waypoints, start=pose[0])
+            if self.mode == "stream":
+                speed, rate = pursuit.body_velocity(pose, self.max_speed_mm_s)
+                self.drive(*dm.wheel_speeds_dps(speed, rate))
+                if pursuit.done:
+                    self._halt()
+                    return True
+                continue
+            script = pursuit.next_script(pose, step_mm)
+            if not script:
+                return True
+            self._send(script)
+        return False
+
     def run(self) -> None:
         idx = 0
         while idx < len(self.balls) and self.cap.isOpened():
             ret, frame = self.cap.read()
             if not ret:
                 break
-            pose = get_robot_pose(frame)
+            pose = self._pose(frame)
+            if self.mode == "stream":
+                if self._stream_step(pose, self.balls[idx]):
+                    idx += 1
+                continue
             if not pose:
                 continue
             (cx, cy), heading = pose
-            cmd = calculate_next_command((cx, cy), heading, self.balls[idx],
-                                         angle_threshold=self.angle_threshold,
-                                         capture_distance=self.capture_distance,
-                                         step_mm=self.step_mm)
+            if self.policy is not None:
+                cmd = self.policy.next_command((cx, cy), heading, self.balls[idx],
+                                               confidence=self.tracking_rate,
+                                               latency_s=self.command_latency_s)
+            else:
+                cmd = calculate_next_command((cx, cy), heading, self.balls[idx],
+                                             angle_threshold=self.angle_threshold,
+                                             capture_distance=self.capture_distance,
+                                             step_mm=self.step_mm)
             if cmd == "capture":
-                capture_seq = (
-                    "open_gate()\n"
-                    "drive_straight_mm(50)\n"
-                    "close_gate()\n"
-                )
-                send_and_receive(capture_seq)
+                self._send(CAPTURE)
                 idx += 1
             else:
-                send_and_receive(cmd)
+                self._send(cmd)
         self.close()
 
+    def _pose(self, frame):
+        """Tracked pose of *frame*, or with a predictor the pose when the next command runs."""
+        pose = get_robot_pose(frame, homography=self.homography)
+        self._tracked.append(bool(pose))
+        if self.predictor is None:
+            return pose
+        self.predictor.observe(self.frame_clock(), pose)
+        if not pose:
+            return pose
+        return self.predictor.predict(self.clock() + self.predictor.lead_s)
+
+    @property
+    def tracking_rate(self) -> float:
+        """Share of the last frames in which the robot was found (1.0 before any frame)."""
+        return sum(self._tracked) / len(self._tracked) if self._tracked else 1.0
+
+    def _send(self, script: Union[str, CommandSequence]) -> str:
+        """Send script text or a `CommandSequence`; text is parsed once for the timing model."""
+        if isinstance(script, CommandSequence):
+            commands, script = script, script.script()
+        else:
+            commands = CommandSequence.parse(script)
+        self.commands_sent += 1
+        t0 = self.clock()
+        if self.predictor is not None:
+            self.predictor.command_sent(t0, script if commands is None else commands)
+        reply = self.send(script)
+        t1 = self.clock()
+        if self.predictor is not None:
+            self.predictor.command_done(t1)
+        modelled = None if commands is None else commands.duration_s()
+        if modelled is not None:
+            overhead = max(0.0, t1 - t0 - modelled)
+            self.command_latency_s += 0.3 * (overhead - self.command_latency_s)
+        return reply
+
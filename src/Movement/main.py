@@ -4,38 +4,54 @@ drive_utils.py  – Straight, reverse and in-place turns with ev3dev2.
 Works with any wheel class once you give its diameter.
 """
 
-import socket, _thread, time
-from queue import Queue
+import time
+
+import wire
+from ev3_server import CommandServer, MotionAborted
 
 # ── Imports ───────────────────────────────────────────────────────────
 from ev3dev2.tool import Tool
-from ev3dev2.motor import Motor, OUTPUT_A, OUTPUT_B, OUTPUT_C, OUTPUT_D, MoveDifferential, SpeedRPM
+from ev3dev2.motor import Motor, OUTPUT_A, OUTPUT_B, OUTPUT_C, OUTPUT_D, MoveDifferential, SpeedRPM, SpeedDPS
 from ev3dev2.wheel import Wheel
 
-# ----------------------------------------------------------------------
-# hardware
-# ----------------------------------------------------------------------
-Motor_GATE  = Motor(OUTPUT_D)
-print("Motor_GATE initialized")
-Motor_PUSH  = Motor(OUTPUT_A)
-print("Motor_PUSH initialized")
-
 # ── Constants you set once ────────────────────────────────────────────
 STUD_MM            = 8.0
 WHEEL_DISTANCE_MM  = 50.0
+HARDWARE_RETRY_S   = 1.0
 
 # ── Wheel geometry (68.8 × 36 ZR tyre) ────────────────────────────────
 class Tire68836ZR(Wheel):
     def __init__(self):
         super().__init__(68.8, 36.0)
 
-# ── Drive base object --------------------------------------------------
-mdiff = MoveDifferential(
-    OUTPUT_B, OUTPUT_C,
-    Tire68836ZR,
-    WHEEL_DISTANCE_MM
-)
-print("MoveDifferential initialized with wheels on ports B and C.")
+# ----------------------------------------------------------------------
+# hardware – opened once by init_hardware() and kept for the whole run;
+# the server restarts crashed workers without touching these.
+# ----------------------------------------------------------------------
+Motor_GATE = None
+Motor_PUSH = None
+mdiff = None
+server = None
+
+def init_hardware():
+    """Open the motors, retrying until every port answers (a loose cable is not fatal)."""
+    global Motor_GATE, Motor_PUSH, mdiff
+    while True:
+        try:
+            Motor_GATE = Motor(OUTPUT_D)
+            print("Motor_GATE initialized")
+            Motor_PUSH = Motor(OUTPUT_A)
+            print("Motor_PUSH initialized")
+            mdiff = MoveDifferential(
+                OUTPUT_B, OUTPUT_C,
+                Tire68836ZR,
+                WHEEL_DISTANCE_MM
+            )
+            print("MoveDifferential initialized with wheels on ports B and C.")
+            return
+        except Exception as err:
+            print("Hardware not ready, retrying:", err)
+            time.sleep(HARDWARE_RETRY_S)
 
 def wait_until_stopped(timeout_ms: int = 300):
     start_time = time.time()
@@ -46,14 +62,37 @@ def wait_until_stopped(timeout_ms: int = 300):
         if not left_running and not right_running:
             stopped = True
             break
-        time.sleep(0.05)
+        time.sleep(0.01)
     if not stopped:
         print("Warning: Motors did not stop within timeout.")
 
+def _wait_motion() -> None:
+    """Block until both drive motors stop; brake and raise if the server asks to abort.
+
+    Motions are started with block=False and waited for here so a priority stop or
+    an abort from the PC can cut them short (see CommandServer.abort).
+    """
+    mdiff.left_motor.wait_until('running', timeout=100)   # as ev3dev2 does with block=True
+    while ('running' in mdiff.left_motor.state
+           or 'running' in mdiff.right_motor.state):
+        if server.abort_requested:
+            mdiff.off(brake=True)
+            raise MotionAborted("aborted")
+        time.sleep(0.01)
+
 def _apply_ramps(ramp_ms: int) -> None:
+    _set_ramps(ramp_ms, ramp_ms)
+
+_ramps = None
+
+def _set_ramps(up_ms: int, down_ms: int) -> None:
+    global _ramps
+    if _ramps == (up_ms, down_ms):
+        return                      # every write is a sysfs round trip
     for m in (mdiff.left_motor, mdiff.right_motor):
-        m.ramp_up_sp = ramp_ms
-        m.ramp_down_sp = ramp_ms
+        m.ramp_up_sp = up_ms
+        m.ramp_down_sp = down_ms
+    _ramps = (up_ms, down_ms)
 
 def drive_straight_mm(distance_mm: float,
                       speed_rpm: float = 60,
@@ -61,8 +100,10 @@ def drive_straight_mm(distance_mm: float,
                       brake: bool = True,
                       block: bool = True) -> None:
     _apply_ramps(ramp_ms)
-    mdiff.on_for_distance(SpeedRPM(speed_rpm), distance_mm, brake=brake, block=block)
-    wait_until_stopped(timeout_ms=300)
+    mdiff.on_for_distance(SpeedRPM(speed_rpm), distance_mm, brake=brake, block=False)
+    if block:
+        _wait_motion()
+        wait_until_stopped(timeout_ms=300)
 
 def reverse_drive_mm(distance_mm: float,
                      speed_rpm: float = 60,
@@ -79,14 +120,84 @@ def turn_deg(angle_deg: float,
              block: bool = True) -> None:
     _apply_ramps(ramp_ms)
     if angle_deg >= 0:
-        mdiff.turn_right(SpeedRPM(speed_rpm), angle_deg, brake=brake, block=block)
+        mdiff.turn_right(SpeedRPM(speed_rpm), angle_deg, brake=brake, block=False)
     else:
-        mdiff.turn_left(SpeedRPM(speed_rpm), -angle_deg, brake=brake, block=block)
+        mdiff.turn_left(SpeedRPM(speed_rpm), -angle_deg, brake=brake, block=False)
+    if block:
+        _wait_motion()
+        wait_until_stopped(timeout_ms=300)
+
+def arc_right_mm(radius_mm: float,
+                 distance_mm: float,
+                 speed_rpm: float = 60,
+                 ramp_ms: int = 300,
+                 brake: bool = True,
+                 block: bool = True) -> None:
+    """Drive *distance_mm* (robot centre) along a clockwise arc of *radius_mm*."""
+    _apply_ramps(ramp_ms)
+    mdiff.on_arc_right(SpeedRPM(speed_rpm), radius_mm, distance_mm, brake=brake, block=False)
+    if block:
+        _wait_motion()
+        wait_until_stopped(timeout_ms=300)
+
+def arc_left_mm(radius_mm: float,
+                distance_mm: float,
+                speed_rpm: float = 60,
+                ramp_ms: int = 300,
+                brake: bool = True,
+                block: bool = True) -> None:
+    """Drive *distance_mm* (robot centre) along a counter-clockwise arc of *radius_mm*."""
+    _apply_ramps(ramp_ms)
+    mdiff.on_arc_left(SpeedRPM(speed_rpm), radius_mm, distance_mm, brake=brake, block=False)
+    if block:
+        _wait_motion()
+        wait_until_stopped(timeout_ms=300)
+
+def drive_path(*segments, speed_rpm=60, ramp_ms=300):
+    """Drive (radius_mm, distance_mm) pairs as one motion: ramp and brake only at the ends.
+
+    radius 0 = straight, > 0 = arc right, < 0 = arc left.  Built by
+    CommandLoop.drive_polyline.
+    """
+    if len(segments) % 2:
+        raise ValueError("drive_path takes (radius_mm, distance_mm) pairs")
+    n = len(segments) // 2
+    speed = SpeedRPM(speed_rpm)
+    for i in range(n):
+        radius, distance = segments[2 * i], segments[2 * i + 1]
+        last = i == n - 1
+        _set_ramps(ramp_ms if i == 0 else 0, ramp_ms if last else 0)
+        if radius == 0:
+            mdiff.on_for_distance(speed, distance, brake=last, block=False)
+        elif radius > 0:
+            mdiff.on_arc_right(speed, radius, distance, brake=last, block=False)
+        else:
+            mdiff.on_arc_left(speed, -radius, distance, brake=last, block=False)
+        _wait_motion()
     wait_until_stopped(timeout_ms=300)
 
+STREAM_RAMP_MS = 100
+MAX_SPEED_DPS = 1050
+
+def set_wheel_speeds(left_dps, right_dps):
+    """Streaming control: run the drive motors at the given speeds until the next setpoint."""
+    if left_dps == 0 and right_dps == 0:
+        mdiff.off(brake=True)
+        return
+    _set_ramps(STREAM_RAMP_MS, STREAM_RAMP_MS)
+    left_dps = max(-MAX_SPEED_DPS, min(MAX_SPEED_DPS, left_dps))
+    right_dps = max(-MAX_SPEED_DPS, min(MAX_SPEED_DPS, right_dps))
+    mdiff.on(SpeedDPS(left_dps), SpeedDPS(right_dps))
+
 def stop_drive(brake: bool = True) -> None:
     mdiff.off(brake=brake)
 
+def stop_all():
+    """Abort hook: stop every motor at once, from the server's reader thread."""
+    mdiff.off(brake=True)
+    Motor_GATE.off()
+    Motor_PUSH.off()
+
 def turn_right_deg(angle_deg):
     Motor_GATE.off()
     Motor_PUSH.off()
@@ -140,65 +251,53 @@ def push_return():
     return
 
 # ----------------------------------------------------------------------
-# TCP server
+# TCP server (protocol and queue live in ev3_server.py)
 # ----------------------------------------------------------------------
 HOST = "192.168.147.36"
 PORT = 5532
+TELEMETRY_HZ = 20
 
-server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-server_socket.bind((HOST, PORT))
-server_socket.listen(1)
+def exec_namespace():
+    """Names text scripts may use (hardware objects included, so after init_hardware)."""
+    return {
+        "turn_left_deg": turn_left_deg,
+        "turn_right_deg": turn_right_deg,
+        "drive_straight_mm": drive_straight_mm,
+        "reverse_drive_mm": reverse_drive_mm,
+        "open_gate": open_gate,
+        "close_gate": close_gate,
+        "push_out": push_out,
+        "push_return": push_return,
+        "stop_drive": stop_drive,
+        "arc_left_mm": arc_left_mm,
+        "arc_right_mm": arc_right_mm,
+        "drive_path": drive_path,
+        "mdiff": mdiff,
+        "Motor_GATE": Motor_GATE,
+        "Motor_PUSH": Motor_PUSH,
+    }
 
-command_queue = Queue()
+# Binary opcodes (wire.OPCODES) -> primitives; text scripts keep using exec as a debug fallback.
+DISPATCH = dict((op, globals()[name]) for op, (name, _) in wire.OPCODES.items())
 
-def listener():
-    while True:
-        conn, addr = server_socket.accept()
-        command_data = b""
-        while True:
-            data = conn.recv(1024)
-            if not data:
-                break
-            command_data += data
-        command = command_data.decode("utf-8")
-        print("Received command:", command)
-        command_queue.put((command, conn))
-
-def command_processor():
-    while True:
-        command, conn = command_queue.get()
-        exec_namespace = {
-            "turn_left_deg": turn_left_deg,
-            "turn_right_deg": turn_right_deg,
-            "drive_straight_mm": drive_straight_mm,
-            "reverse_drive_mm": reverse_drive_mm,
-            "open_gate": open_gate,
-            "close_gate": close_gate,
-            "push_out": push_out,
-            "push_return": push_return,
-            "stop_drive": stop_drive,
-            "mdiff": mdiff,
-            "Motor_GATE": Motor_GATE,
-            "Motor_PUSH": Motor_PUSH,
-        }
-        try:
-            exec(command, exec_namespace)
-            response = "Command executed successfully.\n {command}".format(command=command)
-        except Exception as e:
-            response = "Execution error: {}\n".format(e)
-        try:
-            conn.sendall(response.encode("utf-8"))
-        except Exception as e:
-            print("Error sending response:", e)
-        conn.close()
-        print("Finished processing command.")
-
-try:
-    _thread.start_new_thread(listener, ())
-    _thread.start_new_thread(command_processor, ())
-except Exception as err:
-    print("Error starting threads:", err)
-
-while True:
-    time.sleep(1)
\ No newline at end of file
+def sample_motors():
+    values = []
+    states = []
+    for m in (mdiff.left_motor, mdiff.right_motor, Motor_GATE, Motor_PUSH):
+        values.append(m.position)
+        values.append(m.speed)
+        states.append(m.state)
+    return values, states
+
+def main():
+    global server
+    init_hardware()
+    server = CommandServer(HOST, PORT, exec_namespace(), dispatch=DISPATCH,
+                           telemetry=sample_motors, telemetry_hz=TELEMETRY_HZ,
+                           velocity=set_wheel_speeds, velocity_stop=stop_drive,
+                           on_abort=stop_all)
+    server.start()
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
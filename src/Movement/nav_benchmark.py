@@ -0,0 +1,114 @@
+"""
+nav_benchmark.py – Compare step policies of `FrameNavigator` in the simulator.
+
+Each scenario drops the robot at a pose, puts one ball on the floor and lets the navigator
+run against :class:`~Movement.simulator.SimulatedEV3` / ``SimulatedCamera`` until the ball
+is captured.  Commands sent and simulated seconds per capture are the figures of merit; a
+fixed round-trip latency is charged to the simulator clock for every command.
+
+```python
+results = benchmark({"fixed": None, "adaptive": AdaptiveStepPolicy()})
+print(format_results(results))
+```
+
+or ``python src/Movement/nav_benchmark.py --latency 0.15``.
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ImageRecognition.track_robot import reset_tracker
+from Movement.frame_navigator import AdaptiveStepPolicy, FrameNavigator
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+
+__all__ = [
+    "SCENARIOS",
+    "CaptureRun",
+    "run_capture",
+    "benchmark",
+    "format_results",
+]
+
+# (start pose, ball) – open floor, near and far, good and bad initial headings.
+SCENARIOS: List[Tuple[Tuple[float, float, float], Tuple[int, int]]] = [
+    ((300, 300, 0), (700, 300)),
+    ((300, 300, 40), (700, 300)),
+    ((300, 300, -60), (700, 500)),
+    ((250, 250, 45), (1000, 1400)),
+    ((900, 1500, 180), (300, 400)),
+    ((600, 900, 90), (650, 1150)),
+]
+
+
+@dataclass
+class CaptureRun:
+    captured: bool
+    commands: int
+    sim_s: float              # simulated seconds until capture (or until frames ran out)
+
+
+def run_capture(start, ball, policy: Optional[AdaptiveStepPolicy] = None, *,
+                latency_s: float = 0.1, max_frames: int = 400,
+                px_per_mm: Optional[float] = None) -> CaptureRun:
+    """Navigate from *start* to *ball* once and report the cost.
+
+    With *px_per_mm* the camera renders at that resolution and the navigator tracks
+    metric poses through the camera's homography; by default poses are pixels at 1 px/mm.
+    """
+    reset_tracker()
+    sim = SimulatedEV3(pose=start, balls=[ball])
+    cam = SimulatedCamera(sim, max_frames=max_frames, px_per_mm=px_per_mm or 1.0)
+
+    def send(script: str) -> str:
+        sim.advance(latency_s)                     # network + brick overhead
+        return sim.send_and_receive(script)
+
+    nav = FrameNavigator([ball], capture=cam, send=send, policy=policy,
+                         clock=lambda: sim.clock, frame_clock=cam.frame_time,
+                         homography=cam.homography() if px_per_mm else None)
+    nav.run()
+    return CaptureRun(bool(sim.captured), nav.commands_sent, sim.clock)
+
+
+def benchmark(policies: Dict[str, Optional[AdaptiveStepPolicy]], scenarios=SCENARIOS, *,
+              latency_s: float = 0.1,
+              px_per_mm: Optional[float] = None) -> Dict[str, List[CaptureRun]]:
+    """Run every scenario under every policy (None = `calculate_next_command`)."""
+    return {name: [run_capture(start, ball, policy, latency_s=latency_s, px_per_mm=px_per_mm)
+                   for start, ball in scenarios]
+            for name, policy in policies.items()}
+
+
+def format_results(results: Dict[str, List[CaptureRun]]) -> str:
+    lines = ["{:<10} {:>8} {:>14} {:>14}".format("policy", "captured", "commands/capt",
+                                                 "sim s/capt")]
+    for name, runs in results.items():
+        ok = [r for r in runs if r.captured]
+        n = max(len(ok), 1)
+        lines.append("{:<10} {:>5}/{:<2} {:>14.1f} {:>14.2f}".format(
+            name, len(ok), len(runs), sum(r.commands for r in ok) / n,
+            sum(r.sim_s for r in ok) / n))
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark FrameNavigator step policies")
+    parser.add_argument("--latency", type=float, default=0.1,
+                        help="seconds of round trip charged per command")
+    parser.add_argument("--px-per-mm", type=float, default=None,
+                        help="camera resolution; tracks metric poses through the homography")
+    args = parser.parse_args(argv)
+    results = benchmark({"fixed": None, "adaptive": AdaptiveStepPolicy()},
+                        latency_s=args.latency, px_per_mm=args.px_per_mm)
+    print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+pose_estimator.py – Smooth, high-rate robot poses from wheel odometry plus camera fixes.
+
+`get_robot_pose` only gives a pose when both discs are visible, at camera rate.  The
+estimator dead-reckons between frames from the drive motors' encoder angles (brick
+telemetry, see :mod:`Movement.telemetry`) and pulls the result towards every camera pose
+with a complementary filter.
+
+Camera frames arrive late, so fixes are applied *at the frame's timestamp*: the stored
+odometry track is corrected from that moment on, rotating later motion by the heading
+correction.  Without encoder data the estimator simply follows the camera.
+
+```python
+est = PoseEstimator()
+est.add_encoders(t, left_deg, right_deg)          # or add_telemetry(sample, offset)
+est.add_camera(frame_t, get_robot_pose(frame))    # None (occluded) is ignored
+(x, y), heading = est.pose_at(time.time())
+```
+
+Poses use the `get_robot_pose` shape and conventions: ``((x, y), heading_deg)`` with the
+heading clockwise from +x.  *mm_per_unit* converts wheel travel to pose units (1.0 in the
+1 mm/px warped arena).
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+
+from Movement import drive_model as dm
+
+__all__ = [
+    "PoseEstimator",
+]
+
+Pose = Tuple[Tuple[float, float], float]
+
+
+def _wrap(deg: float) -> float:
+    """Angle in (-180, 180]."""
+    deg = (deg + 180.0) % 360.0 - 180.0
+    return 180.0 if deg == -180.0 else deg
+
+
+class PoseEstimator:
+    """Complementary filter of encoder odometry and camera poses, queried by time."""
+
+    def __init__(self, *, position_gain: float = 0.3, heading_gain: float = 0.3,
+                 mm_per_unit: float = 1.0,
+                 wheel_diameter_mm: float = dm.WHEEL_DIAMETER_MM,
+                 wheel_distance_mm: float = dm.WHEEL_DISTANCE_MM,
+                 history_s: float = 2.0, max_extrapolate_s: float = 0.3,
+                 odometry_timeout_s: float = 0.5, max_jump: float = 150.0,
+                 max_rejections: int = 5):
+        self.position_gain = position_gain
+        self.heading_gain = heading_gain
+        self.mm_per_unit = mm_per_unit
+        self.mm_per_deg = math.pi * wheel_diameter_mm / 360.0
+        self.wheel_distance_mm = wheel_distance_mm
+        self.history_s = history_s
+        self.max_extrapolate_s = max_extrapolate_s
+        self.odometry_timeout_s = odometry_timeout_s
+        self.max_jump = max_jump
+        self.max_rejections = max_rejections
+
+        # Track of estimated poses, ascending in time.
+        self._t: List[float] = []
+        self._x: List[float] = []
+        self._y: List[float] = []
+        self._h: List[float] = []
+        self._last_wheels: Optional[Tuple[float, float]] = None
+        self._last_encoder_t: Optional[float] = None
+        self._rejections = 0
+        self.camera_fixes = 0
+        self.rejected_fixes = 0
+
+    # ------------------------------ state ----------------------------------
+    @property
+    def initialised(self) -> bool:
+        return bool(self._t)
+
+    def reset(self, t: float, pose: Pose) -> None:
+        """Forget the track and start again from *pose* at time *t*."""
+        (x, y), h = pose
+        self._t, self._x, self._y, self._h = [t], [float(x)], [float(y)], [float(h) % 360.0]
+
+    def _append(self, t: float, x: float, y: float, h: float) -> None:
+        if self._t and t < self._t[-1]:
+            return                                    # late sample; keep the track monotone
+        self._t.append(t)
+        self._x.append(x)
+        self._y.append(y)
+        self._h.append(h % 360.0)
+        cut = bisect_left(self._t, t - self.history_s)
+        if cut > 0 and len(self._t) - cut >= 2:
+            del self._t[:cut], self._x[:cut], self._y[:cut], self._h[:cut]
+
+    # ------------------------------ inputs ---------------------------------
+    def add_encoders(self, t: float, left_deg: float, right_deg: float) -> None:
+        """Integrate absolute wheel angles (tacho degrees) sampled at time *t*.
+
+        A sample older than a camera fix already in the track (telemetry is late too) is
+        inserted at *t* and the later track moves with it.  One older than the previous
+        encoder sample is ignored.
+        """
+        if self._last_encoder_t is not None and t < self._last_encoder_t:
+            return                                    # overtaken by a newer sample
+        wheels = (float(left_deg), float(right_deg))
+        prev, self._last_wheels = self._last_wheels, wheels
+        self._last_encoder_t = t
+        if prev is None or not self._t or t < self._t[0]:
+            return
+        dl = (wheels[0] - prev[0]) * self.mm_per_deg
+        dr = (wheels[1] - prev[1]) * self.mm_per_deg
+        dist = (dl + dr) / 2.0 / self.mm_per_unit
+        dh = math.degrees((dl - dr) / self.wheel_distance_mm)   # +ve = clockwise
+        (x, y), h = self._interpolate(t)
+        mid = math.radians(h + dh / 2.0)                         # midpoint integration
+        mx, my = dist * math.cos(mid), dist * math.sin(mid)
+        if t >= self._t[-1]:
+            self._append(t, x + mx, y + my, h + dh)
+            return
+        i = bisect_left(self._t, t)
+        if self._t[i] != t:
+            self._t.insert(i, t)
+            self._x.insert(i, x)
+            self._y.insert(i, y)
+            self._h.insert(i, h)
+        self._correct(t, (x, y), mx, my, dh)
+
+    def add_telemetry(self, sample, clock_offset: float = 0.0) -> None:
+        """Integrate a `wire.TelemetrySample`; *clock_offset* maps brick to PC time."""
+        self.add_encoders(sample.t + clock_offset, sample.left_pos, sample.right_pos)
+
+    def add_camera(self, t: float, pose: Optional[Pose]) -> bool:
+        """Correct the track with a camera pose taken at time *t*.
+
+        Returns False if the fix was ignored: no pose, older than the stored track, or an
+        outlier further than *max_jump* from the estimate (until *max_rejections* outliers in
+        a row force a reset).
+        """
+        if pose is None or pose[0] is None or pose[1] is None:
+            return False
+        (cx, cy), ch = pose
+        odometry_live = (self._last_encoder_t is not None
+                         and t - self._last_encoder_t <= self.odometry_timeout_s)
+        if not self._t or not odometry_live:
+            self.reset(t, pose)                       # nothing to blend with: follow the camera
+            self.camera_fixes += 1
+            return True
+        if t < self._t[0]:
+            return False
+        if t > self._t[-1]:
+            self._append(t, self._x[-1], self._y[-1], self._h[-1])
+        (ex, ey), eh = self._interpolate(t)
+        dx, dy, dh = cx - ex, cy - ey, _wrap(ch - eh)
+        if math.hypot(dx, dy) > self.max_jump:
+            self._rejections += 1
+            self.rejected_fixes += 1
+            if self._rejections < self.max_rejections:
+                return False
+            self.reset(t, pose)
+            self._rejections = 0
+            self.camera_fixes += 1
+            return True
+        self._rejections = 0
+        self._correct(t, (ex, ey), self.position_gain * dx, self.position_gain * dy,
+                      self.heading_gain * dh)
+        self.camera_fixes += 1
+        return True
+
+    def _correct(self, t: float, pivot: Tuple[float, float],
+                 dx: float, dy: float, dh: float) -> None:
+        """Shift the track from *t* on by (dx, dy) and rotate it by *dh* about *pivot*."""
+        c, s = math.cos(math.radians(dh)), math.sin(math.radians(dh))
+        px, py = pivot
+        for i in range(bisect_left(self._t, t), len(self._t)):
+            rx, ry = self._x[i] - px, self._y[i] - py
+            self._x[i] = px + c * rx - s * ry + dx
+            self._y[i] = py + s * rx + c * ry + dy
+            self._h[i] = (self._h[i] + dh) % 360.0
+
+    # ------------------------------ queries --------------------------------
+    def _interpolate(self, t: float) -> Pose:
+        i = bisect_right(self._t, t)
+        if i == 0:
+            return (self._x[0], self._y[0]), self._h[0]
+        if i == len(self._t):
+            return (self._x[-1], self._y[-1]), self._h[-1]
+        t0, t1 = self._t[i - 1], self._t[i]
+        a = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+        x = self._x[i - 1] + a * (self._x[i] - self._x[i - 1])
+        y = self._y[i - 1] + a * (self._y[i] - self._y[i - 1])
+        h = self._h[i - 1] + a * _wrap(self._h[i] - self._h[i - 1])
+        return (x, y), h % 360.0
+
+    def velocity(self) -> Optional[Tuple[float, float, float]]:
+        """Latest ``(vx, vy, heading_rate)`` in units/s and deg/s, or None."""
+        if len(self._t) < 2 or self._t[-1] <= self._t[-2]:
+            return None
+        dt = self._t[-1] - self._t[-2]
+        return ((self._x[-1] - self._x[-2]) / dt, (self._y[-1] - self._y[-2]) / dt,
+                _wrap(self._h[-1] - self._h[-2]) / dt)
+
+    def pose_at(self, t: float) -> Optional[Pose]:
+        """Estimated pose at time *t*, or None before the first camera fix.
+
+        Inside the stored track the pose is interpolated; past its end it is extrapolated
+        with the latest velocity for at most *max_extrapolate_s*, then held.
+        """
+        if not self._t:
+            return None
+        if t <= self._t[-1]:
+            return self._interpolate(t)
+        v = self.velocity()
+        if v is None:
+            return (self._x[-1], self._y[-1]), self._h[-1]
+        dt = min(t - self._t[-1], self.max_extrapolate_s)
+        return ((self._x[-1] + v[0] * dt, self._y[-1] + v[1] * dt),
+                (self._h[-1] + v[2] * dt) % 360.0)
@@ -0,0 +1,193 @@
+"""
+pose_prediction.py – Project the tracked pose forward to when the next command will run.
+
+By the time `calculate_next_command` sees a pose it is a frame interval plus processing
+old, and the command it produces starts only after the network and ramp delay.  Deciding
+on that stale pose makes the robot overshoot and costs correction round trips.
+
+:class:`PosePredictor` keeps the timestamped camera poses and the motion the brick was told
+to make.  :meth:`PosePredictor.predict` starts from the newest pose and applies
+
+* the part of the commanded primitives (timed with :mod:`Movement.drive_model`) that falls
+  between the frame's timestamp and the requested time, or, with no command in progress,
+* the velocity fitted to the recent poses, for at most *max_horizon_s*.
+
+The command latency is learnt from :meth:`PosePredictor.command_done` and exposed as
+:attr:`PosePredictor.lead_s`, the horizon to predict for.
+
+```python
+predictor = PosePredictor()
+predictor.observe(frame_t, get_robot_pose(frame))
+pose = predictor.predict(time.monotonic() + predictor.lead_s)
+predictor.command_sent(time.monotonic(), cmd)
+send_and_receive(cmd)
+predictor.command_done(time.monotonic())
+```
+
+All times come from the caller, so any clock works (``time.monotonic`` on the robot,
+``SimulatedEV3.clock`` in simulation) as long as it is used consistently.
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+from collections import deque
+from typing import List, NamedTuple, Optional, Tuple
+
+from Movement import drive_model as dm
+from Movement import wire
+from Movement.drive_model import command_duration_s   # re-exported
+
+__all__ = [
+    "PosePredictor",
+    "command_duration_s",
+]
+
+Pose = Tuple[Tuple[float, float], float]
+
+
+class _Step(NamedTuple):
+    start: float
+    end: float
+    turn_deg: float              # in-place turn, +ve clockwise
+    radius_mm: float             # for travel: 0 straight, > 0 arc right, < 0 arc left
+    distance_mm: float
+
+
+def _move(x: float, y: float, h: float, turn_deg: float, radius_mm: float,
+          distance_mm: float) -> Tuple[float, float, float]:
+    """Apply a turn or a (partial) straight/arc travel to the pose (x, y, heading)."""
+    if turn_deg:
+        return x, y, h + turn_deg
+    a = math.radians(h)
+    if radius_mm == 0:
+        return x + distance_mm * math.cos(a), y + distance_mm * math.sin(a), h
+    a2 = a + distance_mm / radius_mm
+    return (x + radius_mm * (math.sin(a2) - math.sin(a)),
+            y - radius_mm * (math.cos(a2) - math.cos(a)),
+            math.degrees(a2))
+
+
+class PosePredictor:
+    """Latency compensation for a camera-tracked robot driven by discrete commands."""
+
+    def __init__(self, *, latency_s: float = 0.1, latency_gain: float = 0.3,
+                 window_s: float = 0.5, max_horizon_s: float = 0.5,
+                 history: int = 64):
+        self.latency_s = latency_s          # command sent -> motion starts
+        self.latency_gain = latency_gain
+        self.window_s = window_s
+        self.max_horizon_s = max_horizon_s
+        self._obs: deque[Tuple[float, float, float, float]] = deque(maxlen=history)
+        self._plan: List[_Step] = []
+        self._plan_end = -math.inf
+        self._pending: Optional[Tuple[int, float, bool]] = None   # (first step, sent, measurable)
+
+    def reset(self) -> None:
+        self._obs.clear()
+        self._plan = []
+        self._plan_end = -math.inf
+        self._pending = None
+
+    @property
+    def lead_s(self) -> float:
+        """How far ahead of "now" a new command takes effect."""
+        return self.latency_s
+
+    # ------------------------------ inputs ---------------------------------
+    def observe(self, t: float, pose: Optional[Pose]) -> None:
+        """Camera pose of the frame taken at *t* (None – markers not seen – is ignored)."""
+        if not pose:
+            return
+        if self._obs and t <= self._obs[-1][0]:
+            return                                  # out of order
+        (x, y), h = pose
+        self._obs.append((t, float(x), float(y), float(h)))
+
+    def command_sent(self, t: float, command) -> None:
+        """The brick was sent *command* (script text or ``[(name, args), ...]``) at *t*.
+
+        Its motion is assumed to start after :attr:`lead_s`, or when the previously sent
+        command ends if that is later.  Scripts that are not plain primitive calls clear
+        the plan; prediction then falls back to the fitted velocity.
+        """
+        commands = wire.parse_script(command) if isinstance(command, str) else command
+        if commands is None:
+            self._plan, self._plan_end, self._pending = [], -math.inf, None
+            return
+        start = max(t + self.latency_s, self._plan_end)
+        keep_after = self._obs[0][0] if self._obs else t     # older steps can't matter
+        self._plan = [s for s in self._plan if s.end > keep_after]
+        self._pending = (len(self._plan), t, start > self._plan_end)
+        for duration, turn, radius, distance in dm.primitive_steps(commands):
+            self._plan.append(_Step(start, start + duration, turn, radius, distance))
+            start += duration
+        self._plan_end = start
+
+    def command_done(self, t: float) -> None:
+        """The brick reported the last sent command finished at *t*.
+
+        That command's steps are shifted to end at *t*; unless it was queued behind
+        another one, the gap between sending and its start updates :attr:`latency_s`.
+        """
+        if self._pending is None:
+            return
+        first, sent, measurable = self._pending
+        self._pending = None
+        shift = t - self._plan_end
+        self._plan[first:] = [s._replace(start=s.start + shift, end=s.end + shift)
+                              for s in self._plan[first:]]
+        self._plan_end = t
+        if measurable and first < len(self._plan):
+            observed = self._plan[first].start - sent
+            if observed >= 0:
+                self.latency_s += self.latency_gain * (observed - self.latency_s)
+
+    # ------------------------------ outputs --------------------------------
+    def velocity(self) -> Optional[Tuple[float, float, float]]:
+        """``(vx, vy, heading_rate)`` fitted to the poses since the last commanded motion."""
+        if not self._obs:
+            return None
+        t_last = self._obs[-1][0]
+        since = max(t_last - self.window_s, self._plan_end)
+        pts = [o for o in self._obs if o[0] >= since]
+        if len(pts) < 2 or pts[-1][0] <= pts[0][0]:
+            return None
+        t0 = pts[0][0]
+        ts = [p[0] - t0 for p in pts]
+        h0 = pts[0][3]
+        hs = [h0 + (p[3] - h0 + 180.0) % 360.0 - 180.0 for p in pts]   # unwrapped
+        mean_t = sum(ts) / len(ts)
+        var = sum((v - mean_t) ** 2 for v in ts)
+
+        def slope(values):
+            mean_v = sum(values) / len(values)
+            return sum((a - mean_t) * (b - mean_v) for a, b in zip(ts, values)) / var
+
+        return slope([p[1] for p in pts]), slope([p[2] for p in pts]), slope(hs)
+
+    def predict(self, t: float) -> Optional[Pose]:
+        """Pose expected at *t*, or None before the first observation."""
+        if not self._obs:
+            return None
+        t_obs, x, y, h = self._obs[-1]
+        if t_obs < self._plan_end:
+            for step in self._plan:
+                lo, hi = max(step.start, t_obs), min(step.end, t)
+                if step.end <= step.start:
+                    frac = 1.0 if t_obs < step.start <= t else 0.0
+                else:
+                    frac = max(0.0, hi - lo) / (step.end - step.start)
+                if frac > 0:
+                    x, y, h = _move(x, y, h, step.turn_deg * frac, step.radius_mm,
+                                    step.distance_mm * frac)
+            return (x, y), h % 360.0
+        v = self.velocity()
+        if v is None:
+            return (x, y), h
+        dt = min(max(t - t_obs, 0.0), self.max_horizon_s)
+        return (x + v[0] * dt, y + v[1] * dt), (h + v[2] * dt) % 360.0
@@ -0,0 +1,432 @@
+"""
+simulator.py – Kinematic stand-in for the EV3 drive base and the overhead camera.
+
+`SimulatedEV3` executes the same command scripts as ``command_processor`` in
+``Movement/main.py`` (``turn_left_deg``, ``drive_straight_mm``, ``open_gate``, …) against a
+differential-drive model with ramp times from :mod:`Movement.drive_model` and optional
+noise.  Time is virtual, so a closed loop runs as fast as the vision code allows.
+
+`SimulatedCamera` renders top-down frames with the pink (front) and purple (back) discs so
+`get_robot_pose` can be used unchanged.  Together they plug into `FrameNavigator`:
+
+```python
+sim = SimulatedEV3(pose=(200, 300, 0), balls=[(600, 300)])
+nav = FrameNavigator(sim.balls, capture=SimulatedCamera(sim), send=sim.send_and_receive)
+nav.run()
+print(sim.clock, sim.captured)
+```
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from Movement import drive_model as dm
+from PathFinding.ApproachPoses import ArenaModel, RobotGeometry
+
+__all__ = [
+    "NoiseModel",
+    "SimulatedEV3",
+    "SimulatedCamera",
+]
+
+
+@dataclass
+class NoiseModel:
+    """Gaussian execution errors, all zero by default (deterministic simulation)."""
+
+    distance_sigma_frac: float = 0.0   # relative error on straight drives
+    turn_sigma_frac: float = 0.0       # relative error on in-place turns
+    heading_drift_deg: float = 0.0     # heading error added per straight drive
+    seed: Optional[int] = None
+
+
+@dataclass
+class _CommandRecord:
+    name: str
+    args: tuple
+    start: float
+    duration: float
+
+
+def _check_radius(radius_mm: float) -> None:
+    """Refuse arcs tighter than ev3dev2's ``MoveDifferential`` can drive, with its error."""
+    if abs(radius_mm) < dm.WHEEL_DISTANCE_MM / 2:
+        raise ValueError("radius_mm {} is less than min_circle_radius_mm {}".format(
+            abs(radius_mm), dm.WHEEL_DISTANCE_MM / 2))
+
+
+# ---------------------------------------------------------------------------
+# Robot model
+# ---------------------------------------------------------------------------
+
+
+class SimulatedEV3:
+    """Virtual brick: pose in arena millimetres, heading in degrees (+ve clockwise)."""
+
+    def __init__(self, pose: Tuple[float, float, float] = (200.0, 200.0, 0.0), *,
+                 balls: Optional[List[Tuple[float, float]]] = None,
+                 arena: ArenaModel = ArenaModel(),
+                 robot: RobotGeometry = RobotGeometry(),
+                 noise: NoiseModel = NoiseModel()):
+        self.x, self.y, self.heading = (float(v) for v in pose)
+        self.balls: List[Tuple[float, float]] = list(balls or [])
+        self.arena = arena
+        self.robot = robot
+        self.noise = noise
+        self._rng = random.Random(noise.seed)
+
+        self.clock = 0.0                  # virtual seconds since start
+        self.gate_open = False
+        self.pushed_out = False
+        self.captured: List[Tuple[float, float]] = []
+        self.collisions = 0
+        self.history: List[_CommandRecord] = []
+        self.wheel_deg = [0.0, 0.0]       # left/right encoder angles, like motor.position
+        self.wheel_speed_dps = (0.0, 0.0) # streamed tank-drive setpoint
+        self.stream_timeout_s = 0.5       # watchdog, like CommandServer.velocity_timeout_s
+        self._setpoint_clock = 0.0
+
+    # ------------------------------ helpers --------------------------------
+    @property
+    def pose(self) -> Tuple[Tuple[float, float], float]:
+        """Same shape as `get_robot_pose`: ((x, y), heading_deg)."""
+        return (self.x, self.y), self.heading
+
+    def _record(self, name: str, args: tuple, duration: float) -> None:
+        self.history.append(_CommandRecord(name, args, self.clock, duration))
+        self.clock += duration
+
+    def _turn_wheels(self, left_mm: float, right_mm: float) -> None:
+        deg_per_mm = 360.0 / (math.pi * dm.WHEEL_DIAMETER_MM)
+        self.wheel_deg[0] += left_mm * deg_per_mm
+        self.wheel_deg[1] += right_mm * deg_per_mm
+
+    def _gauss(self, sigma: float) -> float:
+        return self._rng.gauss(0.0, sigma) if sigma else 0.0
+
+    def _check_walls(self) -> None:
+        r = self.robot
+        h = math.radians(self.heading)
+        u = (math.cos(h), math.sin(h))
+        v = (-u[1], u[0])
+        for along in (r.front_offset_mm, -r.rear_offset_mm):
+            for side in (r.width_mm / 2, -r.width_mm / 2):
+                px = self.x + along * u[0] + side * v[0]
+                py = self.y + along * u[1] + side * v[1]
+                if not (0 <= px <= self.arena.width_mm and 0 <= py <= self.arena.height_mm):
+                    self.collisions += 1
+                    return
+
+    # ------------------------------ primitives -----------------------------
+    # Signatures follow Movement/main.py so recorded scripts run unchanged.
+    def drive_straight_mm(self, distance_mm: float,
+                          speed_rpm: float = dm.DEFAULT_DRIVE_RPM,
+                          ramp_ms: int = dm.DEFAULT_RAMP_MS,
+                          brake: bool = True,
+                          block: bool = True) -> None:
+        actual = distance_mm * (1.0 + self._gauss(self.noise.distance_sigma_frac))
+        h = math.radians(self.heading)
+        self.x += actual * math.cos(h)
+        self.y += actual * math.sin(h)
+        self.heading = (self.heading + self._gauss(self.noise.heading_drift_deg)) % 360
+        self._turn_wheels(actual, actual)
+        self._check_walls()
+        self._record("drive_straight_mm", (distance_mm,),
+                     dm.drive_time_s(distance_mm, speed_rpm, ramp_ms))
+
+    def reverse_drive_mm(self, distance_mm: float,
+                         speed_rpm: float = dm.DEFAULT_DRIVE_RPM,
+                         ramp_ms: int = dm.DEFAULT_RAMP_MS,
+                         brake: bool = True,
+                         block: bool = True) -> None:
+        self.drive_straight_mm(-abs(distance_mm), speed_rpm, ramp_ms, brake, block)
+
+    def turn_deg(self, angle_deg: float,
+                 speed_rpm: float = dm.DEFAULT_TURN_RPM,
+                 ramp_ms: int = dm.DEFAULT_RAMP_MS,
+                 brake: bool = True,
+                 block: bool = True) -> None:
+        actual = angle_deg * (1.0 + self._gauss(self.noise.turn_sigma_frac))
+        self.heading = (self.heading + actual) % 360
+        travel = math.copysign(dm.turn_wheel_travel_mm(actual), actual)
+        self._turn_wheels(travel, -travel)
+        self._check_walls()
+        self._record("turn_deg", (angle_deg,), dm.turn_time_s(angle_deg, speed_rpm, ramp_ms))
+
+    def _move_arc(self, radius_mm: float, distance_mm: float) -> None:
+        """Move the centre *distance_mm* along an arc (radius > 0 right, < 0 left, 0 straight)."""
+        actual = distance_mm * (1.0 + self._gauss(self.noise.distance_sigma_frac))
+        h = math.radians(self.heading)
+        if radius_mm == 0:
+            self.x += actual * math.cos(h)
+            self.y += actual * math.sin(h)
+            self._turn_wheels(actual, actual)
+            return
+        h2 = h + actual / radius_mm
+        self.x += radius_mm * (math.sin(h2) - math.sin(h))
+        self.y -= radius_mm * (math.cos(h2) - math.cos(h))
+        self.heading = math.degrees(h2) % 360
+        k = dm.WHEEL_DISTANCE_MM / (2.0 * radius_mm)
+        self._turn_wheels(actual * (1.0 + k), actual * (1.0 - k))
+
+    def arc_right_mm(self, radius_mm: float, distance_mm: float,
+                     speed_rpm: float = dm.DEFAULT_DRIVE_RPM,
+                     ramp_ms: int = dm.DEFAULT_RAMP_MS,
+                     brake: bool = True,
+                     block: bool = True) -> None:
+        _check_radius(radius_mm)
+        self._move_arc(abs(radius_mm), distance_mm)
+        self._check_walls()
+        self._record("arc_right_mm", (radius_mm, distance_mm),
+                     dm.arc_time_s(radius_mm, distance_mm, speed_rpm, ramp_ms))
+
+    def arc_left_mm(self, radius_mm: float, distance_mm: float,
+                    speed_rpm: float = dm.DEFAULT_DRIVE_RPM,
+                    ramp_ms: int = dm.DEFAULT_RAMP_MS,
+                    brake: bool = True,
+                    block: bool = True) -> None:
+        _check_radius(radius_mm)
+        self._move_arc(-abs(radius_mm), distance_mm)
+        self._check_walls()
+        self._record("arc_left_mm", (radius_mm, distance_mm),
+                     dm.arc_time_s(radius_mm, distance_mm, speed_rpm, ramp_ms))
+
+    def drive_path(self, *segments, speed_rpm=dm.DEFAULT_DRIVE_RPM, ramp_ms=dm.DEFAULT_RAMP_MS):
+        if len(segments) % 2:
+            raise ValueError("drive_path takes (radius_mm, distance_mm) pairs")
+        pairs = list(zip(segments[::2], segments[1::2]))
+        for radius, distance in pairs:
+            if radius != 0:
+                _check_radius(radius)               # the brick fails here, mid-path
+            self._move_arc(radius, distance)
+            self._check_walls()
+        self._record("drive_path", tuple(segments), dm.path_time_s(pairs, speed_rpm, ramp_ms))
+
+    def set_wheel_speeds(self, left_dps: float, right_dps: float) -> None:
+        """Streaming control: wheels keep these speeds while :meth:`advance` runs time."""
+        limit = dm.MAX_SPEED_DEG_S
+        self.wheel_speed_dps = (max(-limit, min(limit, float(left_dps))),
+                                max(-limit, min(limit, float(right_dps))))
+        self._setpoint_clock = self.clock
+
+    def advance(self, dt: float, step_s: float = 0.01) -> None:
+        """Let *dt* virtual seconds pass, integrating streamed wheel speeds."""
+        end = self.clock + dt
+        moved = False
+        while self.clock < end:
+            h = min(step_s, end - self.clock)
+            if self.wheel_speed_dps != (0.0, 0.0):
+                if self.clock - self._setpoint_clock > self.stream_timeout_s:
+                    self.wheel_speed_dps = (0.0, 0.0)       # watchdog
+                else:
+                    self._integrate_wheels(h)
+                    moved = True
+            self.clock += h
+        self.clock = end
+        if moved:
+            self._check_walls()
+
+    def _integrate_wheels(self, dt: float) -> None:
+        mm_per_deg = math.pi * dm.WHEEL_DIAMETER_MM / 360.0
+        left = self.wheel_speed_dps[0] * mm_per_deg * dt
+        right = self.wheel_speed_dps[1] * mm_per_deg * dt
+        dh = math.degrees((left - right) / dm.WHEEL_DISTANCE_MM)
+        mid = math.radians(self.heading + dh / 2)
+        self.x += (left + right) / 2 * math.cos(mid)
+        self.y += (left + right) / 2 * math.sin(mid)
+        self.heading = (self.heading + dh) % 360
+        self._turn_wheels(left, right)
+
+    def turn_right_deg(self, angle_deg):
+        self.turn_deg(angle_deg)
+
+    def turn_left_deg(self, angle_deg):
+        self.turn_deg(-angle_deg)
+
+    def stop_drive(self, brake: bool = True) -> None:
+        self.wheel_speed_dps = (0.0, 0.0)
+        self._record("stop_drive", (), 0.0)
+
+    def open_gate(self):
+        self.gate_open = True
+        self._record("open_gate", (), dm.GATE_TIME_S)
+
+    def close_gate(self):
+        if self.gate_open:
+            self._collect_balls_in_gate()
+        self.gate_open = False
+        self._record("close_gate", (), dm.GATE_TIME_S)
+
+    def push_out(self):
+        self.pushed_out = True
+        self._record("push_out", (), dm.PUSH_TIME_S)
+
+    def push_return(self):
+        self.pushed_out = False
+        self._record("push_return", (), dm.PUSH_TIME_S)
+
+    def _collect_balls_in_gate(self) -> None:
+        r = self.robot
+        h = math.radians(self.heading)
+        u = (math.cos(h), math.sin(h))
+        kept = []
+        for bx, by in self.balls:
+            dx, dy = bx - self.x, by - self.y
+            along = dx * u[0] + dy * u[1]
+            side = -dx * u[1] + dy * u[0]
+            if (r.capture_offset_mm - r.ball_diameter_mm <= along <= r.front_offset_mm + r.ball_diameter_mm
+                    and abs(side) <= r.gate_width_mm / 2):
+                self.captured.append((bx, by))
+            else:
+                kept.append((bx, by))
+        self.balls = kept
+
+    # ------------------------------ script execution -----------------------
+    def namespace(self) -> dict:
+        """Names available to scripts, mirroring ``exec_namespace`` on the brick."""
+        return {
+            "turn_left_deg": self.turn_left_deg,
+            "turn_right_deg": self.turn_right_deg,
+            "turn_deg": self.turn_deg,
+            "drive_straight_mm": self.drive_straight_mm,
+            "reverse_drive_mm": self.reverse_drive_mm,
+            "open_gate": self.open_gate,
+            "close_gate": self.close_gate,
+            "push_out": self.push_out,
+            "push_return": self.push_return,
+            "stop_drive": self.stop_drive,
+            "arc_left_mm": self.arc_left_mm,
+            "arc_right_mm": self.arc_right_mm,
+            "drive_path": self.drive_path,
+        }
+
+    def execute(self, script: str) -> None:
+        """Run *script* like ``command_processor`` does; exceptions propagate."""
+        exec(script, self.namespace())
+
+    def send_and_receive(self, script: str) -> str:
+        """Drop-in replacement for `AutonomousClient.send_and_receive`."""
+        try:
+            self.execute(script)
+            return "Command executed successfully.\n {command}".format(command=script)
+        except Exception as e:
+            return "Execution error: {}\n".format(e)
+
+
+# ---------------------------------------------------------------------------
+# Camera model
+# ---------------------------------------------------------------------------
+
+
+def _hsv_to_bgr(h: int, s: int, v: int) -> Tuple[int, int, int]:
+    px = cv2.cvtColor(np.uint8([[[h, s, v]]]), cv2.COLOR_HSV2BGR)[0, 0]
+    return int(px[0]), int(px[1]), int(px[2])
+
+
+# Inside both the built-in and the calibrated ranges of track_robot.
+PINK_BGR = _hsv_to_bgr(168, 120, 235)
+PURPLE_BGR = _hsv_to_bgr(114, 110, 225)
+BALL_BGR = (235, 235, 235)
+FLOOR_BGR = (60, 90, 60)
+WALL_BGR = (40, 40, 200)
+
+
+@dataclass
+class SimulatedCamera:
+    """`cv2.VideoCapture` look-alike that renders the state of a :class:`SimulatedEV3`."""
+
+    sim: SimulatedEV3
+    px_per_mm: float = 1.0
+    marker_spacing_mm: float = 120.0   # centre-to-centre distance between the discs
+    marker_radius_mm: float = 15.0
+    frame_interval_s: float = 1 / 30   # virtual time consumed by each read()
+    max_frames: Optional[int] = None
+    buffered_frames: int = 0           # like a webcam's driver queue: read() lags this many frames
+    frames_read: int = 0
+    _background: Optional[np.ndarray] = field(default=None, repr=False)
+    _opened: bool = True
+    _queue: deque = field(default_factory=deque, repr=False)
+    _frame_time: float = 0.0
+
+    def isOpened(self) -> bool:  # noqa: N802 – mirrors cv2.VideoCapture
+        return self._opened
+
+    def release(self) -> None:
+        self._opened = False
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self._opened or (self.max_frames is not None and self.frames_read >= self.max_frames):
+            return False, None
+        self.frames_read += 1
+        self.sim.advance(self.frame_interval_s)
+        self._queue.append((self.sim.clock, self.render()))
+        if len(self._queue) > self.buffered_frames:
+            self._frame_time, frame = self._queue.popleft()
+        else:
+            self._frame_time, frame = self._queue[0]
+        return True, frame
+
+    def frame_time(self) -> float:
+        """Simulator clock when the frame last returned by :meth:`read` was taken."""
+        return self._frame_time
+
+    def _px(self, x: float, y: float) -> Tuple[int, int]:
+        return int(round(x * self.px_per_mm)), int(round(y * self.px_per_mm))
+
+    def _px16(self, x: float, y: float) -> Tuple[int, int]:
+        return int(round(x * self.px_per_mm * 16)), int(round(y * self.px_per_mm * 16))
+
+    def _draw_background(self) -> np.ndarray:
+        a = self.sim.arena
+        w, h = self._px(a.width_mm, a.height_mm)
+        img = np.empty((h, w, 3), dtype=np.uint8)
+        img[:] = FLOOR_BGR
+        cv2.rectangle(img, (0, 0), (w - 1, h - 1), WALL_BGR, max(1, int(10 * self.px_per_mm)))
+        ang = math.radians(a.cross_angle_deg)
+        for rot in (0.0, math.pi / 2):
+            u = (math.cos(ang + rot), math.sin(ang + rot))
+            v = (-u[1], u[0])
+            hl, hw = a.cross_size_mm / 2, a.cross_arm_width_mm / 2
+            cx, cy = a.cross_center
+            corners = [self._px(cx + su * hl * u[0] + sv * hw * v[0],
+                                cy + su * hl * u[1] + sv * hw * v[1])
+                       for su, sv in ((-1, -1), (1, -1), (1, 1), (-1, 1))]
+            cv2.fillConvexPoly(img, np.array(corners, dtype=np.int32), WALL_BGR)
+        return img
+
+    def render(self) -> np.ndarray:
+        """Return a BGR frame of the current simulator state."""
+        if self._background is None:
+            self._background = self._draw_background()
+        img = self._background.copy()
+
+        ball_r = max(1, int(self.sim.robot.ball_diameter_mm / 2 * self.px_per_mm))
+        for bx, by in self.sim.balls:
+            cv2.circle(img, self._px(bx, by), ball_r, BALL_BGR, -1)
+
+        h = math.radians(self.sim.heading)
+        half = self.marker_spacing_mm / 2
+        # Markers are drawn at sub-pixel positions (fixed point, 1/16 px) like a real camera
+        # sees them, so sub-pixel tracking can be tested.
+        front = self._px16(self.sim.x + half * math.cos(h), self.sim.y + half * math.sin(h))
+        back = self._px16(self.sim.x - half * math.cos(h), self.sim.y - half * math.sin(h))
+        r = max(16, int(self.marker_radius_mm * self.px_per_mm * 16))
+        cv2.circle(img, front, r, PINK_BGR, -1, cv2.LINE_8, 4)
+        cv2.circle(img, back, r, PURPLE_BGR, -1, cv2.LINE_8, 4)
+        return img
+
+    def homography(self) -> np.ndarray:
+        """Image pixels → arena mm for this camera, for ``get_robot_pose(homography=...)``."""
+        return np.diag([1.0 / self.px_per_mm, 1.0 / self.px_per_mm, 1.0])
@@ -0,0 +1,117 @@
+"""
+startup_time.py – How long each PC-side entry point takes to import, in a fresh interpreter.
+
+A client that crashes mid-match has to be back up in well under a second, so importing it
+must not drag in the vision stack.  Every entry point is imported in its own subprocess
+(nothing cached in ``sys.modules``) and reported with the heavy packages it loaded and
+anything it printed – importing should have no side effects.
+
+```python
+for r in measure_all():
+    print(r.name, r.import_s, r.heavy)
+```
+
+or ``python src/Movement/startup_time.py --repeat 5``.
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+__all__ = [
+    "ENTRY_POINTS",
+    "HEAVY_MODULES",
+    "StartupTime",
+    "measure",
+    "measure_all",
+    "format_results",
+]
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> module; the PC processes that may need restarting during a match
+ENTRY_POINTS: Dict[str, str] = {
+    "client": "Movement.AutonomousClient",
+    "command loop": "Movement.CommandLoop",
+    "velocity stream": "Movement.velocity_stream",
+    "frame navigator": "Movement.frame_navigator",
+    "async navigator": "Movement.async_navigator",
+    "vision": "ImageRecognition.main",
+}
+
+HEAVY_MODULES = ("cv2", "numpy", "matplotlib", "inference_sdk")
+
+_PROBE = """
+import sys, time, json
+sys.path.insert(0, {src!r})
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+sys.stdout.flush()
+sys.stderr.write("\\n" + json.dumps({{"import_s": t1 - t0,
+    "heavy": [m for m in {heavy!r} if m in sys.modules]}}) + "\\n")
+"""
+
+
+@dataclass
+class StartupTime:
+    name: str
+    module: str
+    import_s: float              # best of the repeats, import statement only
+    process_s: float             # best of the repeats, interpreter start to exit
+    heavy: Tuple[str, ...]       # HEAVY_MODULES that ended up imported
+    output: str                  # anything written to stdout while importing
+
+
+def measure(module: str, *, name: str = "", repeat: int = 3,
+            python: str = sys.executable) -> StartupTime:
+    """Import *module* in *repeat* fresh interpreters and keep the fastest run."""
+    probe = _PROBE.format(src=SRC_DIR, module=module, heavy=HEAVY_MODULES)
+    best = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        proc = subprocess.run([python, "-c", probe], capture_output=True, text=True)
+        process_s = time.perf_counter() - t0
+        if proc.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{proc.stderr.strip()}")
+        report = json.loads(proc.stderr.strip().splitlines()[-1])
+        run = StartupTime(name or module, module, report["import_s"], process_s,
+                          tuple(report["heavy"]), proc.stdout)
+        if best is None or run.import_s < best.import_s:
+            best = run
+    return best
+
+
+def measure_all(entry_points: Dict[str, str] = ENTRY_POINTS, *,
+                repeat: int = 3) -> List[StartupTime]:
+    return [measure(module, name=name, repeat=repeat) for name, module in entry_points.items()]
+
+
+def format_results(results: List[StartupTime]) -> str:
+    lines = ["{:<16} {:>9} {:>10}  {}".format("entry point", "import ms", "process ms",
+                                              "heavy modules")]
+    for r in results:
+        lines.append("{:<16} {:>9.0f} {:>10.0f}  {}{}".format(
+            r.name, r.import_s * 1000, r.process_s * 1000, ", ".join(r.heavy) or "-",
+            "  (prints on import)" if r.output else ""))
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Measure entry point import times")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per entry point")
+    args = parser.parse_args(argv)
+    print(format_results(measure_all(repeat=args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
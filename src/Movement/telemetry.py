@@ -0,0 +1,205 @@
+"""
+telemetry.py – PC side of the brick's UDP motor telemetry (see ``telemetry_publisher`` in
+``Movement/main.py`` and the datagram layout in :mod:`Movement.wire`).
+
+A background thread receives samples into a fixed-size ring buffer; queries return NumPy
+copies so callers never see the ring change underneath them.
+
+```python
+with TelemetryReceiver() as rx:
+    ...
+    s = rx.latest()
+    left, right = rx.wheel_positions_at(time.time() - 0.1)
+    recent = rx.samples(since=time.time() - 1.0)     # structured array, brick clock
+```
+
+Sample times are the brick's ``time.time()``; :attr:`TelemetryReceiver.clock_offset`
+estimates PC minus brick clock from the fastest-arriving datagrams.
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socket
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from Movement import wire
+
+__all__ = [
+    "SAMPLE_DTYPE",
+    "TelemetryReceiver",
+]
+
+SAMPLE_DTYPE = np.dtype([
+    ("seq", np.uint32), ("t", np.float64), ("arrival", np.float64),
+    ("left_pos", np.int32), ("left_speed", np.int32),
+    ("right_pos", np.int32), ("right_speed", np.int32),
+    ("gate_pos", np.int32), ("gate_speed", np.int32),
+    ("push_pos", np.int32), ("push_speed", np.int32),
+    ("flags", np.uint8),
+])
+
+_OFFSET_WINDOW = 200      # samples used for the clock-offset estimate
+
+
+class TelemetryReceiver:
+    """Collect telemetry datagrams into a ring of the last *capacity* samples."""
+
+    def __init__(self, port: int = wire.TELEMETRY_PORT, host: str = "", *,
+                 capacity: int = 2048):
+        self.host = host
+        self.port = port
+        self.capacity = capacity
+        self._ring = np.zeros(capacity, SAMPLE_DTYPE)
+        self._count = 0                       # samples ever stored
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.lost = 0                         # gaps in the sequence numbers
+        self.rejected = 0                     # malformed, duplicate or late datagrams
+        self.restarts = 0                     # sequence restarted by the brick
+
+    # ------------------------------ lifecycle ------------------------------
+    def start(self) -> "TelemetryReceiver":
+        if self._thread is not None:
+            return self
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.settimeout(0.2)
+        self._sock = sock
+        self.port = sock.getsockname()[1]     # resolves port 0 in tests
+        self._thread = threading.Thread(target=self._recv_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def __enter__(self) -> "TelemetryReceiver":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _recv_loop(self) -> None:
+        sock = self._sock
+        while self._thread is not None:
+            try:
+                data, _ = sock.recvfrom(256)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.feed(data)
+
+    # ------------------------------ ingest ---------------------------------
+    def feed(self, data: bytes, arrival: Optional[float] = None) -> bool:
+        """Store one datagram; returns False if it was rejected."""
+        try:
+            sample = wire.unpack_telemetry(data)
+        except wire.ProtocolError:
+            self.rejected += 1
+            return False
+        arrival = time.time() if arrival is None else arrival
+        with self._lock:
+            if self._count:
+                prev = self._ring[(self._count - 1) % self.capacity]
+                last = int(prev["seq"])
+                behind = sample.seq <= last and last - sample.seq < 1 << 31
+                if sample.t <= prev["t"]:
+                    self.rejected += 1            # duplicate or overtaken
+                    return False
+                if behind:
+                    # Later brick time but an older seq: the publisher restarted (brick
+                    # program or supervisor) and counts from 0 again.  A new stream.
+                    self.restarts += 1
+                else:
+                    self.lost += (sample.seq - last - 1) & 0xFFFFFFFF
+            row = self._ring[self._count % self.capacity]
+            row["arrival"] = arrival
+            for name, value in zip(sample._fields, sample):
+                row[name] = value
+            self._count += 1
+            self.received += 1
+        return True
+
+    # ------------------------------ queries --------------------------------
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def _ordered(self) -> np.ndarray:
+        """Copy of the stored samples, oldest first (caller holds the lock)."""
+        n = min(self._count, self.capacity)
+        if self._count <= self.capacity:
+            return self._ring[:n].copy()
+        start = self._count % self.capacity
+        return np.concatenate((self._ring[start:], self._ring[:start]))
+
+    def latest(self) -> Optional[wire.TelemetrySample]:
+        with self._lock:
+            if not self._count:
+                return None
+            row = self._ring[(self._count - 1) % self.capacity]
+            return wire.TelemetrySample(*(row[f].item() for f in wire.TelemetrySample._fields))
+
+    def samples(self, since: Optional[float] = None,
+                until: Optional[float] = None) -> np.ndarray:
+        """Structured array (SAMPLE_DTYPE) of samples with brick time in [since, until]."""
+        with self._lock:
+            data = self._ordered()
+        lo = 0 if since is None else np.searchsorted(data["t"], since, "left")
+        hi = len(data) if until is None else np.searchsorted(data["t"], until, "right")
+        return data[lo:hi]
+
+    def wheel_positions_at(self, t: float) -> Optional[Tuple[float, float]]:
+        """Left/right wheel angles (deg) at brick time *t*, linearly interpolated.
+
+        Clamped to the oldest/newest sample; None while nothing was received.
+        """
+        with self._lock:
+            data = self._ordered()
+        if not len(data):
+            return None
+        ts = data["t"]
+        return (float(np.interp(t, ts, data["left_pos"])),
+                float(np.interp(t, ts, data["right_pos"])))
+
+    @property
+    def clock_offset(self) -> Optional[float]:
+        """PC ``time.time()`` minus brick time, from the least-delayed recent datagram."""
+        with self._lock:
+            data = self._ordered()[-_OFFSET_WINDOW:]
+        if not len(data):
+            return None
+        return float(np.min(data["arrival"] - data["t"]))
+
+    def to_local_time(self, t: float) -> float:
+        """Convert brick time *t* to PC time (unchanged until a sample has arrived)."""
+        offset = self.clock_offset
+        return t if offset is None else t + offset
+
+    def motor_state(self, motor: str) -> Optional[Tuple[bool, bool]]:
+        """``(running, stalled)`` for *motor* (one of ``wire.TELEMETRY_MOTORS``) right now."""
+        i = wire.TELEMETRY_MOTORS.index(motor)
+        sample = self.latest()
+        if sample is None:
+            return None
+        return bool(sample.flags >> (2 * i) & 1), bool(sample.flags >> (2 * i + 1) & 1)
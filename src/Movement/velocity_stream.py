@@ -0,0 +1,136 @@
+"""
+velocity_stream.py – PC side of streaming control: wheel speed setpoints over UDP.
+
+Instead of one discrete command per frame, the control loop calls :meth:`VelocityStreamer.set`
+(or :meth:`VelocityStreamer.set_body`) every frame; a background thread repeats the latest
+setpoint at *rate_hz* so the brick's watchdog stays fed between frames.  A setpoint is only
+repeated for *hold_s* after the last ``set`` – if the control loop stalls, the stream stops
+and the brick brakes on its own (see ``CommandServer.velocity_listener``).
+
+```python
+with VelocityStreamer() as drive:
+    while ...:
+        drive.set_body(120, heading_error * 3)     # mm/s, deg/s clockwise
+```
+"""
+from __future__ import annotations
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socket
+import threading
+import time
+
+from Movement import drive_model as dm
+from Movement import wire
+
+__all__ = [
+    "VelocityStreamer",
+]
+
+EV3_IP = "192.168.147.36"   # same brick as AutonomousClient.EV3_IP
+
+
+class VelocityStreamer:
+    """Send tank-drive setpoints (deg/s per wheel) to the brick at a fixed rate."""
+
+    def __init__(self, host: str = EV3_IP, port: int = wire.VELOCITY_PORT, *,
+                 rate_hz: float = 30.0, ttl_s: float = 0.25, hold_s: float = 0.25):
+        self.address = (host, port)
+        self.period = 1.0 / rate_hz
+        self.ttl_ms = int(ttl_s * 1000)
+        self.hold_s = hold_s
+        self.sent = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._seq = 0
+        self._setpoint = (0.0, 0.0)
+        self._set_at = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ------------------------------ lifecycle ------------------------------
+    def start(self) -> "VelocityStreamer":
+        if self._thread is None:
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop streaming and brake (zero setpoint, sent a few times since UDP may drop it)."""
+        thread, self._thread = self._thread, None
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        for _ in range(3):
+            self._send(0.0, 0.0)
+
+    def close(self) -> None:
+        self.stop()
+        self._sock.close()
+
+    def __enter__(self) -> "VelocityStreamer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------ setpoints ------------------------------
+    @property
+    def setpoint(self) -> tuple[float, float]:
+        return self._setpoint
+
+    def set(self, left_dps: float, right_dps: float) -> None:
+        """New wheel speeds; sent right away and repeated until the next call."""
+        with self._lock:
+            self._setpoint = (float(left_dps), float(right_dps))
+            self._set_at = time.monotonic()
+        self._send(*self._setpoint)
+
+    def set_body(self, speed_mm_s: float, turn_rate_deg_s: float) -> None:
+        """Forward speed and turn rate (+ve clockwise, like headings) instead of wheel speeds."""
+        self.set(*dm.wheel_speeds_dps(speed_mm_s, turn_rate_deg_s))
+
+    def halt(self) -> None:
+        """Brake now and send nothing more until the next ``set``.
+
+        Call this before queueing a command that drives the wheels itself: a stream that
+        keeps going would brake it on every repeat and let the watchdog stop it.
+        """
+        with self._lock:
+            self._setpoint = (0.0, 0.0)
+            self._set_at = float("-inf")
+        for _ in range(3):                # UDP may drop one
+            self._send(0.0, 0.0)
+
+    def _pack(self, left: float, right: float) -> bytes:
+        """Next datagram; call with the lock held so sequence numbers follow the setpoints."""
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        return wire.pack_velocity(self._seq, left, right, self.ttl_ms)
+
+    def _send(self, left: float, right: float) -> None:
+        with self._lock:
+            data = self._pack(left, right)
+        self._transmit(data)
+
+    def _transmit(self, data: bytes) -> None:
+        try:
+            self._sock.sendto(data, self.address)
+            self.sent += 1
+        except OSError:
+            pass                          # brick unreachable; its watchdog takes over
+
+    def _loop(self) -> None:
+        while self._thread is not None:
+            self._wake.wait(self.period)
+            if self._thread is None:
+                break
+            with self._lock:              # a repeat never overtakes a halt()
+                data = (self._pack(*self._setpoint)
+                        if time.monotonic() - self._set_at <= self.hold_s else None)
+            if data is not None:
+                self._transmit(data)
@@ -0,0 +1,309 @@
+"""
+wire.py – Message framing shared by the PC client and the EV3 command server.
+
+Runs on the brick too, so it sticks to what the ev3dev Python (3.5) supports:
+no f-strings and no third-party imports.
+
+Every message is a fixed header followed by *length* payload bytes::
+
+    magic "GB" | version (B) | type (B) | request id (I) | length (I)
+
+The magic lets the server tell framed sessions apart from the original one-shot clients,
+which send raw script text and half-close the socket.
+
+``MSG_COMMANDS`` carries a batch of binary commands instead of Python text, so the brick
+dispatches through a table instead of compiling and exec-ing a script::
+
+    opcode (B) | argc (B) | argc × float32 (f)  …repeated
+
+``MSG_ENQUEUE`` is the pipelined variant: the request id is a sequence number, the brick
+answers at once with ``MSG_STATUS`` *queued* and later with *started* and *done* or
+*failed*, so the PC can keep the brick's queue topped up instead of waiting on each reply.
+
+Motor telemetry goes the other way as single UDP datagrams (no framing, losses are fine)::
+
+    magic "GT" | version (B) | seq (I) | time (d) | 4 × (position (i), speed (i)) | flags (B)
+
+Motors are in TELEMETRY_MOTORS order; positions are tacho degrees, speeds deg/s.
+
+Streaming control sends wheel speed setpoints (tank drive) to the brick the same way::
+
+    magic "GV" | version (B) | seq (I) | left deg/s (f) | right deg/s (f) | ttl ms (H)
+
+The brick stops the drive motors when no fresh setpoint arrives within *ttl*.
+"""
+
+import struct
+from collections import namedtuple
+
+MAGIC = b"GB"
+VERSION = 1
+HEADER = struct.Struct(">2sBBII")
+MAX_PAYLOAD = 1 << 20
+
+# Message types
+MSG_SCRIPT = 1      # PC -> brick: Python script text
+MSG_REPLY = 2       # brick -> PC: reply text for a request id
+MSG_PING = 3        # either way: keepalive probe
+MSG_PONG = 4        # answer to MSG_PING, same request id
+MSG_COMMANDS = 5    # PC -> brick: binary command batch (see OPCODES)
+MSG_ENQUEUE = 6     # PC -> brick: queue a script/batch, request id = sequence number
+MSG_STATUS = 7      # brick -> PC: status byte (+ text) for an enqueued sequence number
+MSG_QUERY_DEPTH = 8 # PC -> brick: how much work is waiting
+MSG_DEPTH = 9       # brick -> PC: DEPTH payload
+MSG_ABORT = 10      # PC -> brick: flags (B); abort the running command -> MSG_DEPTH
+MSG_REPLACE = 11    # PC -> brick: flags (B) + ENQUEUE payload; clear the queue, then enqueue
+MSG_PRIORITY = 12   # PC -> brick: command batch run at once, ahead of the queue -> MSG_REPLY
+MSG_QUERY_HEALTH = 13  # PC -> brick: is the server ready, has anything crashed?
+MSG_HEALTH = 14     # brick -> PC: HEALTH payload + utf-8 description of the last fault
+
+ABORT_CLEAR_QUEUE = 1      # MSG_ABORT flag: also cancel everything queued
+REPLACE_ABORT_CURRENT = 1  # MSG_REPLACE flag: also abort the running command
+PRIORITY_COMMANDS = ("stop_drive",)   # the only primitives allowed in MSG_PRIORITY
+
+# MSG_ENQUEUE payload: kind (B) + script text or command batch
+KIND_SCRIPT = 0
+KIND_COMMANDS = 1
+
+# MSG_STATUS payload: status (B) + optional utf-8 detail
+STATUS_QUEUED = 1
+STATUS_STARTED = 2
+STATUS_DONE = 3
+STATUS_FAILED = 4
+STATUS_CANCELLED = 5       # removed from the queue or aborted while running
+STATUS_NAMES = {STATUS_QUEUED: "queued", STATUS_STARTED: "started",
+                STATUS_DONE: "done", STATUS_FAILED: "failed", STATUS_CANCELLED: "cancelled"}
+
+# MSG_DEPTH payload: commands waiting in the queue (I), one executing right now (B).
+# As the answer to MSG_ABORT: commands cancelled from the queue, running command aborted.
+DEPTH = struct.Struct(">IB")
+
+# MSG_HEALTH payload: ready (B), uptime s (d), worker restarts (I), commands done (I),
+# commands failed (I), commands queued (I), one executing (B); then the last fault text.
+HEALTH = struct.Struct(">BdIIIIB")
+Health = namedtuple("Health", (
+    "ready", "uptime_s", "restarts", "completed", "failed", "queued", "busy", "fault"))
+
+# Telemetry datagrams
+TELEMETRY_MAGIC = b"GT"
+TELEMETRY_PORT = 5533
+TELEMETRY = struct.Struct(">2sBIdiiiiiiiiB")
+TELEMETRY_MOTORS = ("left", "right", "gate", "push")
+# flags: bit 2*i = motor i running, bit 2*i+1 = motor i stalled
+TelemetrySample = namedtuple("TelemetrySample", (
+    "seq", "t", "left_pos", "left_speed", "right_pos", "right_speed",
+    "gate_pos", "gate_speed", "push_pos", "push_speed", "flags"))
+
+# Velocity setpoint datagrams
+VELOCITY_MAGIC = b"GV"
+VELOCITY_PORT = 5534
+VELOCITY = struct.Struct(">2sBIffH")
+
+# Binary command set: opcode -> (primitive name on the brick, max argument count)
+OPCODES = {
+    1: ("turn_left_deg", 1),
+    2: ("turn_right_deg", 1),
+    3: ("drive_straight_mm", 5),
+    4: ("reverse_drive_mm", 5),
+    5: ("turn_deg", 5),
+    6: ("open_gate", 0),
+    7: ("close_gate", 0),
+    8: ("push_out", 0),
+    9: ("push_return", 0),
+    10: ("stop_drive", 1),
+    11: ("arc_left_mm", 4),
+    12: ("arc_right_mm", 4),
+    13: ("drive_path", 64),      # up to 32 (radius, distance) segments
+}
+OPCODE_BY_NAME = dict((name, op) for op, (name, _) in OPCODES.items())
+_CMD_HEAD = struct.Struct(">BB")
+
+
+class ProtocolError(Exception):
+    """Raised when the peer sends something that is not a valid frame."""
+
+
+def pack_message(msg_type, request_id, payload=b""):
+    """Return the bytes of one framed message."""
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError("payload too large: {} bytes".format(len(payload)))
+    return HEADER.pack(MAGIC, VERSION, msg_type, request_id & 0xFFFFFFFF, len(payload)) + payload
+
+
+def send_message(sock, msg_type, request_id, payload=b""):
+    sock.sendall(pack_message(msg_type, request_id, payload))
+
+
+def recv_exact(sock, n, prefix=b""):
+    """Read exactly *n* bytes (including *prefix*); return fewer only if the peer closed."""
+    chunks = [prefix]
+    got = len(prefix)
+    while got < n:
+        chunk = sock.recv(n - got)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        got += len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock, prefix=b""):
+    """Read one message: ``(msg_type, request_id, payload)`` or None on clean EOF.
+
+    *prefix* holds header bytes the caller already consumed (e.g. the magic while sniffing
+    the protocol).
+    """
+    header = recv_exact(sock, HEADER.size, prefix)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        raise ProtocolError("connection closed inside a header")
+    magic, version, msg_type, request_id, length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ProtocolError("bad magic {!r}".format(magic))
+    if version != VERSION:
+        raise ProtocolError("unsupported protocol version {}".format(version))
+    if length > MAX_PAYLOAD:
+        raise ProtocolError("payload too large: {} bytes".format(length))
+    payload = recv_exact(sock, length)
+    if len(payload) < length:
+        raise ProtocolError("connection closed inside a payload")
+    return msg_type, request_id, payload
+
+
+def pack_status(status, detail=""):
+    return struct.pack(">B", status) + detail.encode("utf-8")
+
+
+def unpack_status(payload):
+    """Return ``(status, detail)`` from a MSG_STATUS payload."""
+    if not payload:
+        raise ProtocolError("empty status payload")
+    return payload[0], payload[1:].decode("utf-8")
+
+
+def pack_health(health):
+    fields = (1 if health.ready else 0, health.uptime_s, health.restarts, health.completed,
+              health.failed, health.queued, 1 if health.busy else 0)
+    return HEALTH.pack(*fields) + health.fault.encode("utf-8")
+
+
+def unpack_health(payload):
+    """Parse a MSG_HEALTH payload into a Health tuple."""
+    if len(payload) < HEALTH.size:
+        raise ProtocolError("health payload of {} bytes".format(len(payload)))
+    ready, uptime_s, restarts, completed, failed, queued, busy = HEALTH.unpack_from(payload)
+    return Health(bool(ready), uptime_s, restarts, completed, failed, queued, bool(busy),
+                  payload[HEALTH.size:].decode("utf-8"))
+
+
+def motor_flags(states):
+    """Pack ev3dev ``motor.state`` lists (TELEMETRY_MOTORS order) into the flags byte."""
+    flags = 0
+    for i, state in enumerate(states):
+        if "running" in state:
+            flags |= 1 << (2 * i)
+        if "stalled" in state:
+            flags |= 1 << (2 * i + 1)
+    return flags
+
+
+def pack_telemetry(sample):
+    return TELEMETRY.pack(TELEMETRY_MAGIC, VERSION, *sample)
+
+
+def unpack_telemetry(data):
+    """Parse one telemetry datagram into a TelemetrySample."""
+    if len(data) != TELEMETRY.size:
+        raise ProtocolError("telemetry datagram of {} bytes".format(len(data)))
+    fields = TELEMETRY.unpack(data)
+    if fields[0] != TELEMETRY_MAGIC or fields[1] != VERSION:
+        raise ProtocolError("not a telemetry datagram")
+    return TelemetrySample(*fields[2:])
+
+
+def pack_velocity(seq, left_dps, right_dps, ttl_ms):
+    return VELOCITY.pack(VELOCITY_MAGIC, VERSION, seq & 0xFFFFFFFF, left_dps, right_dps,
+                         min(int(ttl_ms), 0xFFFF))
+
+
+def unpack_velocity(data):
+    """Parse a setpoint datagram into ``(seq, left_dps, right_dps, ttl_ms)``."""
+    if len(data) != VELOCITY.size:
+        raise ProtocolError("velocity datagram of {} bytes".format(len(data)))
+    fields = VELOCITY.unpack(data)
+    if fields[0] != VELOCITY_MAGIC or fields[1] != VERSION:
+        raise ProtocolError("not a velocity datagram")
+    return fields[2:]
+
+
+# ----------------------------------------------------------------------
+# Binary command batches
+# ----------------------------------------------------------------------
+
+def encode_commands(commands):
+    """Pack ``[(name, args), ...]`` into a MSG_COMMANDS payload."""
+    out = []
+    for name, args in commands:
+        op = OPCODE_BY_NAME.get(name)
+        if op is None:
+            raise ProtocolError("no opcode for {!r}".format(name))
+        if len(args) > OPCODES[op][1]:
+            raise ProtocolError("too many arguments for {}".format(name))
+        out.append(_CMD_HEAD.pack(op, len(args)))
+        out.append(struct.pack(">" + "f" * len(args), *args))
+    return b"".join(out)
+
+
+def decode_commands(payload):
+    """Unpack a MSG_COMMANDS payload into ``[(opcode, args), ...]``."""
+    commands = []
+    pos = 0
+    while pos < len(payload):
+        if pos + _CMD_HEAD.size > len(payload):
+            raise ProtocolError("truncated command header")
+        op, argc = _CMD_HEAD.unpack_from(payload, pos)
+        pos += _CMD_HEAD.size
+        if op not in OPCODES or argc > OPCODES[op][1]:
+            raise ProtocolError("bad command {} with {} args".format(op, argc))
+        end = pos + 4 * argc
+        if end > len(payload):
+            raise ProtocolError("truncated command arguments")
+        commands.append((op, struct.unpack_from(">" + "f" * argc, payload, pos)))
+        pos = end
+    return commands
+
+
+def parse_script(script):
+    """Turn a plain command script into ``[(name, args), ...]``, or None.
+
+    Only scripts made of calls to primitives in OPCODES with numeric literal arguments
+    qualify, e.g. ``"turn_left_deg(90)\ndrive_straight_mm(120.5)\n"``.  Anything else
+    (loops, variables, ``mdiff`` access, …) returns None and has to go as text.
+    """
+    import ast  # PC side only; keeps the brick's import time down
+
+    try:
+        tree = ast.parse(script)
+    except SyntaxError:
+        return None
+    commands = []
+    for stmt in tree.body:
+        call = getattr(stmt, "value", None)
+        if not isinstance(stmt, ast.Expr) or not isinstance(call, ast.Call):
+            return None
+        if not isinstance(call.func, ast.Name) or call.func.id not in OPCODE_BY_NAME or call.keywords:
+            return None
+        args = []
+        for arg in call.args:
+            try:
+                value = ast.literal_eval(arg)
+            except ValueError:
+                return None
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            args.append(float(value))
+        if len(args) > OPCODES[OPCODE_BY_NAME[call.func.id]][1]:
+            return None
+        commands.append((call.func.id, tuple(args)))
+    return commands
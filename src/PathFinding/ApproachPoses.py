@@ -0,0 +1,312 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from PathFinding.ArrowVector import ArrowVector, heading_diff
+from Movement.commands import CLOSE_GATE, OPEN_GATE, CommandSequence, drive, turn
+
+__all__ = [
+    "ArenaModel",
+    "RobotGeometry",
+    "ApproachPose",
+    "ApproachLibrary",
+    "get_approach_library",
+    "approach_commands",
+]
+
+
+# ---------------------------------------------------------------------------
+# Arena / robot description
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ArenaModel:
+    """Static obstacles of the playing field in warped-image coordinates (1 unit = 1 mm).
+
+    The defaults match ``TRANSFORM_W, TRANSFORM_H = 1200, 1800`` used by the vision code,
+    with the cross in the centre of the arena.
+    """
+
+    width_mm: float = 1200.0
+    height_mm: float = 1800.0
+    cross_center: tuple[float, float] = (600.0, 900.0)
+    cross_size_mm: float = 200.0        # tip-to-tip length of each arm
+    cross_arm_width_mm: float = 30.0
+    cross_angle_deg: float = 0.0        # rotation of the cross in image coordinates
+    clearance_mm: float = 20.0          # safety margin kept to walls and cross
+
+
+@dataclass(frozen=True)
+class RobotGeometry:
+    """Footprint of the robot relative to its pose point (the point `get_robot_pose` reports)."""
+
+    length_mm: float = 220.0
+    width_mm: float = 160.0
+    front_offset_mm: float = 110.0      # pose point -> front bumper
+    gate_width_mm: float = 80.0         # opening between the gate arms
+    capture_depth_mm: float = 50.0      # how far past the front the ball sits when caught
+    ball_diameter_mm: float = 40.0
+
+    @property
+    def rear_offset_mm(self) -> float:
+        return self.length_mm - self.front_offset_mm
+
+    @property
+    def capture_offset_mm(self) -> float:
+        """Distance from the pose point to the ball once it is inside the gate."""
+        return self.front_offset_mm - self.capture_depth_mm
+
+    @property
+    def turn_radius_mm(self) -> float:
+        """Radius swept by the footprint when turning in place around the pose point."""
+        half_w = self.width_mm / 2
+        return math.hypot(max(self.front_offset_mm, self.rear_offset_mm), half_w)
+
+
+@dataclass(frozen=True)
+class ApproachPose:
+    """Where to stand and which way to face before the final capture drive."""
+
+    x: float
+    y: float
+    heading_deg: float
+    standoff_mm: float          # ball -> pose point distance at the approach pose
+    capture_drive_mm: float     # straight drive from the approach pose into the ball
+
+
+# ---------------------------------------------------------------------------
+# Geometry helpers (vectorised over grid cells)
+# ---------------------------------------------------------------------------
+
+
+def _cross_arms(arena: ArenaModel):
+    """Return the two cross arms as (centre, unit axes, half extents)."""
+    a = math.radians(arena.cross_angle_deg)
+    u = np.array([math.cos(a), math.sin(a)])
+    v = np.array([-u[1], u[0]])
+    half_len = arena.cross_size_mm / 2 + arena.clearance_mm
+    half_w = arena.cross_arm_width_mm / 2 + arena.clearance_mm
+    c = np.asarray(arena.cross_center, dtype=np.float64)
+    return [(c, u, v, half_len, half_w), (c, v, -u, half_len, half_w)]
+
+
+def _rect_hits_arm(centres, ru, rv, r_half_u, r_half_v, arm) -> np.ndarray:
+    """Separating-axis test between N rotated rectangles sharing one orientation and an arm."""
+    ac, au, av, a_half_u, a_half_v = arm
+    d = centres - ac
+    overlap = np.ones(len(centres), dtype=bool)
+    for axis in (ru, rv, au, av):
+        dist = np.abs(d @ axis)
+        r_proj = r_half_u * abs(ru @ axis) + r_half_v * abs(rv @ axis)
+        a_proj = a_half_u * abs(au @ axis) + a_half_v * abs(av @ axis)
+        overlap &= dist <= r_proj + a_proj
+    return overlap
+
+
+def _circle_hits_arm(centres, radius, arm) -> np.ndarray:
+    ac, au, av, a_half_u, a_half_v = arm
+    d = centres - ac
+    du = np.clip(d @ au, -a_half_u, a_half_u)
+    dv = np.clip(d @ av, -a_half_v, a_half_v)
+    closest = ac + np.outer(du, au) + np.outer(dv, av)
+    return np.hypot(*(centres - closest).T) <= radius
+
+
+def _inside_walls(points, arena: ArenaModel, margin: float = 0.0) -> np.ndarray:
+    lo = arena.clearance_mm + margin
+    return ((points[:, 0] >= lo) & (points[:, 0] <= arena.width_mm - lo) &
+            (points[:, 1] >= lo) & (points[:, 1] <= arena.height_mm - lo))
+
+
+# ---------------------------------------------------------------------------
+# Library
+# ---------------------------------------------------------------------------
+
+
+class ApproachLibrary:
+    """Lookup grid of collision-free approach headings and stand-off distances.
+
+    For every grid cell and candidate heading the smallest feasible stand-off is stored
+    (``-1`` if the ball in that cell cannot be captured from that direction).  Building the
+    grid is vectorised with NumPy; :meth:`lookup` is a constant-time table read.
+    """
+
+    def __init__(self, arena: ArenaModel, robot: RobotGeometry, cell_mm: float,
+                 headings_deg: np.ndarray, standoffs_mm: np.ndarray,
+                 best_standoff: np.ndarray):
+        self.arena = arena
+        self.robot = robot
+        self.cell_mm = float(cell_mm)
+        self.headings_deg = np.asarray(headings_deg, dtype=np.float64)
+        self.standoffs_mm = np.asarray(standoffs_mm, dtype=np.float64)
+        self.best_standoff = best_standoff  # (nx, ny, nh) int8 index into standoffs_mm
+
+    # ------------------------------ build -----------------------------------
+    @classmethod
+    def build(cls, arena: ArenaModel = ArenaModel(), robot: RobotGeometry = RobotGeometry(), *,
+              cell_mm: float = 20.0, heading_step_deg: float = 15.0,
+              standoffs_mm: tuple[float, ...] | None = None,
+              check_turn_clearance: bool = True) -> "ApproachLibrary":
+        """Precompute the lookup grid for *arena* and *robot*."""
+        if robot.gate_width_mm <= robot.ball_diameter_mm:
+            raise ValueError("gate_width_mm must be larger than ball_diameter_mm")
+
+        if standoffs_mm is None:
+            base = robot.front_offset_mm + robot.ball_diameter_mm
+            standoffs_mm = (base, base + 60.0, base + 120.0)
+        standoffs = np.asarray(sorted(standoffs_mm), dtype=np.float64)
+        if standoffs[0] <= robot.capture_offset_mm:
+            raise ValueError("stand-off distances must exceed the capture offset")
+
+        nx = int(math.ceil(arena.width_mm / cell_mm))
+        ny = int(math.ceil(arena.height_mm / cell_mm))
+        gx, gy = np.meshgrid((np.arange(nx) + 0.5) * cell_mm,
+                             (np.arange(ny) + 0.5) * cell_mm, indexing="ij")
+        balls = np.column_stack([gx.ravel(), gy.ravel()])
+
+        headings = np.arange(0.0, 360.0, heading_step_deg)
+        best = np.full((nx * ny, len(headings)), -1, dtype=np.int8)
+        arms = _cross_arms(arena)
+        half_w = robot.width_mm / 2
+
+        for ih, h in enumerate(headings):
+            u = np.array([math.cos(math.radians(h)), math.sin(math.radians(h))])
+            v = np.array([-u[1], u[0]])
+            # Go from the largest stand-off down so the smallest feasible one wins.
+            for js in range(len(standoffs) - 1, -1, -1):
+                s = standoffs[js]
+                # Swept footprint: rear of the approach pose to front of the capture pose.
+                back = -(s + robot.rear_offset_mm)
+                front = robot.capture_depth_mm
+                centres = balls + np.outer(np.full(len(balls), (back + front) / 2), u)
+                half_u = (front - back) / 2
+                ok = np.ones(len(balls), dtype=bool)
+                for su in (-half_u, half_u):
+                    for sv in (-half_w, half_w):
+                        ok &= _inside_walls(centres + su * u + sv * v, arena)
+                for arm in arms:
+                    ok &= ~_rect_hits_arm(centres, u, v, half_u, half_w, arm)
+                if check_turn_clearance:
+                    pose = balls - s * u
+                    ok &= _inside_walls(pose, arena, robot.turn_radius_mm)
+                    for arm in arms:
+                        ok &= ~_circle_hits_arm(pose, robot.turn_radius_mm, arm)
+                best[ok, ih] = js
+
+        return cls(arena, robot, cell_mm, headings, standoffs,
+                   best.reshape(nx, ny, len(headings)))
+
+    # ------------------------------ lookup ----------------------------------
+    def feasible_headings(self, ball: tuple[float, float]) -> list[float]:
+        """All headings from which *ball* can be captured, in degrees."""
+        row = self._row(ball)
+        if row is None:
+            return []
+        return [float(h) for h, j in zip(self.headings_deg, row) if j >= 0]
+
+    def lookup(self, ball: tuple[float, float],
+               preferred_heading_deg: float | None = None) -> ApproachPose | None:
+        """Return the feasible approach pose closest to *preferred_heading_deg*, or None."""
+        row = self._row(ball)
+        if row is None:
+            return None
+        feasible = np.flatnonzero(row >= 0)
+        if feasible.size == 0:
+            return None
+        if preferred_heading_deg is None:
+            ih = feasible[0]
+        else:
+            diff = np.abs((self.headings_deg[feasible] - preferred_heading_deg + 180) % 360 - 180)
+            ih = feasible[np.argmin(diff)]
+
+        h = float(self.headings_deg[ih])
+        s = float(self.standoffs_mm[row[ih]])
+        rad = math.radians(h)
+        return ApproachPose(x=ball[0] - s * math.cos(rad),
+                            y=ball[1] - s * math.sin(rad),
+                            heading_deg=h,
+                            standoff_mm=s,
+                            capture_drive_mm=s - self.robot.capture_offset_mm)
+
+    def _row(self, ball):
+        ix = int(ball[0] // self.cell_mm)
+        iy = int(ball[1] // self.cell_mm)
+        nx, ny, _ = self.best_standoff.shape
+        if not (0 <= ix < nx and 0 <= iy < ny):
+            return None
+        return self.best_standoff[ix, iy]
+
+    # ------------------------------ persistence -----------------------------
+    def save(self, filename: str | Path) -> None:
+        """Store the grid as ``.npz`` so it does not have to be rebuilt at match time."""
+        np.savez_compressed(
+            Path(filename),
+            cell_mm=self.cell_mm,
+            headings_deg=self.headings_deg,
+            standoffs_mm=self.standoffs_mm,
+            best_standoff=self.best_standoff,
+        )
+
+    @classmethod
+    def load(cls, filename: str | Path, arena: ArenaModel = ArenaModel(),
+             robot: RobotGeometry = RobotGeometry()) -> "ApproachLibrary":
+        """Load a grid saved with :meth:`save` (the caller vouches for *arena*/*robot*)."""
+        with np.load(Path(filename)) as data:
+            return cls(arena, robot, float(data["cell_mm"]), data["headings_deg"],
+                       data["standoffs_mm"], data["best_standoff"])
+
+
+_LIBRARIES: dict[tuple, ApproachLibrary] = {}
+
+
+def get_approach_library(arena: ArenaModel = ArenaModel(),
+                         robot: RobotGeometry = RobotGeometry(),
+                         **build_kwargs) -> ApproachLibrary:
+    """Return the (cached) library for this arena configuration, building it on first use."""
+    key = (arena, robot, tuple(sorted(build_kwargs.items())))
+    lib = _LIBRARIES.get(key)
+    if lib is None:
+        lib = _LIBRARIES[key] = ApproachLibrary.build(arena, robot, **build_kwargs)
+    return lib
+
+
+# ---------------------------------------------------------------------------
+# Command generation
+# ---------------------------------------------------------------------------
+
+
+def approach_commands(robot_pos: tuple[float, float], heading_deg: float,
+                      approach: ApproachPose, *,
+                      min_leg_mm: float = 10.0, min_turn_deg: float = 1.0) -> CommandSequence:
+    """
+    Build the commands that drive to *approach* and capture the ball.
+
+    Args:
+        robot_pos: Current pose point (x, y).
+        heading_deg: Current heading, same convention as `get_robot_pose`.
+        approach: Result of :meth:`ApproachLibrary.lookup`.
+
+    Returns:
+        CommandSequence; ``.script()`` is the text for `send_and_receive`.
+    """
+    commands = CommandSequence()
+    leg = ArrowVector(robot_pos, (approach.x, approach.y))
+    if leg.get_size() > min_leg_mm:
+        diff = heading_diff(leg.get_angle(), heading_deg)
+        if abs(diff) > min_turn_deg:
+            commands += turn(diff)
+        commands += drive(leg.get_size())
+        heading_deg = leg.get_angle()
+
+    diff = heading_diff(approach.heading_deg, heading_deg)
+    if abs(diff) > min_turn_deg:
+        commands += turn(diff)
+
+    return commands + [OPEN_GATE, drive(approach.capture_drive_mm), CLOSE_GATE]
@@ -31,4 +31,12 @@ class ArrowVector:
 
     def get_size(self) -> float:
         """Return the magnitude (length) of the vector."""
-        return math.hypot(self._vector[0], self._vector[1])
\ No newline at end of file
+        return math.hypot(self._vector[0], self._vector[1])
+
+
+def heading_diff(target_deg: float, heading_deg: float) -> float:
+    """Signed turn from *heading_deg* to *target_deg* in (-180, 180], +ve clockwise."""
+    diff = (target_deg - heading_deg + 360) % 360
+    if diff > 180:
+        diff -= 360
+    return diff
@@ -2,10 +2,6 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import numpy as np
-from ImageRecognition.ImagePoints import get_transformed_points_from_image
-from ImageRecognition.ArrowDetection import detect_arrow_tip
-
 def get_closest_path_point(destination_points, reference_point) -> tuple[int, int]:
     """
     Return the single closest point from 'points' relative to the 'reference' point.
@@ -21,6 +17,9 @@ def get_closest_path_point(destination_points, reference_point) -> tuple[int, in
 
 # Example usage:
 if __name__ == "__main__":
+    from ImageRecognition.ImagePoints import get_transformed_points_from_image
+    from ImageRecognition.ArrowDetection import detect_arrow_tip
+
     # Get transformed points from ImageRecognition using the getter
     transformed_points = get_transformed_points_from_image()
     reference_point = detect_arrow_tip()  # Replace with your actual reference point
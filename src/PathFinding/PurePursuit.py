@@ -0,0 +1,239 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from PathFinding.ArrowVector import heading_diff
+
+__all__ = [
+    "PursuitStep",
+    "PurePursuit",
+]
+
+Point = Tuple[float, float]
+Pose = Tuple[Tuple[float, float], float]
+
+
+@dataclass(frozen=True)
+class PursuitStep:
+    """Result of one :meth:`PurePursuit.update`.
+
+    Curvature is 1/radius in 1/mm; positive curves right (clockwise, like headings), so
+    ``1 / curvature`` is directly the radius of ``arc_right_mm`` / ``drive_path``.
+    """
+
+    curvature: float
+    target: Point               # lookahead point being chased
+    heading_error_deg: float    # from the robot heading to the lookahead point
+    progress_mm: float          # path length up to the robot's projection
+    remaining_mm: float         # path length still to go
+    cross_track_mm: float       # distance from the path (+ve: path is to the right)
+    done: bool
+
+
+class PurePursuit:
+    """Follow a waypoint polyline by steering on arcs towards a point ahead on the path.
+
+    The lookahead distance grows with speed (*lookahead_mm* + *lookahead_gain_s* × speed,
+    capped at *max_lookahead_mm*) so slow, tight manoeuvres track closely and fast runs stay
+    smooth.  Progress along the path only moves forward and is searched within
+    *search_ahead_mm* of the last projection, so a path that crosses itself is not cut
+    short.  The path is done once the robot is within *goal_tolerance_mm* of its end.
+
+    Poses use the `get_robot_pose` conventions: ``((x, y), heading_deg)``, heading
+    clockwise from +x.
+
+    ```python
+    pursuit = PurePursuit([(400, 300), (700, 600), (700, 1000)], start=(200, 300))
+    while not pursuit.done:
+        script = pursuit.next_script(get_robot_pose(frame))     # arcs, step by step
+        # or, streaming: streamer.set_body(*pursuit.body_velocity(pose, 150))
+    ```
+    """
+
+    def __init__(self, waypoints, *, start: Optional[Point] = None,
+                 lookahead_mm: float = 120.0, lookahead_gain_s: float = 0.8,
+                 max_lookahead_mm: float = 400.0, goal_tolerance_mm: float = 30.0,
+                 search_ahead_mm: float = 300.0, max_arc_deg: float = 60.0,
+                 wheel_distance_mm: float = 50.0):
+        points = ([tuple(map(float, start))] if start is not None else []) + \
+                 [tuple(map(float, p)) for p in waypoints]
+        self.points: List[Point] = []
+        for p in points:
+            if not self.points or math.dist(p, self.points[-1]) > 1e-6:
+                self.points.append(p)
+        if not self.points:
+            raise ValueError("PurePursuit needs at least one waypoint")
+        self._cum = [0.0]
+        for a, b in zip(self.points, self.points[1:]):
+            self._cum.append(self._cum[-1] + math.dist(a, b))
+        self.lookahead_mm = lookahead_mm
+        self.lookahead_gain_s = lookahead_gain_s
+        self.max_lookahead_mm = max_lookahead_mm
+        self.goal_tolerance_mm = goal_tolerance_mm
+        self.search_ahead_mm = search_ahead_mm
+        self.max_arc_deg = max_arc_deg            # larger heading errors turn in place first
+        self.wheel_distance_mm = wheel_distance_mm
+        self.progress_mm = 0.0
+        self.done = False
+
+    @property
+    def length_mm(self) -> float:
+        return self._cum[-1]
+
+    def reset(self) -> None:
+        self.progress_mm = 0.0
+        self.done = False
+
+    def lookahead(self, speed_mm_s: float = 0.0) -> float:
+        return min(self.lookahead_mm + self.lookahead_gain_s * abs(speed_mm_s),
+                   self.max_lookahead_mm)
+
+    # ------------------------------ geometry -------------------------------
+    def point_at(self, s: float) -> Point:
+        """Point at path length *s* (clamped to the ends)."""
+        if len(self.points) == 1 or s <= 0:
+            return self.points[0]
+        if s >= self._cum[-1]:
+            return self.points[-1]
+        i = next(k for k in range(1, len(self._cum)) if self._cum[k] >= s)
+        a, b = self.points[i - 1], self.points[i]
+        t = (s - self._cum[i - 1]) / (self._cum[i] - self._cum[i - 1])
+        return a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])
+
+    def _project(self, p: Point) -> Tuple[float, float]:
+        """(path length, distance) of the closest path point within the search window."""
+        lo, hi = self.progress_mm - 1e-6, self.progress_mm + self.search_ahead_mm
+        best_s, best_d = self.progress_mm, math.dist(p, self.point_at(self.progress_mm))
+        for i in range(1, len(self.points)):
+            s0, s1 = self._cum[i - 1], self._cum[i]
+            if s1 < lo or s0 > hi:
+                continue
+            a, b = self.points[i - 1], self.points[i]
+            ab = (b[0] - a[0], b[1] - a[1])
+            t = ((p[0] - a[0]) * ab[0] + (p[1] - a[1]) * ab[1]) / ((s1 - s0) ** 2)
+            s = min(max(s0 + t * (s1 - s0), lo, s0), min(hi, s1))
+            d = math.dist(p, self.point_at(s))
+            if d < best_d:
+                best_s, best_d = s, d
+        return best_s, best_d
+
+    # ------------------------------ control --------------------------------
+    def update(self, pose: Pose, speed_mm_s: float = 0.0) -> PursuitStep:
+        """Advance progress to *pose* and compute the steering towards the lookahead point."""
+        (x, y), heading = pose
+        end = self.points[-1]
+        s, _ = self._project((x, y))
+        self.progress_mm = max(self.progress_mm, s)
+        if math.dist((x, y), end) <= self.goal_tolerance_mm:
+            self.done = True
+        target = self.point_at(self.progress_mm + self.lookahead(speed_mm_s))
+        h = math.radians(heading)
+        dx, dy = target[0] - x, target[1] - y
+        lateral = -dx * math.sin(h) + dy * math.cos(h)       # +ve: target to the right
+        dist2 = dx * dx + dy * dy
+        curvature = 2.0 * lateral / dist2 if dist2 > 1e-9 else 0.0
+        on_path = self.point_at(self.progress_mm)
+        cross = (-(on_path[0] - x) * math.sin(h) + (on_path[1] - y) * math.cos(h))
+        error = heading_diff(math.degrees(math.atan2(dy, dx)), heading) if dist2 > 1e-9 else 0.0
+        remaining = self.length_mm - self.progress_mm
+        if remaining <= 0:
+            remaining = math.dist((x, y), end)           # past the end, off to one side
+        return PursuitStep(curvature, target, error, self.progress_mm, remaining, cross,
+                           self.done)
+
+    def arc_command(self, pose: Pose, step_mm: float = 150.0,
+                    speed_mm_s: float = 0.0) -> Optional[Tuple[str, float, float]]:
+        """Next discrete motion: ``("turn", deg, 0)`` or ``("arc", radius_mm, distance_mm)``.
+
+        Radius 0 is a straight line.  Returns None once the path is done.
+        """
+        step = self.update(pose, speed_mm_s)
+        if step.done:
+            return None
+        if abs(step.heading_error_deg) > self.max_arc_deg:
+            return ("turn", step.heading_error_deg, 0.0)
+        (x, y), _ = pose
+        distance = min(step_mm, step.remaining_mm, math.dist((x, y), step.target) or step_mm)
+        if abs(step.curvature) < 1e-5:
+            return ("arc", 0.0, distance)
+        radius = 1.0 / step.curvature
+        if abs(radius) < self.wheel_distance_mm / 2:           # tighter than the wheel base
+            return ("turn", step.heading_error_deg, 0.0)
+        return ("arc", radius, distance)
+
+    def next_script(self, pose: Pose, step_mm: float = 150.0, speed_mm_s: float = 0.0) -> str:
+        """`arc_command` as a script line for the brick ("" once done)."""
+        cmd = self.arc_command(pose, step_mm, speed_mm_s)
+        if cmd is None:
+            return ""
+        kind, a, d = cmd
+        if kind == "turn":
+            return (f"turn_right_deg({abs(a):.1f})\n" if a > 0
+                    else f"turn_left_deg({abs(a):.1f})\n")
+        if a == 0:
+            return f"drive_straight_mm({d:.1f})\n"
+        if a > 0:
+            return f"arc_right_mm({a:.1f}, {d:.1f})\n"
+        return f"arc_left_mm({-a:.1f}, {d:.1f})\n"
+
+    def body_velocity(self, pose: Pose, speed_mm_s: float,
+                      max_turn_deg_s: float = 180.0) -> Tuple[float, float]:
+        """Streaming control: ``(speed_mm_s, turn_rate_deg_s)`` along the pursuit arc.
+
+        Feed it to `VelocityStreamer.set_body` or `drive_model.wheel_speeds_dps`.  Zero once
+        done; turns in place while facing away from the path and slows down near the end
+        so the goal tolerance is not overshot.
+        """
+        step = self.update(pose, speed_mm_s)
+        if step.done:
+            return 0.0, 0.0
+        if abs(step.heading_error_deg) > self.max_arc_deg:
+            return 0.0, math.copysign(max_turn_deg_s, step.heading_error_deg)
+        speed_mm_s = min(speed_mm_s, max(step.remaining_mm, 20.0) * 2.0)
+        rate = math.degrees(speed_mm_s * step.curvature)
+        return speed_mm_s, max(-max_turn_deg_s, min(max_turn_deg_s, rate))
+
+    def rollout(self, pose: Pose, step_mm: float = 100.0,
+                max_steps: int = 500) -> List[Tuple[str, object]]:
+        """Plan the whole path open-loop by following it from *pose* on a kinematic model.
+
+        Returns pieces in the `Movement.CommandLoop.blend_polyline` format –
+        ``[("turn", deg), ("path", [(radius_mm, distance_mm), ...]), ...]`` – for scripts
+        that cannot close the loop on camera poses.  Progress is restored afterwards.
+        """
+        saved = (self.progress_mm, self.done)
+        (x, y), h = pose
+        pieces: List[Tuple[str, object]] = []
+        path: List[Tuple[float, float]] = []
+        for _ in range(max_steps):
+            cmd = self.arc_command(((x, y), h), step_mm)
+            if cmd is None:
+                break
+            kind, a, d = cmd
+            if kind == "turn":
+                if path:
+                    pieces.append(("path", path))
+                    path = []
+                pieces.append(("turn", a))
+                h += a
+                continue
+            path.append((a, d))
+            x, y, h = _travel(x, y, h, a, d)
+        if path:
+            pieces.append(("path", path))
+        self.progress_mm, self.done = saved
+        return pieces
+
+
+def _travel(x: float, y: float, h: float, radius: float, distance: float):
+    a = math.radians(h)
+    if radius == 0:
+        return x + distance * math.cos(a), y + distance * math.sin(a), h
+    a2 = a + distance / radius
+    return (x + radius * (math.sin(a2) - math.sin(a)),
+            y - radius * (math.cos(a2) - math.cos(a)),
+            math.degrees(a2))
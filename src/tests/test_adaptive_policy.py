@@ -0,0 +1,40 @@
+import sys
+sys.path.append("src")
+
+from Movement.frame_navigator import AdaptiveStepPolicy
+from Movement.nav_benchmark import SCENARIOS, benchmark
+
+
+def test_long_leg_is_driven_in_one_command():
+    policy = AdaptiveStepPolicy()
+    assert policy.next_command((0, 0), 0, (1000, 0)) == "drive_straight_mm(920)\n"
+    assert policy.next_command((0, 0), 0, (80.5, 0)) == "capture"
+    assert policy.next_command((0, 0), 0, (81.5, 0)) == "drive_straight_mm(2)\n"
+
+
+def test_tolerance_tightens_with_distance():
+    policy = AdaptiveStepPolicy()
+    assert policy.angle_tolerance(100) > 10 > policy.angle_tolerance(1000) == policy.min_angle_deg
+    assert policy.next_command((0, 0), 0, (100, 15)).startswith("drive_straight_mm")
+    assert policy.next_command((0, 0), 0, (1000, 100)).startswith("turn_right_deg(6)")
+
+
+def test_partial_step_shrinks_with_confidence_and_grows_with_latency():
+    policy = AdaptiveStepPolicy()
+    target = (1000, 40)                                   # ~2.3°: drivable, would miss
+    sure = policy.next_command((0, 0), 0, target)
+    unsure = policy.next_command((0, 0), 0, target, confidence=0.5)
+    slow_link = policy.next_command((0, 0), 0, target, latency_s=5.0)
+    steps = [int(c[len("drive_straight_mm("):-2]) for c in (sure, unsure, slow_link)]
+    assert steps[1] < steps[0] < steps[2] == 921
+
+
+def test_benchmark_fewer_commands_and_faster_captures():
+    results = benchmark({"fixed": None, "adaptive": AdaptiveStepPolicy()})
+    adaptive, fixed = results["adaptive"], results["fixed"]
+    assert all(r.captured for r in adaptive)
+    for a, f in zip(adaptive, fixed):
+        if f.captured:
+            assert a.commands <= f.commands and a.sim_s <= f.sim_s
+    assert sum(r.commands for r in adaptive) * 2 < sum(r.commands for r in fixed)
+    assert len(adaptive) == len(SCENARIOS)
@@ -0,0 +1,59 @@
+import sys
+sys.path.append("src")
+from PathFinding.ApproachPoses import (
+    ArenaModel,
+    RobotGeometry,
+    ApproachLibrary,
+    get_approach_library,
+    approach_commands,
+)
+from Movement.commands import CLOSE_GATE, OPEN_GATE, CommandSequence, drive
+
+
+def test_open_field_allows_every_heading():
+    lib = get_approach_library()
+    assert len(lib.feasible_headings((300, 400))) == len(lib.headings_deg)
+
+
+def test_ball_at_wall_must_be_approached_facing_the_wall():
+    lib = get_approach_library()
+    # Coming from the wall side would put the robot's rear outside the arena.
+    headings = lib.feasible_headings((1120, 400))
+    assert 0.0 in headings
+    assert 180.0 not in headings
+
+
+def test_ball_touching_wall_is_infeasible():
+    lib = get_approach_library()
+    assert lib.lookup((1190, 400)) is None
+
+
+def test_lookup_prefers_closest_feasible_heading():
+    lib = get_approach_library()
+    pose = lib.lookup((1120, 400), preferred_heading_deg=170)
+    assert pose is not None
+    assert pose.heading_deg == 0.0
+    assert pose.x < 1120
+    assert pose.capture_drive_mm > 0
+
+
+def test_ball_inside_cross_is_infeasible():
+    lib = get_approach_library()
+    assert lib.lookup(ArenaModel().cross_center) is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    lib = ApproachLibrary.build(ArenaModel(), RobotGeometry(), cell_mm=50)
+    path = tmp_path / "approach.npz"
+    lib.save(path)
+    loaded = ApproachLibrary.load(path)
+    assert (loaded.best_standoff == lib.best_standoff).all()
+    assert loaded.lookup((300, 400)) == lib.lookup((300, 400))
+
+
+def test_approach_commands_end_with_capture():
+    lib = get_approach_library()
+    pose = lib.lookup((300, 400), preferred_heading_deg=0)
+    commands = approach_commands((100, 400), 0.0, pose)
+    assert isinstance(commands, CommandSequence)
+    assert list(commands[-3:]) == [OPEN_GATE, drive(pose.capture_drive_mm), CLOSE_GATE]
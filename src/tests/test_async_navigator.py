@@ -0,0 +1,136 @@
+import sys
+sys.path.append("src")
+import asyncio
+import threading
+import time
+
+from Movement.async_navigator import AsyncFrameNavigator, CycleTiming
+from Movement.AutonomousClient import Ev3Session
+from Movement.ev3_standin import Ev3StandIn, Faults
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+from ImageRecognition.track_robot import reset_tracker
+
+
+class _LockedCamera:
+    """SimulatedCamera sharing a lock with the command path (the simulator is not thread-safe)."""
+
+    def __init__(self, cam, lock):
+        self.cam, self.lock = cam, lock
+
+    def isOpened(self):
+        return self.cam.isOpened()
+
+    def release(self):
+        self.cam.release()
+
+    def read(self):
+        with self.lock:
+            return self.cam.read()
+
+
+class _PacedCamera:
+    def __init__(self, frames, interval_s=0.01):
+        self.frames, self.interval_s = frames, interval_s
+
+    def isOpened(self):
+        return self.frames > 0
+
+    def release(self):
+        self.frames = 0
+
+    def read(self):
+        time.sleep(self.interval_s)
+        self.frames -= 1
+        return self.frames >= 0, None
+
+
+def test_captures_ball_and_never_overlaps_commands():
+    reset_tracker()
+    sim = SimulatedEV3(pose=(300, 300, 0), balls=[(700, 300)])
+    lock = threading.Lock()
+    in_flight = []
+
+    def send(script):
+        in_flight.append(script)
+        assert len(in_flight) == 1
+        time.sleep(0.03)                          # brick busy: frames keep arriving
+        with lock:
+            reply = sim.send_and_receive(script)
+        in_flight.pop()
+        return reply
+
+    nav = AsyncFrameNavigator(list(sim.balls), send=send,
+                              capture=_LockedCamera(SimulatedCamera(sim, max_frames=2000), lock))
+    nav.run()
+    assert sim.captured == [(700, 300)]
+    assert nav.remaining == []
+    assert nav.dropped_frames > 0
+    assert all(not t.preempted for t in nav.timings)
+    summary = nav.timing_summary()
+    assert summary["dispatch_s"]["mean"] >= 0.03
+    assert set(summary) == {"pose_s", "age_s", "dispatch_s", "cycle_s"}
+
+
+def test_new_target_replaces_command_in_flight():
+    with Ev3StandIn(telemetry=False) as brick:
+        session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+        nav = AsyncFrameNavigator([(1000, 300)], session=session, step_mm=400,
+                                  capture=_PacedCamera(60),
+                                  pose_fn=lambda frame: brick.sim.pose)
+
+        async def retarget():
+            await asyncio.sleep(0.2)
+            nav.set_targets([(300, 800)])
+
+        async def main():
+            await asyncio.gather(nav.run_async(), retarget())
+
+        asyncio.run(main())
+        session.close()
+    kinds = [c.kind for c in brick.received_commands]
+    assert kinds[:2] == ["enqueue", "replace"]
+    assert nav.timings[1].preempted and nav.timings[1].command.startswith("turn_right_deg(")
+    assert 200 < brick.sim.x < 600                # the 400 mm drive was cut short
+    assert 45 < brick.sim.heading < 135
+
+
+def test_command_timeout_aborts_instead_of_overlapping():
+    with Ev3StandIn(telemetry=False) as brick:
+        session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+        logged = []
+        nav = AsyncFrameNavigator([(1000, 300)], session=session, capture=_PacedCamera(0),
+                                  command_timeout_s=0.2, log=logged.append)
+        timing = CycleTiming(time.monotonic(), 0.0, 0.0, "drive_straight_mm(1000)")
+        asyncio.run(nav._dispatch("drive_straight_mm(1000)\n", timing))
+        assert not brick.busy and session.outstanding() == []    # nothing left on the brick
+        nav.close()
+        session.close()
+    assert len(logged) == 1 and "aborting" in logged[0]
+    assert 200 < brick.sim.x < 1200
+
+
+def test_command_that_outlives_its_abort_is_given_up_on():
+    with Ev3StandIn(telemetry=False, faults=Faults(drop_rate=1.0)) as brick:   # no replies
+        session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+        logged = []
+        nav = AsyncFrameNavigator([(1000, 300)], session=session, capture=_PacedCamera(0),
+                                  command_timeout_s=0.2, log=logged.append)
+        timing = CycleTiming(time.monotonic(), 0.0, 0.0, "drive_straight_mm(1000)")
+        asyncio.run(nav._dispatch("drive_straight_mm(1000)\n", timing))
+        nav.close()
+        session.close()
+    assert timing.dispatch_s < 1.0
+    assert len(logged) == 2 and "giving up" in logged[1]
+
+
+def test_close_waits_for_a_pending_read():
+    cam = _PacedCamera(10, interval_s=0.1)
+    order = []
+    read, release = cam.read, cam.release
+    cam.read = lambda: (read(), order.append("read"))[0]
+    cam.release = lambda: (order.append("release"), release())
+    nav = AsyncFrameNavigator([], send=lambda script: "", capture=cam)
+    nav._camera_pool.submit(cam.read)             # what a cancelled capture stage leaves behind
+    time.sleep(0.01)
+    nav.close()
+    assert order == ["read", "release"]
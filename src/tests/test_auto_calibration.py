@@ -0,0 +1,96 @@
+import sys
+sys.path.append("src")
+import json
+import random
+
+import numpy as np
+
+from ImageRecognition import track_robot as tr
+from ImageRecognition.auto_calibration import calibrate_from_frames, format_report
+from Movement import simulator
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+
+
+def _frames(n, seed=1, sigma=6.0):
+    rng, noise = random.Random(seed), np.random.default_rng(seed)
+    for _ in range(n):
+        pose = (rng.uniform(250, 950), rng.uniform(250, 1550), rng.uniform(-180, 180))
+        sim = SimulatedEV3(pose=pose, balls=[(300, 300), (900, 1500)])
+        frame = SimulatedCamera(sim, px_per_mm=0.5).render().astype(np.int16)
+        frame += noise.normal(0, sigma, frame.shape).astype(np.int16)
+        yield pose, np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def _use(cal, tmp_path, monkeypatch):
+    monkeypatch.setattr(tr, "CALIB_FILE", str(tmp_path / "marker_hsv.json"))
+    monkeypatch.setattr(tr, "PINK_HSV", tr.PINK_HSV)  # restored after the test
+    monkeypatch.setattr(tr, "PURPLE_HSV", tr.PURPLE_HSV)
+    cal.save()
+    return json.loads((tmp_path / "marker_hsv.json").read_text())
+
+
+def _volume(ranges):
+    return sum(np.prod(hi.astype(int) - lo.astype(int) + 1) for lo, hi in ranges)
+
+
+def _heading_errors(frames):
+    errors = []
+    for (_, _, h), frame in frames:
+        tr.reset_tracker()
+        pose = tr.get_robot_pose(frame)
+        assert pose is not None
+        errors.append(abs((pose[1] - h + 180) % 360 - 180))
+    return errors
+
+
+def test_fitted_ranges_are_tighter_and_still_track(tmp_path, monkeypatch):
+    cal = calibrate_from_frames(frame for _, frame in _frames(15))
+    assert cal.frames_used == 15 and "pink" in format_report(cal)
+    for marker, seed in ((cal.pink, tr._DEFAULT_PINK_HSV), (cal.purple, tr._DEFAULT_PURPLE_HSV)):
+        assert len(marker.ranges) == 1
+        assert _volume(marker.ranges) < _volume(seed) / 5
+        assert marker.recall > 0.98
+        assert marker.false_positive_rate <= marker.seed_false_positive_rate
+        assert marker.false_positive_rate < 1e-3 and marker.spurious_blobs == 0
+    _use(cal, tmp_path, monkeypatch)
+    assert max(_heading_errors(_frames(10, seed=2))) < 2.0
+
+
+def test_hue_wrapping_past_179_gives_two_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(simulator, "PINK_BGR", simulator._hsv_to_bgr(179, 150, 235))
+    # The red wall (hue 0, saturation 204) must stay out of the seed or it swallows the disc.
+    seed = (((np.array([165, 60, 60], np.uint8), np.array([179, 180, 255], np.uint8)),
+             (np.array([0, 60, 60], np.uint8), np.array([8, 180, 255], np.uint8))),
+            tr._DEFAULT_PURPLE_HSV)
+    cal = calibrate_from_frames((frame for _, frame in _frames(10, seed=3)), seed=seed)
+    assert len(cal.pink.ranges) == 2
+    assert cal.pink.ranges[0][1][0] == 179 and cal.pink.ranges[1][0][0] == 0
+    assert cal.pink.recall > 0.98
+    data = _use(cal, tmp_path, monkeypatch)
+    assert len(data["pink"]["ranges"]) == 2 and "lo" in data["purple"]
+    assert max(_heading_errors(_frames(5, seed=4))) < 2.0
+
+
+def test_no_robot_in_view_is_an_error():
+    blank = np.zeros((300, 400, 3), np.uint8)
+    try:
+        calibrate_from_frames([blank] * 3)
+    except ValueError as e:
+        assert "3 frames" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_scores_come_from_frames_left_out_of_the_fit(monkeypatch):
+    shades = (simulator.PINK_BGR, simulator._hsv_to_bgr(168, 120, 140))
+
+    def alternating(n):
+        frames = _frames(n, seed=5)
+        for k in range(n):
+            monkeypatch.setattr(simulator, "PINK_BGR", shades[k % 2])   # darker on checks
+            yield next(frames)[1]
+
+    cal = calibrate_from_frames(alternating(12))
+    assert cal.frames_used == 12
+    assert cal.purple.recall > 0.98
+    assert cal.pink.recall < 0.5                          # fitted on the other shade only
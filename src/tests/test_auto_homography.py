@@ -0,0 +1,99 @@
+import sys
+sys.path.append("src")
+
+import cv2
+import numpy as np
+import pytest
+
+from ImageRecognition import AutoHomography as ah
+from ImageRecognition.AutoHomography import ArenaMonitor, auto_homography
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+
+ARENA = np.float32([[0, 0], [1200, 0], [1200, 1800], [0, 1800]])
+PROBES = np.float32([[[150, 200]], [[600, 900]], [[1050, 1600]]])
+VIEW = [[120, 80], [760, 110], [820, 1120], [60, 1090]]
+BUMPED = [[126, 84], [765, 113], [826, 1125], [66, 1093]]
+
+
+def _camera(corners):
+    """The arena (1 px/mm render) as seen by a tilted camera; returns frame, image→arena H."""
+    frame = SimulatedCamera(SimulatedEV3(pose=(600, 900, 30), balls=[(300, 300)])).render()
+    P = cv2.getPerspectiveTransform(ARENA, np.float32(corners))
+    return cv2.warpPerspective(frame, P, (900, 1200)), np.linalg.inv(P)
+
+
+def _error_mm(H, H_true):
+    return np.abs(cv2.perspectiveTransform(PROBES, H)
+                  - cv2.perspectiveTransform(PROBES, H_true)).max()
+
+
+def test_homography_from_the_detected_border():
+    frame, H_true = _camera(VIEW)
+    assert _error_mm(auto_homography(frame), H_true) < 1.5
+    with pytest.raises(RuntimeError):
+        auto_homography(np.zeros((600, 800, 3), np.uint8))
+
+
+def test_monitor_leaves_a_steady_camera_alone():
+    frame, _ = _camera(VIEW)
+    monitor = ArenaMonitor(frame, check_every=5)
+    H = monitor.H
+    for _ in range(20):
+        assert monitor.update(frame) is H
+    assert monitor.checks == 4 and monitor.generation == 0
+    assert monitor.drift_px < 0.5
+
+
+def test_monitor_recomputes_after_a_bump():
+    frame, _ = _camera(VIEW)
+    monitor = ArenaMonitor(frame, check_every=1)
+    bumped, H_true = _camera(BUMPED)
+    assert _error_mm(monitor.H, H_true) > 5
+    monitor.update(bumped)
+    assert monitor.generation == 1 and 6 < monitor.drift_px < 8
+    assert _error_mm(monitor.H, H_true) < 1.5
+    monitor.update(bumped)
+    assert monitor.generation == 1                        # settled
+
+
+def test_monitor_falls_back_to_tracked_corners(monkeypatch):
+    frame, _ = _camera(VIEW)
+    monitor = ArenaMonitor(frame, check_every=1)
+    monkeypatch.setattr(ah, "detect_arena_corners", lambda frame: None)
+    bumped, H_true = _camera(BUMPED)
+    monitor.update(bumped)
+    assert monitor.generation == 1
+    assert _error_mm(monitor.H, H_true) < 1.5
+
+
+def _cover(frame, corner, r=40):
+    covered = frame.copy()
+    cv2.circle(covered, tuple(int(v) for v in corner), r, (30, 30, 30), -1)
+    return covered
+
+
+def test_monitor_ignores_a_covered_corner(monkeypatch):
+    frame, _ = _camera(VIEW)
+    monitor = ArenaMonitor(frame, check_every=1)
+    H = monitor.H
+    calls = []
+    monkeypatch.setattr(ah, "detect_arena_corners", lambda frame: calls.append(1))
+    for _ in range(5):
+        assert monitor.update(_cover(frame, monitor.corners[2])) is H
+    assert calls == [] and monitor.generation == 0 and monitor.drift_px < 0.5
+
+
+def test_covered_corner_needs_an_agreeing_detection(monkeypatch):
+    frame, _ = _camera(VIEW)
+    monitor = ArenaMonitor(frame, check_every=1)
+    H = monitor.H
+    bumped, H_true = _camera(BUMPED)
+    bumped = _cover(bumped, BUMPED[2])
+    wrong = np.float32(BUMPED) + np.float32([[0, 0], [0, 0], [0, 0], [0, 0]])
+    wrong[0] += 12                                        # disagrees with a visible corner
+    monkeypatch.setattr(ah, "detect_arena_corners", lambda frame: wrong)
+    monitor.update(bumped)
+    assert monitor.H is H and monitor.generation == 0
+    monkeypatch.setattr(ah, "detect_arena_corners", lambda frame: np.float32(BUMPED))
+    monitor.update(bumped)
+    assert monitor.generation == 1 and _error_mm(monitor.H, H_true) < 1.5
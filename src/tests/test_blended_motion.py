@@ -0,0 +1,87 @@
+import sys
+sys.path.append("src")
+import math
+
+import pytest
+
+from Movement import drive_model as dm
+from Movement import wire
+from Movement.CommandLoop import blend_polyline, drive_polyline
+from Movement.simulator import SimulatedEV3
+from PathFinding.ArrowVector import heading_diff
+
+
+def test_right_angle_corner_is_filleted():
+    pieces = blend_polyline((0, 0), [(500, 0), (500, 500)], corner_radius_mm=100)
+    assert len(pieces) == 1 and pieces[0][0] == "path"
+    (r0, d0), (r1, d1), (r2, d2) = pieces[0][1]
+    assert (r0, r2) == (0.0, 0.0) and d0 == pytest.approx(400) and d2 == pytest.approx(400)
+    assert r1 == pytest.approx(100)                       # +y from +x is a right turn
+    assert d1 == pytest.approx(100 * math.pi / 2)
+
+
+def test_short_legs_shrink_the_radius_and_sharp_corners_stop():
+    (_, path), = blend_polyline((0, 0), [(100, 0), (100, 100)], corner_radius_mm=300)
+    assert path == [(0.0, 50.0), (pytest.approx(50.0), pytest.approx(50 * math.pi / 2)),
+                    (0.0, 50.0)]
+    pieces = blend_polyline((0, 0), [(300, 0), (0, 10)], max_blend_deg=120)
+    assert [kind for kind, _ in pieces] == ["path", "turn", "path"]
+
+
+def test_simulator_follows_blended_polyline():
+    waypoints = [(600, 200), (600, 700), (300, 900)]
+    sim = SimulatedEV3(pose=(200, 200, 90))
+    script = drive_polyline((200, 200), waypoints, 90, corner_radius_mm=120)
+    assert script.startswith("turn_left_deg(90")
+    sim.execute(script)
+    (x, y), _ = sim.pose
+    assert math.hypot(x - 300, y - 900) < 1.0
+    assert sim.heading == pytest.approx(math.degrees(math.atan2(200, -300)) % 360, abs=0.1)
+
+    # Same route the old way: stop, turn, drive for every leg.
+    stop_go = SimulatedEV3(pose=(200, 200, 90))
+    stop_go.turn_left_deg(90)
+    heading, pos = 0.0, (200, 200)
+    for p in waypoints:
+        angle = math.degrees(math.atan2(p[1] - pos[1], p[0] - pos[0]))
+        diff = (angle - heading + 180) % 360 - 180
+        stop_go.turn_deg(diff)
+        stop_go.drive_straight_mm(math.hypot(p[0] - pos[0], p[1] - pos[1]))
+        heading, pos = angle, p
+    assert sim.clock < stop_go.clock
+
+
+def test_arc_primitives_and_opcodes():
+    sim = SimulatedEV3(pose=(500, 500, 0))
+    sim.arc_right_mm(100, 100 * math.pi / 2)
+    (x, y), h = sim.pose
+    assert (round(x), round(y), round(h)) == (600, 600, 90)
+    sim.arc_left_mm(100, 100 * math.pi / 2)
+    (x, y), h = sim.pose
+    assert (round(x), round(y), round(h) % 360) == (700, 700, 0)
+    assert sim.history[0].duration == pytest.approx(dm.arc_time_s(100, 100 * math.pi / 2))
+    commands = wire.parse_script("drive_path(0, 100, 150, 235.6, 0, 50)\narc_left_mm(80, 40)\n")
+    assert commands == [("drive_path", (0.0, 100.0, 150.0, 235.6, 0.0, 50.0)),
+                        ("arc_left_mm", (80.0, 40.0))]
+    assert len(wire.decode_commands(wire.encode_commands(commands))) == 2
+
+
+def test_corners_too_tight_to_arc_stop_and_turn():
+    sim = SimulatedEV3(pose=(500, 500, 0))
+    with pytest.raises(ValueError):
+        sim.arc_right_mm(20, 30)                          # under half the wheel base
+    with pytest.raises(ValueError):
+        sim.drive_path(0, 20, 20, 31.4, 0, 20)
+    assert blend_polyline((0, 0), [(40, 0), (40, 40)]) == [
+        ("path", [(0.0, 40.0)]), ("turn", pytest.approx(90)), ("path", [(0.0, 40.0)])]
+    sim = SimulatedEV3(pose=(500, 500, 0))
+    sim.execute(drive_polyline((500, 500), [(540, 500), (540, 540)], 0))
+    (x, y), _ = sim.pose
+    assert (round(x), round(y)) == (540, 540)
+
+
+def test_heading_diff_takes_the_short_way_round():
+    assert heading_diff(90, 0) == 90                      # +ve: clockwise (right)
+    assert heading_diff(-170, 170) == pytest.approx(20)
+    assert heading_diff(170, -170) == pytest.approx(-20)
+    assert heading_diff(0, 180) == 180
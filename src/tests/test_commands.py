@@ -0,0 +1,70 @@
+import sys
+sys.path.append("src")
+import os
+import subprocess
+
+import pytest
+
+from Movement import wire
+from Movement.CommandLoop import collect_ball_commands, collect_balls
+from Movement.commands import (CAPTURE, CLOSE_GATE, OPEN_GATE, Command, CommandSequence,
+                               MAX_PATH_SEGMENTS, arc, drive, path, turn)
+from Movement.simulator import SimulatedEV3
+
+
+def test_script_and_payload_match_the_text_path():
+    seq = CommandSequence([turn(-30), drive(120.5), arc(-80, 40)]) + CAPTURE
+    text = seq.script()
+    assert text.startswith("turn_left_deg(30)\ndrive_straight_mm(120.5)\narc_left_mm(80, 40)\n")
+    assert seq.payload() == wire.encode_commands(wire.parse_script(text))
+    assert seq.script() is text                           # cached
+    assert CommandSequence.parse(text) == seq
+    assert CommandSequence.parse("for i in range(3): open_gate()\n") is None
+    with pytest.raises(ValueError):
+        Command("rm_rf")
+    with pytest.raises(AttributeError):
+        seq.extra = 1                                     # __slots__
+
+
+def test_peephole_merges_drops_and_fuses():
+    seq = CommandSequence([turn(30), turn(-5), drive(0), drive(100), turn(10), turn(-10),
+                           drive(20)]) + CAPTURE
+    assert seq.optimised().script() == ("turn_right_deg(25)\nopen_gate()\n"
+                                        "drive_straight_mm(170)\nclose_gate()\n")
+    assert seq.optimised(fuse_capture=False).script() == (
+        "turn_right_deg(25)\ndrive_straight_mm(120)\nopen_gate()\n"
+        "drive_straight_mm(50)\nclose_gate()\n")
+    assert CommandSequence([turn(170), turn(30)]).optimised() == CommandSequence([turn(-160)])
+    assert CommandSequence([drive(-40), Command("open_gate"), drive(50)]).optimised() == \
+        CommandSequence([drive(-40), Command("open_gate"), drive(50)])
+
+
+def test_optimised_sequence_ends_in_the_same_place_sooner():
+    raw = CommandSequence([turn(40), turn(50), drive(0), drive(200), drive(100)]) + CAPTURE
+    fast = raw.optimised()
+    assert len(fast) < len(raw) and fast.duration_s() < raw.duration_s()
+    poses = []
+    for seq in (raw, fast):
+        sim = SimulatedEV3(pose=(200, 200, 0))
+        sim.execute(seq.script())
+        poses.append(sim.pose)
+    assert poses[0][0] == pytest.approx(poses[1][0], abs=1e-6)
+    assert poses[0][1] == pytest.approx(poses[1][1])
+
+
+def test_paths_split_at_the_opcode_limit_and_planners_return_sequences():
+    seq = path([(0.0, 10.0)] * (MAX_PATH_SEGMENTS + 1))
+    assert [len(c.args) for c in seq] == [2 * MAX_PATH_SEGMENTS, 2]
+    commands = collect_ball_commands((0, 0), [(300, 400)])
+    assert isinstance(commands, CommandSequence)
+    assert commands.script() == collect_balls((0, 0), [(300, 400)])
+    assert commands == commands.optimised()               # capture fused into the approach
+    assert list(commands[-3:]) == [OPEN_GATE, drive(500), CLOSE_GATE]
+
+
+def test_command_types_do_not_pull_in_the_pose_predictor():
+    code = "import sys; import Movement.commands; print('Movement.pose_prediction' in sys.modules)"
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=src, capture_output=True,
+                         text=True, check=True).stdout
+    assert out.strip() == "False"
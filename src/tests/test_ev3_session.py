@@ -0,0 +1,221 @@
+import sys
+sys.path.append("src")
+import queue
+import socket
+import threading
+import time
+
+import pytest
+
+from Movement import wire
+from Movement.AutonomousClient import Ev3Session
+
+
+class FakeBrick:
+    """Minimal framed server: echoes scripts, answers pings, hangs up on 'hangup'.
+
+    Enqueued work runs on one worker thread, like the brick's command processor; a script
+    containing 'fail' fails and every job takes ``job_s`` seconds.
+    """
+
+    def __init__(self, job_s=0.05):
+        self.job_s = job_s
+        self.jobs = queue.Queue()
+        self.busy = False
+        self.executed = []
+        threading.Thread(target=self._worker, daemon=True).start()
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(4)
+        self.port = self.server.getsockname()[1]
+        self.connections = 0
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    msg = wire.recv_message(conn)
+                except OSError:
+                    return
+                if msg is None:
+                    return
+                msg_type, request_id, payload = msg
+                if msg_type == wire.MSG_PING:
+                    wire.send_message(conn, wire.MSG_PONG, request_id)
+                elif msg_type == wire.MSG_ENQUEUE:
+                    wire.send_message(conn, wire.MSG_STATUS, request_id,
+                                      wire.pack_status(wire.STATUS_QUEUED))
+                    self.jobs.put((conn, request_id, payload))
+                elif msg_type == wire.MSG_QUERY_DEPTH:
+                    wire.send_message(conn, wire.MSG_DEPTH, request_id,
+                                      wire.DEPTH.pack(self.jobs.qsize(), int(self.busy)))
+                elif msg_type == wire.MSG_COMMANDS:
+                    reply = "cmds:%d" % len(wire.decode_commands(payload))
+                    wire.send_message(conn, wire.MSG_REPLY, request_id, reply.encode())
+                elif payload == b"hangup":
+                    return
+                elif payload == b"slow":
+                    time.sleep(0.5)
+                    wire.send_message(conn, wire.MSG_REPLY, request_id, b"late")
+                else:
+                    wire.send_message(conn, wire.MSG_REPLY, request_id, b"ok:" + payload)
+
+    def _worker(self):
+        while True:
+            conn, seq, payload = self.jobs.get()
+            self.busy = True
+            self._status(conn, seq, wire.pack_status(wire.STATUS_STARTED))
+            time.sleep(self.job_s)
+            self.executed.append(seq)
+            self.busy = False
+            if b"fail" in payload:
+                self._status(conn, seq, wire.pack_status(wire.STATUS_FAILED, "boom"))
+            else:
+                self._status(conn, seq, wire.pack_status(wire.STATUS_DONE))
+
+    @staticmethod
+    def _status(conn, seq, payload):
+        try:
+            wire.send_message(conn, wire.MSG_STATUS, seq, payload)
+        except OSError:
+            pass                          # PC went away; the job still ran
+
+    def close(self):
+        self.server.close()
+
+
+@pytest.fixture
+def brick():
+    b = FakeBrick()
+    yield b
+    b.close()
+
+
+def test_frame_round_trip():
+    a, b = socket.socketpair()
+    wire.send_message(a, wire.MSG_SCRIPT, 7, b"drive_straight_mm(10)\n")
+    assert wire.recv_message(b) == (wire.MSG_SCRIPT, 7, b"drive_straight_mm(10)\n")
+    a.close()
+    assert wire.recv_message(b) is None
+
+
+def test_bad_magic_is_rejected():
+    a, b = socket.socketpair()
+    a.sendall(b"turn_left_deg(90)\n")
+    with pytest.raises(wire.ProtocolError):
+        wire.recv_message(b)
+
+
+def test_requests_share_one_connection(brick):
+    session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+    assert session.request("a()") == "ok:a()"
+    assert session.request("b()") == "ok:b()"
+    assert brick.connections == 1
+    session.close()
+
+
+def test_reconnects_after_connection_loss(brick):
+    session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+    with pytest.raises(ConnectionResetError):
+        session.request("hangup")
+    assert session.request("again()") == "ok:again()"
+    assert brick.connections == 2
+    session.close()
+
+
+def test_reply_timeout(brick):
+    session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+    with pytest.raises(socket.timeout):
+        session.request("slow", timeout=0.1)
+    # the late reply is discarded and the session keeps working
+    assert session.request("x()") == "ok:x()"
+    session.close()
+
+
+def test_keepalive_keeps_link(brick):
+    session = Ev3Session("127.0.0.1", brick.port, keepalive_s=0.1)
+    session.connect()
+    time.sleep(0.4)
+    assert session.connected
+    assert brick.connections == 1
+    session.close()
+
+
+def test_command_batch_round_trip():
+    payload = wire.encode_commands([("turn_left_deg", (90,)), ("open_gate", ()),
+                                    ("drive_straight_mm", (120.5, 40))])
+    assert len(payload) == 6 + 2 + 10
+    ops = wire.decode_commands(payload)
+    assert [op for op, _ in ops] == [wire.OPCODE_BY_NAME[n]
+                                     for n in ("turn_left_deg", "open_gate", "drive_straight_mm")]
+    assert ops[2][1] == (120.5, 40.0)
+
+
+def test_truncated_batch_is_rejected():
+    payload = wire.encode_commands([("drive_straight_mm", (100,))])
+    with pytest.raises(wire.ProtocolError):
+        wire.decode_commands(payload[:-1])
+
+
+def test_parse_script():
+    assert wire.parse_script("turn_right_deg(45)\ndrive_straight_mm(-30.5)\nclose_gate()\n") == [
+        ("turn_right_deg", (45.0,)), ("drive_straight_mm", (-30.5,)), ("close_gate", ())]
+    assert wire.parse_script("mdiff.off()\n") is None
+    assert wire.parse_script("for i in range(3):\n    open_gate()\n") is None
+    assert wire.parse_script("drive_straight_mm(x)\n") is None
+    assert wire.parse_script("print('hi')\n") is None
+
+
+def test_session_sends_plain_scripts_as_opcodes(brick):
+    session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+    assert session.request("turn_left_deg(90)\nopen_gate()\n") == "cmds:2"
+    assert session.request('print("hello")\n') == 'ok:print("hello")\n'
+    text_only = Ev3Session("127.0.0.1", brick.port, keepalive_s=None, binary=False)
+    assert text_only.request("open_gate()\n") == "ok:open_gate()\n"
+    session.close()
+    text_only.close()
+
+
+def test_submit_pipelines_without_waiting(brick):
+    session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+    seen = []
+    t0 = time.monotonic()
+    tickets = [session.submit("drive_straight_mm(100)\n", on_status=lambda t: seen.append(
+        (t.seq, t.status))) for _ in range(3)]
+    assert time.monotonic() - t0 < brick.job_s
+    assert session.queue_depth() >= 2
+    assert [t.wait(timeout=2) for t in tickets] == ["done"] * 3
+    assert brick.executed == [t.seq for t in tickets]
+    assert [s for q, s in seen if q == tickets[0].seq] == ["queued", "started", "done"]
+    assert session.queue_depth() == 0
+    assert session.outstanding() == []
+    session.close()
+
+
+def test_failed_submission_reports_error(brick):
+    session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+    ticket = session.submit('print("fail")\n')
+    assert ticket.wait(timeout=2) == "failed"
+    assert ticket.error == "boom"
+    # requests and submissions share the link
+    assert session.request("x()") == "ok:x()"
+    session.close()
+
+
+def test_tickets_fail_when_connection_drops(brick):
+    brick.job_s = 0.5
+    session = Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+    ticket = session.submit("open_gate()\n")
+    session.close()
+    assert ticket.wait(timeout=1) == "failed"
+    assert ticket.error == "connection to EV3 lost"
@@ -0,0 +1,76 @@
+import sys
+sys.path.append("src")
+import socket
+import time
+
+import pytest
+
+from Movement import drive_model as dm
+from Movement.AutonomousClient import Ev3Session
+from Movement.ev3_standin import Ev3StandIn, Faults
+from Movement.telemetry import TelemetryReceiver
+
+
+def _session(brick, **kwargs):
+    return Ev3Session("127.0.0.1", brick.port, keepalive_s=None, **kwargs)
+
+
+def test_runs_commands_with_modelled_duration():
+    with Ev3StandIn(telemetry=False) as brick:
+        session = _session(brick)
+        t0 = time.monotonic()
+        reply = session.request("drive_straight_mm(100)\nturn_right_deg(90)\n")
+        elapsed = time.monotonic() - t0
+        session.close()
+    expected = dm.drive_time_s(100) + dm.turn_time_s(90)
+    assert reply.startswith("Command executed successfully.")
+    assert expected <= elapsed < expected + 0.5
+    (x, y), heading = brick.sim.pose
+    assert (round(x), round(y), round(heading)) == (300, 200, 90)
+    assert [c.kind for c in brick.received_commands] == ["commands"]
+    assert brick.received_commands[0].command == [("drive_straight_mm", (100.0,)),
+                                                  ("turn_right_deg", (90.0,))]
+
+
+def test_text_scripts_and_pipelining():
+    with Ev3StandIn(time_scale=0, telemetry=False) as brick:
+        session = _session(brick)
+        assert "executed" in session.request("for _ in range(2):\n    open_gate()\n")
+        tickets = [session.submit("drive_straight_mm(10)\n") for _ in range(3)]
+        assert [t.wait(timeout=2) for t in tickets] == ["done"] * 3
+        session.close()
+    assert brick.sim.x == pytest.approx(230)
+    assert [c.kind for c in brick.received_commands] == ["script"] + ["enqueue"] * 3
+
+
+def test_injected_latency_errors_and_drops():
+    with Ev3StandIn(time_scale=0, telemetry=False, faults=Faults(latency_s=0.1)) as brick:
+        session = _session(brick)
+        t0 = time.monotonic()
+        session.request("open_gate()\n")
+        assert time.monotonic() - t0 >= 0.1
+        session.close()
+    with Ev3StandIn(time_scale=0, telemetry=False, faults=Faults(error_rate=1.0)) as brick:
+        session = _session(brick)
+        assert session.request("open_gate()\n") == "Execution error: injected error\n"
+        assert not brick.sim.gate_open
+        session.close()
+    with Ev3StandIn(time_scale=0, telemetry=False, faults=Faults(drop_rate=1.0)) as brick:
+        session = _session(brick)
+        with pytest.raises(socket.timeout):
+            session.request("open_gate()\n", timeout=0.2)
+        assert brick.dropped == 1 and brick.sim.gate_open
+        session.close()
+
+
+def test_streams_wheel_telemetry():
+    with TelemetryReceiver(port=0, host="127.0.0.1") as rx, \
+            Ev3StandIn(telemetry_port=rx.port, telemetry_hz=50) as brick:
+        session = _session(brick)
+        session.request("drive_straight_mm(100)\n")
+        time.sleep(0.1)
+        session.close()
+        data = rx.samples()
+    assert len(data) >= 5
+    assert data["left_pos"][-1] == data["right_pos"][-1] == round(brick.sim.wheel_deg[0])
+    assert 0 < data["left_speed"].max()
@@ -0,0 +1,86 @@
+import sys
+sys.path.append("src")
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+from ImageRecognition.frame_bus import FrameBus
+
+
+@pytest.fixture
+def bus():
+    b = FrameBus.create((4, 6, 3), slots=4, readers=2)
+    yield b
+    b.close()
+    b.unlink()
+
+
+def _frame(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def test_reader_gets_frames_in_order_as_read_only_views(bus):
+    reader = bus.reader(0)
+    for v in (1, 2):
+        bus.publish(_frame(v))
+    seq, _, view = reader.next(timeout=0)
+    assert seq == 0 and view[0, 0, 0] == 1
+    assert not view.flags.writeable
+    seq, _, view = reader.next(timeout=0)
+    assert seq == 1 and view[0, 0, 0] == 2
+    assert reader.next(timeout=0) is None
+
+
+def test_stalled_reader_is_reported_and_skips_ahead(bus):
+    reader = bus.reader(0)
+    for v in range(10):
+        bus.publish(_frame(v))
+    assert bus.stalled_readers() == [0]
+    seq, _, view = reader.next(timeout=0)
+    assert seq == 7 and view[0, 0, 0] == 7
+    assert reader.skipped == 7
+    assert bus.stalled_readers() == []
+
+
+def test_get_returns_none_for_overwritten_frame(bus):
+    reader = bus.reader(1)
+    first = bus.publish(_frame(1))
+    for v in range(4):
+        bus.publish(_frame(v))
+    assert reader.get(first) is None
+    assert not bus.is_valid(first)
+
+
+def _consume(spec, out):
+    reader = FrameBus.attach(spec).reader(1, from_latest=False)
+    seq, _, view = reader.next(timeout=5)
+    out.put((seq, int(view.sum())))
+
+
+def test_other_process_reads_shared_frame(bus):
+    bus.publish(_frame(3))
+    out = mp.Queue()
+    p = mp.Process(target=_consume, args=(bus.spec, out))
+    p.start()
+    assert out.get(timeout=10) == (0, 3 * 4 * 6 * 3)
+    p.join()
+
+
+def test_stage_drops_a_frame_overwritten_while_it_read(bus, monkeypatch):
+    from ImageRecognition import main
+    item = {"bus": bus.spec, "seq": bus.publish(_frame(1)), "t": 0.0}
+    frame_of = main.frame_of
+
+    def overrun(item, reader_id=0):
+        view = frame_of(item, reader_id)
+        for v in range(4):                      # producer laps the ring mid-read
+            bus.publish(_frame(v))
+        return view
+
+    monkeypatch.setattr(main, "frame_of", overrun)
+    monkeypatch.setattr(main, "get_robot_pose", lambda frame: pytest.fail("torn frame used"))
+    assert main.track_stage(dict(item)) is None
+    assert not main.frame_intact(item, 1)
+    fresh = {"bus": bus.spec, "seq": bus.latest_seq, "t": 0.0}
+    assert main.frame_intact(fresh, 1)
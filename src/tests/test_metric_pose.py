@@ -0,0 +1,88 @@
+import sys
+sys.path.append("src")
+import math
+import random
+
+import cv2
+import numpy as np
+import pytest
+
+from ImageRecognition.track_robot import TrackedPose, _to_arena, get_robot_pose, reset_tracker
+from Movement.frame_navigator import FrameNavigator, calculate_next_command
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+
+
+def _angle_err(a, b):
+    return abs((a - b + 180) % 360 - 180)
+
+
+def test_subpixel_metric_pose_beats_whole_pixels():
+    rng = random.Random(3)
+    metric_err, pixel_err = [], []
+    for _ in range(20):
+        x, y, h = rng.uniform(300, 900), rng.uniform(300, 1500), rng.uniform(-180, 180)
+        cam = SimulatedCamera(SimulatedEV3(pose=(x, y, h)), px_per_mm=0.5)
+        frame = cam.render()
+        reset_tracker()
+        (px, py), _ = get_robot_pose(frame)
+        reset_tracker()
+        pose = get_robot_pose(frame, homography=cam.homography())
+        assert isinstance(pose, TrackedPose)
+        (mx, my), heading = pose                          # unpacks like the pixel pose
+        assert _angle_err(heading, h) < 0.5
+        metric_err.append(math.hypot(mx - x, my - y))
+        pixel_err.append(math.hypot(px / 0.5 - x, py / 0.5 - y))
+        cov = pose.covariance
+        assert cov.shape == (3, 3) and np.allclose(cov, cov.T)
+        assert np.all(np.linalg.eigvalsh(cov) > 0)
+    assert np.mean(metric_err) < 0.5 < np.mean(pixel_err)
+
+
+def test_heading_is_measured_in_arena_space():
+    # Tilted camera: warp the 1 px/mm render with a perspective transform P; the pose in
+    # the warped image goes back through H = P⁻¹.
+    sim = SimulatedEV3(pose=(600, 900, 30))
+    frame = SimulatedCamera(sim).render()
+    src = np.float32([[0, 0], [1200, 0], [1200, 1800], [0, 1800]])
+    dst = np.float32([[250, 100], [1100, 0], [1200, 1800], [0, 1500]])
+    P = cv2.getPerspectiveTransform(src, dst)
+    warped = cv2.warpPerspective(frame, P, (1200, 1800))
+    reset_tracker()
+    (x, y), heading = get_robot_pose(warped, homography=np.linalg.inv(P))
+    assert math.hypot(x - 600, y - 900) < 2.0
+    assert _angle_err(heading, 30) < 1.0
+    reset_tracker()
+    _, image_heading = get_robot_pose(warped)
+    assert _angle_err(image_heading, 30) > 2.0           # image heading is skewed
+
+
+def test_jacobian_matches_finite_differences():
+    H = np.array([[1.1, 0.05, 3.0], [-0.02, 0.9, 7.0], [1e-4, -2e-4, 1.0]])
+    p, J = _to_arena(H, 320.0, 240.0)
+    eps = 1e-3
+    for k, (dx, dy) in enumerate(((eps, 0), (0, eps))):
+        q, _ = _to_arena(H, 320.0 + dx, 240.0 + dy)
+        assert (q - p) / eps == pytest.approx(J[:, k], rel=1e-4)
+
+
+def test_sub_millimetre_remainder_captures_instead_of_stalling():
+    assert calculate_next_command((0, 0), 0, (80.4, 0)) == "capture"
+
+
+def test_navigator_captures_with_a_coarse_camera():
+    reset_tracker()
+    sim = SimulatedEV3(pose=(300, 300, 40), balls=[(700, 300)])
+    cam = SimulatedCamera(sim, max_frames=200, px_per_mm=0.5)
+    nav = FrameNavigator([(700, 300)], capture=cam, send=sim.send_and_receive,
+                         homography=cam.homography())
+    nav.run()
+    assert sim.captured == [(700, 300)]
+
+
+def test_debug_overlay_keeps_the_tracked_pose():
+    cam = SimulatedCamera(SimulatedEV3(pose=(600, 900, 30)), px_per_mm=0.5)
+    frame = cam.render()
+    reset_tracker()
+    pose, overlay = get_robot_pose(frame, debug=True, homography=cam.homography())
+    assert isinstance(pose, TrackedPose) and pose.covariance.shape == (3, 3)
+    assert overlay.shape == frame.shape and (overlay != frame).any()
@@ -0,0 +1,50 @@
+import sys
+sys.path.append("src")
+import numpy as np
+
+from ImageRecognition.cdio_utils import draw_points
+from ImageRecognition.track_robot import get_robot_pose, reset_tracker
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+
+
+def test_draw_points_copies_by_default():
+    frame = np.zeros((40, 40, 3), np.uint8)
+    out = draw_points(frame, [(10, 10)])
+    assert out is not frame and frame.sum() == 0 and out.sum() > 0
+
+
+def test_draw_points_reuses_buffer():
+    frame = np.zeros((40, 40, 3), np.uint8)
+    buf = np.empty_like(frame)
+    assert draw_points(frame, [(10, 10)], out=buf) is buf
+    assert frame.sum() == 0 and buf.sum() > 0
+    assert draw_points(frame, [], out=buf).sum() == 0
+
+
+def test_draw_points_in_place():
+    frame = np.zeros((40, 40, 3), np.uint8)
+    assert draw_points(frame, [(10, 10)], out=frame) is frame
+    assert frame.sum() > 0
+
+
+def test_tracker_debug_overlay_into_buffer():
+    reset_tracker()
+    ok, frame = SimulatedCamera(SimulatedEV3(pose=(300, 300, 0))).read()
+    overlay = frame.copy()
+    before = frame.copy()
+    (_, _), dbg = get_robot_pose(frame, debug=True, overlay=overlay)
+    assert dbg is overlay
+    assert (frame == before).all()
+    assert (overlay != before).any()
+
+
+def test_tracker_debug_miss_still_returns_the_overlay():
+    reset_tracker()
+    frame = np.zeros((120, 160, 3), np.uint8)             # no markers anywhere
+    pose, dbg = get_robot_pose(frame, debug=True)
+    assert pose is None
+    assert dbg.shape == frame.shape and dbg is not frame
+    overlay = frame.copy()
+    pose, dbg = get_robot_pose(frame, debug=True, overlay=overlay)
+    assert pose is None and dbg is overlay
+    assert get_robot_pose(frame) is None
@@ -0,0 +1,65 @@
+import sys
+sys.path.append("src")
+import queue
+import time
+
+from ImageRecognition.pipeline import Pipeline, PipelineStop, Stage, put_latest
+
+
+def _numbers():
+    for i in range(1000):
+        time.sleep(0.001)
+        yield i
+
+
+def _double(x):
+    return 2 * x
+
+
+def _slow_square(x):
+    time.sleep(0.01)
+    return x * x
+
+
+def _stop_at_five(x):
+    if x >= 5:
+        raise PipelineStop
+    return x
+
+
+def test_put_latest_drops_oldest():
+    q = queue.Queue(maxsize=2)
+    assert put_latest(q, 1) == 0
+    assert put_latest(q, 2) == 0
+    assert put_latest(q, 3) == 1
+    assert [q.get_nowait(), q.get_nowait()] == [2, 3]
+
+
+def test_results_flow_through_stages():
+    with Pipeline(_numbers, [Stage("double", fn=_double)], keep_results=True) as pipe:
+        first = pipe.results(timeout=5)
+        later = pipe.results(timeout=5)
+    assert first % 2 == 0 and later > first
+
+
+def test_slow_stage_drops_stale_items():
+    with Pipeline(_numbers, [Stage("slow", fn=_slow_square)], keep_results=True) as pipe:
+        time.sleep(0.5)
+        stats = pipe.stats()
+    assert stats["source"]["dropped"] > 0
+    assert stats["slow"]["processed"] < stats["source"]["processed"]
+
+
+def test_rate_limit():
+    with Pipeline(_numbers, [Stage("limited", fn=_double, max_hz=20)]) as pipe:
+        time.sleep(0.5)
+        processed = pipe.stats()["limited"]["processed"]
+    assert processed <= 12
+
+
+def test_stage_can_stop_pipeline():
+    pipe = Pipeline(_numbers, [Stage("stopper", fn=_stop_at_five)])
+    start = time.monotonic()
+    pipe.run()
+    assert time.monotonic() - start < 5
+    assert not pipe.running
@@ -0,0 +1,104 @@
+import sys
+sys.path.append("src")
+import math
+
+from Movement import drive_model as dm
+from Movement.pose_estimator import PoseEstimator
+
+DEG_PER_MM = 360.0 / (math.pi * dm.WHEEL_DIAMETER_MM)
+
+
+def _close(a, b, tol=1e-6):
+    return abs(a - b) < tol
+
+
+def test_follows_camera_without_odometry():
+    est = PoseEstimator()
+    assert est.pose_at(0.0) is None
+    est.add_camera(0.0, ((100, 200), 30))
+    est.add_camera(0.1, ((110, 200), 30))
+    assert est.pose_at(0.1) == ((110, 200), 30)
+    assert not est.add_camera(0.2, (None, None))
+
+
+def test_straight_drive_and_turn_from_encoders():
+    est = PoseEstimator()
+    est.add_encoders(0.0, 0, 0)
+    est.add_camera(0.0, ((100, 100), 0))
+    est.add_encoders(1.0, 100 * DEG_PER_MM, 100 * DEG_PER_MM)
+    (x, y), h = est.pose_at(1.0)
+    assert _close(x, 200) and _close(y, 100) and _close(h, 0)
+    (x, _), _ = est.pose_at(0.5)
+    assert _close(x, 150)
+    # in-place right turn of 90 deg: left wheel forward, right wheel back
+    travel = dm.turn_wheel_travel_mm(90) * DEG_PER_MM
+    est.add_encoders(2.0, 100 * DEG_PER_MM + travel, 100 * DEG_PER_MM - travel)
+    (x, y), h = est.pose_at(2.0)
+    assert _close(x, 200) and _close(y, 100) and _close(h, 90)
+    # heading 90 = +y in image coordinates
+    est.add_encoders(3.0, 150 * DEG_PER_MM + travel, 150 * DEG_PER_MM - travel)
+    (x, y), _ = est.pose_at(3.0)
+    assert _close(x, 200) and _close(y, 150)
+
+
+def test_camera_fix_pulls_estimate_and_later_track():
+    est = PoseEstimator(position_gain=0.5, heading_gain=0.5)
+    est.add_encoders(0.0, 0, 0)
+    est.add_camera(0.0, ((0, 0), 0))
+    for i in range(1, 11):
+        est.add_encoders(i * 0.1, i * 10 * DEG_PER_MM, i * 10 * DEG_PER_MM)
+    # late frame from t=0.5 says the robot was 20 units further along
+    assert est.add_camera(0.5, ((70, 0), 0))
+    (x, _), _ = est.pose_at(0.5)
+    assert _close(x, 60)
+    (x, _), _ = est.pose_at(1.0)
+    assert _close(x, 110)
+
+
+def test_encoder_sample_older_than_a_camera_fix_still_counts():
+    est = PoseEstimator()
+    est.add_encoders(0.0, 0, 0)
+    est.add_camera(0.0, ((0, 0), 0))
+    est.add_camera(0.2, ((0, 0), 0))              # frame handled before the telemetry for 0.1
+    est.add_encoders(0.1, 360, 360)               # one wheel turn, late
+    wheel_turn = math.pi * dm.WHEEL_DIAMETER_MM
+    (x, y), h = est.pose_at(0.1)
+    assert _close(x, wheel_turn) and _close(y, 0) and _close(h, 0)
+    (x, _), _ = est.pose_at(0.2)
+    assert _close(x, wheel_turn)                  # the later track moved with it
+    est.add_encoders(0.05, 180, 180)              # overtaken by the 0.1 sample: ignored
+    est.add_encoders(0.3, 720, 720)
+    (x, _), _ = est.pose_at(0.3)
+    assert _close(x, 2 * wheel_turn)
+
+
+def test_heading_fix_rotates_subsequent_motion():
+    est = PoseEstimator(heading_gain=1.0, position_gain=1.0)
+    est.add_encoders(0.0, 0, 0)
+    est.add_camera(0.0, ((0, 0), 0))
+    est.add_encoders(1.0, 100 * DEG_PER_MM, 100 * DEG_PER_MM)
+    est.add_camera(0.0, ((0, 0), 90))
+    (x, y), h = est.pose_at(1.0)
+    assert _close(x, 0) and _close(y, 100) and _close(h, 90)
+
+
+def test_outliers_are_rejected_then_force_reset():
+    est = PoseEstimator(max_jump=50, max_rejections=3)
+    est.add_encoders(0.0, 0, 0)
+    est.add_camera(0.0, ((0, 0), 0))
+    est.add_encoders(0.1, 0, 0)
+    assert not est.add_camera(0.1, ((500, 0), 0))
+    assert not est.add_camera(0.1, ((500, 0), 0))
+    assert est.add_camera(0.1, ((500, 0), 0))
+    assert est.pose_at(0.1) == ((500, 0), 0)
+
+
+def test_extrapolation_is_bounded():
+    est = PoseEstimator(max_extrapolate_s=0.2)
+    est.add_encoders(0.0, 0, 0)
+    est.add_camera(0.0, ((0, 0), 0))
+    est.add_encoders(0.1, 10 * DEG_PER_MM, 10 * DEG_PER_MM)
+    (x, _), _ = est.pose_at(0.2)
+    assert _close(x, 20)
+    (x, _), _ = est.pose_at(5.0)
+    assert _close(x, 30)
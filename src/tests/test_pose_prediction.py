@@ -0,0 +1,69 @@
+import sys
+sys.path.append("src")
+
+import pytest
+
+from Movement import drive_model as dm
+from Movement.frame_navigator import FrameNavigator
+from Movement.pose_prediction import PosePredictor
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+from ImageRecognition.track_robot import reset_tracker
+
+
+def test_commanded_motion_is_applied_from_the_frame_time():
+    p = PosePredictor(latency_s=0.0)
+    p.observe(0.0, ((100, 100), 0.0))
+    p.command_sent(0.0, "turn_right_deg(90)\ndrive_straight_mm(100)\n")
+    turn, drive = dm.turn_time_s(90), dm.drive_time_s(100)
+    (x, y), h = p.predict(turn / 2)
+    assert (x, y) == (100, 100) and h == pytest.approx(45)
+    (x, y), h = p.predict(turn + drive / 2)
+    assert (x, y) == pytest.approx((100, 150)) and h == pytest.approx(90)
+    (x, y), h = p.predict(10.0)                      # plan over: held, not extrapolated
+    assert (x, y) == pytest.approx((100, 200))
+
+    # A frame taken half way through the drive only gets the other half added.
+    p.observe(turn + drive / 2, ((100, 150), 90.0))
+    (x, y), _ = p.predict(10.0)
+    assert (x, y) == pytest.approx((100, 200))
+
+
+def test_velocity_extrapolation_without_commands():
+    p = PosePredictor(max_horizon_s=0.2)
+    for i in range(5):
+        p.observe(i * 0.1, ((100 + 10 * i, 200), 350.0 + 5 * i))
+    vx, vy, w = p.velocity()
+    assert (vx, vy, w) == pytest.approx((100, 0, 50))
+    (x, y), h = p.predict(0.5)
+    assert (x, y) == pytest.approx((150, 200)) and h == pytest.approx(15)
+    (x, y), _ = p.predict(5.0)                       # capped at max_horizon_s
+    assert x == pytest.approx(160)
+
+
+def test_latency_is_learnt_from_completions():
+    p = PosePredictor(latency_s=0.0, latency_gain=1.0)
+    p.observe(0.0, ((0, 0), 0.0))
+    p.command_sent(1.0, "drive_straight_mm(100)\n")
+    p.command_done(1.0 + 0.25 + dm.drive_time_s(100))
+    assert p.lead_s == pytest.approx(0.25)
+
+
+def _run(start, ball, predictor):
+    reset_tracker()
+    sim = SimulatedEV3(pose=start, balls=[ball])
+    cam = SimulatedCamera(sim, max_frames=150, buffered_frames=1)   # frames one read behind
+    nav = FrameNavigator([ball], capture=cam, send=sim.send_and_receive,
+                         predictor=predictor, clock=lambda: sim.clock,
+                         frame_clock=cam.frame_time)
+    nav.run()
+    return sim, nav
+
+
+@pytest.mark.parametrize("start, ball", [((300, 300, 40), (700, 300)),
+                                         ((300, 300, -60), (700, 500))])
+def test_prediction_saves_corrections_with_stale_frames(start, ball):
+    sim, nav = _run(start, ball, PosePredictor())
+    assert sim.captured == [ball]
+    stale_sim, stale_nav = _run(start, ball, None)
+    assert nav.commands_sent < stale_nav.commands_sent
+    assert sim.clock < stale_sim.clock
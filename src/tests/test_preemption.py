@@ -0,0 +1,85 @@
+import sys
+sys.path.append("src")
+import math
+import time
+
+import pytest
+
+from Movement import drive_model as dm
+from Movement import wire
+from Movement.AutonomousClient import Ev3Session
+from Movement.ev3_standin import Ev3StandIn
+
+
+def _session(brick):
+    return Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+
+
+def _wait_started(ticket, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while ticket.status != "started":
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_abort_stops_running_motion_part_way():
+    with Ev3StandIn(telemetry=False) as brick:
+        session = _session(brick)
+        ticket = session.submit("drive_straight_mm(1000)\n")
+        _wait_started(ticket)
+        time.sleep(0.3)
+        assert session.abort() == (0, True)
+        assert ticket.wait(timeout=1) == "cancelled"
+        assert session.abort() == (0, False)              # nothing running any more
+        session.close()
+    travelled = brick.sim.x - 200
+    assert 0 < travelled < 1000
+    assert travelled == pytest.approx(brick.sim.history[-1].args[0])
+    assert brick.sim.wheel_deg[0] == pytest.approx(travelled * 360 / (math.pi * dm.WHEEL_DIAMETER_MM))
+
+
+def test_replace_cancels_queued_and_running_commands():
+    with Ev3StandIn(telemetry=False) as brick:
+        session = _session(brick)
+        old = [session.submit("drive_straight_mm(800)\n") for _ in range(3)]
+        _wait_started(old[0])
+        new = session.replace("turn_right_deg(90)\n")
+        assert [t.wait(timeout=1) for t in old] == ["cancelled"] * 3
+        assert new.wait(timeout=2) == "done"
+        session.close()
+    assert round(brick.sim.heading) == 90
+    assert 200 < brick.sim.x < 1000
+    assert [c.kind for c in brick.received_commands] == ["enqueue"] * 3 + ["replace"]
+
+
+def test_replace_without_abort_keeps_current_command():
+    with Ev3StandIn(time_scale=0.2, telemetry=False) as brick:
+        session = _session(brick)
+        first = session.submit("drive_straight_mm(100)\n")
+        queued = session.submit("drive_straight_mm(100)\n")
+        _wait_started(first)
+        new = session.replace("turn_right_deg(90)\n", abort_current=False)
+        assert [first.wait(timeout=2), queued.wait(timeout=2), new.wait(timeout=2)] == \
+            ["done", "cancelled", "done"]
+        session.close()
+    assert brick.sim.x == pytest.approx(300)
+
+
+def test_priority_stop_bypasses_the_queue():
+    with Ev3StandIn(telemetry=False) as brick:
+        session = _session(brick)
+        tickets = [session.submit("drive_straight_mm(1000)\n") for _ in range(2)]
+        _wait_started(tickets[0])
+        t0 = time.monotonic()
+        assert session.stop().startswith("Command executed successfully.")
+        assert time.monotonic() - t0 < 0.2
+        assert tickets[0].wait(timeout=1) == "cancelled"
+        cancelled, aborted = session.abort(clear_queue=True)   # the second may have started
+        assert cancelled + aborted == 1
+        assert tickets[1].wait(timeout=1) == "cancelled"
+        reply = session._request(wire.MSG_PRIORITY,
+                                 wire.encode_commands([("open_gate", ())]), None)
+        assert "not a priority command" in reply
+        session.close()
+    assert not brick.sim.gate_open
+    assert [c.kind for c in brick.received_commands][-1] == "priority"
@@ -0,0 +1,64 @@
+import sys
+sys.path.append("src")
+import math
+
+import pytest
+
+from PathFinding.PurePursuit import PurePursuit
+from Movement.CommandLoop import follow_path
+from Movement.frame_navigator import FrameNavigator
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+from ImageRecognition.track_robot import reset_tracker
+
+WAYPOINTS = [(600, 300), (700, 800), (300, 1200)]
+
+
+def test_steers_towards_the_path_and_tracks_progress():
+    pursuit = PurePursuit([(1000, 0)], start=(0, 0), lookahead_mm=100, lookahead_gain_s=1.0)
+    step = pursuit.update(((0, 0), 0.0))
+    assert step.curvature == pytest.approx(0) and step.remaining_mm == pytest.approx(1000)
+    step = pursuit.update(((200, -20), 0.0))             # left of the path: curve right
+    assert step.curvature > 0 and step.cross_track_mm == pytest.approx(20)
+    assert step.progress_mm == pytest.approx(200)
+    assert pursuit.next_script(((200, -20), 0.0)).startswith("arc_right_mm(")
+    pursuit.update(((100, 0), 0.0))                      # progress never goes back
+    assert pursuit.progress_mm == pytest.approx(200)
+    assert pursuit.lookahead(200) == 300 and pursuit.lookahead(1000) == pursuit.max_lookahead_mm
+    assert pursuit.next_script(((990, 5), 0.0)) == "" and pursuit.done
+
+
+def test_self_crossing_path_is_not_cut_short():
+    loop = [(500, 0), (500, 500), (250, 500), (250, -300)]   # crosses its first leg
+    pursuit = PurePursuit(loop, start=(0, 0))
+    pursuit.update(((250, 0), 0.0))                      # on both the first and last leg
+    assert pursuit.progress_mm == pytest.approx(250)
+    assert not pursuit.done
+
+
+def test_facing_away_turns_in_place_first():
+    pursuit = PurePursuit([(0, 500)], start=(0, 0))
+    assert pursuit.arc_command(((0, 0), 180.0)) == ("turn", pytest.approx(-90), 0.0)
+    assert pursuit.body_velocity(((0, 0), 180.0), 150) == (0.0, -180.0)
+
+
+def test_open_loop_script_reaches_the_end():
+    sim = SimulatedEV3(pose=(300, 300, 30))
+    script = follow_path((300, 300), WAYPOINTS, 30)
+    assert script.startswith("drive_path(")
+    sim.execute(script)
+    (x, y), _ = sim.pose
+    assert math.hypot(x - 300, y - 1200) < 30 and sim.collisions == 0
+
+
+@pytest.mark.parametrize("mode", ["step", "stream"])
+def test_navigator_follows_waypoints_in_simulation(mode):
+    reset_tracker()
+    sim = SimulatedEV3(pose=(300, 300, 30))
+    nav = FrameNavigator([], capture=SimulatedCamera(sim, max_frames=1000),
+                         send=sim.send_and_receive, mode=mode, drive=sim.set_wheel_speeds)
+    assert nav.follow_path(WAYPOINTS)
+    (x, y), _ = sim.pose
+    assert math.hypot(x - 300, y - 1200) < 40
+    assert sim.collisions == 0
+    if mode == "step":
+        assert nav.commands_sent < 20
@@ -0,0 +1,110 @@
+import sys
+sys.path.append("src")
+import math
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from ImageRecognition.Homography import save_homography
+from ImageRecognition.Rectification import (build_rectification, load_rectification,
+                                            save_lens)
+from ImageRecognition.track_robot import get_robot_pose, reset_tracker
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+
+ARENA = np.float32([[0, 0], [1200, 0], [1200, 1800], [0, 1800]])
+VIEW = np.float32([[120, 80], [760, 110], [820, 1120], [60, 1090]])
+CAMERA = (900, 1200)
+K = np.array([[700.0, 0, 450], [0, 700.0, 600], [0, 0, 1]])
+DIST = np.array([-0.22, 0.06, 0, 0, 0])               # barrel, like the phone's wide lens
+ROBOT = (230.0, 260.0, 35.0)                          # near a corner, where the lens bends most
+
+
+def _to_raw(arena_points, dist):
+    """Where arena points land in the raw frame."""
+    ideal = cv2.perspectiveTransform(np.float32(arena_points).reshape(-1, 1, 2),
+                                     cv2.getPerspectiveTransform(ARENA, VIEW))
+    rays = np.hstack([cv2.perspectiveTransform(ideal, np.linalg.inv(K)).reshape(-1, 2),
+                      np.ones((len(ideal), 1))])
+    raw, _ = cv2.projectPoints(rays, np.zeros(3), np.zeros(3), K, dist)
+    return raw.reshape(-1, 2).astype(np.float32)
+
+
+def _raw_frame(dist):
+    """A camera frame of the arena through *dist*, and the H clicked on it."""
+    frame = SimulatedCamera(SimulatedEV3(pose=ROBOT)).render()
+    P = cv2.getPerspectiveTransform(ARENA, VIEW)
+    ideal = cv2.warpPerspective(frame, P, CAMERA)
+    # Each raw pixel shows what the ideal pinhole camera sees at its undistorted position.
+    ys, xs = np.mgrid[0:CAMERA[1], 0:CAMERA[0]].astype(np.float32)
+    raw_px = np.stack([xs, ys], -1).reshape(-1, 1, 2)
+    src = cv2.undistortPoints(raw_px, K, dist, P=K).reshape(CAMERA[1], CAMERA[0], 2)
+    raw = cv2.remap(ideal, src, None, cv2.INTER_LINEAR)
+    return raw, cv2.getPerspectiveTransform(_to_raw(ARENA, dist), ARENA)
+
+
+def _pose_error(arena_img):
+    reset_tracker()
+    (x, y), heading = get_robot_pose(arena_img)
+    return math.hypot(x - ROBOT[0], y - ROBOT[1]), abs((heading - ROBOT[2] + 180) % 360 - 180)
+
+
+def _files(tmp_path, H, dist=None):
+    h_file = tmp_path / "homography.npy"
+    save_homography(H, h_file, CAMERA)
+    if dist is None:
+        return h_file, None
+    lens_file = tmp_path / "lens.npz"
+    save_lens(lens_file, K, dist, CAMERA)
+    return h_file, lens_file
+
+
+def test_without_lens_it_is_the_plain_warp(tmp_path):
+    raw, H = _raw_frame(np.zeros(5))
+    rect = build_rectification(_files(tmp_path, H)[0], CAMERA)
+    warped = cv2.warpPerspective(raw, H, (1200, 1800))
+    diff = np.abs(rect.apply(raw).astype(int) - warped.astype(int))
+    assert diff.mean() < 0.5
+
+
+def test_one_remap_undoes_the_lens(tmp_path):
+    raw, H = _raw_frame(DIST)
+    h_file, lens_file = _files(tmp_path, H, DIST)
+    rect = build_rectification(h_file, CAMERA, lens_file)
+    pos_err, heading_err = _pose_error(rect.apply(raw))
+    assert pos_err < 3.0 and heading_err < 1.5
+    plain_err, _ = _pose_error(cv2.warpPerspective(raw, H, (1200, 1800)))
+    assert plain_err > 10.0                           # what the clicked H alone gives
+    # Points take the same route as pixels.
+    probes = [(150, 200), (600, 900), (1100, 1700)]
+    assert np.abs(rect.transform_points(_to_raw(probes, DIST)) - probes).max() < 1.0
+
+
+def test_cache_is_memory_mapped_and_keyed(tmp_path):
+    raw, H = _raw_frame(DIST)
+    h_file, lens_file = _files(tmp_path, H, DIST)
+    built = build_rectification(h_file, CAMERA, lens_file)
+    t0 = time.perf_counter()
+    rect = load_rectification(h_file, CAMERA, lens_file)
+    assert time.perf_counter() - t0 < 0.05
+    assert isinstance(rect.map1, np.memmap)
+    assert np.array_equal(rect.apply(raw), built.apply(raw))
+    out = np.empty((1800, 1200, 3), np.uint8)
+    assert rect.apply(raw, out) is out
+    assert load_rectification(h_file, (1280, 720), lens_file) is None      # other resolution
+    save_homography(H * 1.0001, h_file, CAMERA)                            # re-clicked
+    assert load_rectification(h_file, CAMERA, lens_file) is None
+
+
+def test_calibration_resolution_is_scaled_or_refused(tmp_path):
+    raw, H = _raw_frame(DIST)
+    h_file, lens_file = _files(tmp_path, H, DIST)
+    half = (CAMERA[0] // 2, CAMERA[1] // 2)
+    rect = build_rectification(h_file, half, lens_file)
+    probes = [(150, 200), (600, 900), (1100, 1700)]
+    assert np.abs(rect.transform_points(_to_raw(probes, DIST) / 2) - probes).max() < 1.5
+    pos_err, _ = _pose_error(rect.apply(cv2.resize(raw, half, interpolation=cv2.INTER_AREA)))
+    assert pos_err < 4.0
+    with pytest.raises(ValueError):
+        build_rectification(h_file, (1280, 720), lens_file)                # a crop, not a scaling
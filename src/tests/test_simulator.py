@@ -0,0 +1,58 @@
+import sys
+sys.path.append("src")
+import pytest
+
+from Movement.simulator import SimulatedEV3, SimulatedCamera, NoiseModel
+from Movement.frame_navigator import FrameNavigator
+from Movement import drive_model as dm
+from ImageRecognition.track_robot import get_robot_pose, reset_tracker
+
+
+def test_script_moves_robot_and_advances_clock():
+    sim = SimulatedEV3(pose=(100, 100, 0))
+    reply = sim.send_and_receive("turn_right_deg(90)\ndrive_straight_mm(200)\n")
+    assert reply.startswith("Command executed successfully.")
+    (x, y), heading = sim.pose
+    assert heading == pytest.approx(90)
+    assert (x, y) == pytest.approx((100, 300))
+    assert sim.clock == pytest.approx(dm.turn_time_s(90) + dm.drive_time_s(200))
+
+
+def test_unknown_command_reports_execution_error():
+    sim = SimulatedEV3()
+    assert sim.send_and_receive("self_destruct()\n").startswith("Execution error:")
+
+
+def test_gate_captures_ball_in_front():
+    sim = SimulatedEV3(pose=(100, 100, 0), balls=[(200, 100), (600, 600)])
+    sim.execute("open_gate()\ndrive_straight_mm(50)\nclose_gate()\n")
+    assert sim.captured == [(200, 100)]
+    assert sim.balls == [(600, 600)]
+
+
+def test_noise_is_reproducible_with_seed():
+    runs = []
+    for _ in range(2):
+        sim = SimulatedEV3(noise=NoiseModel(distance_sigma_frac=0.05, seed=3))
+        sim.execute("drive_straight_mm(300)\n")
+        runs.append(sim.x)
+    assert runs[0] == runs[1] != 500.0
+
+
+def test_rendered_frame_is_tracked():
+    reset_tracker()
+    sim = SimulatedEV3(pose=(400, 500, 30))
+    ok, frame = SimulatedCamera(sim).read()
+    assert ok
+    (cx, cy), heading = get_robot_pose(frame)
+    assert abs(cx - 400) <= 2 and abs(cy - 500) <= 2
+    assert heading == pytest.approx(30, abs=2)
+
+
+def test_closed_loop_navigation_captures_ball():
+    reset_tracker()
+    sim = SimulatedEV3(pose=(300, 300, 0), balls=[(700, 300)])
+    cam = SimulatedCamera(sim, max_frames=300)
+    FrameNavigator(list(sim.balls), capture=cam, send=sim.send_and_receive).run()
+    assert sim.captured == [(700, 300)]
+    assert sim.collisions == 0
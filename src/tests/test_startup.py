@@ -0,0 +1,24 @@
+import sys
+sys.path.append("src")
+
+import pytest
+
+from Movement.startup_time import measure
+
+
+@pytest.mark.parametrize("module", ["Movement.AutonomousClient", "Movement.CommandLoop",
+                                    "PathFinding.PointsGenerator", "PathFinding.PurePursuit"])
+def test_command_side_imports_skip_the_vision_stack(module):
+    result = measure(module, repeat=1)
+    assert result.heavy == ()
+    assert result.output == ""
+    assert result.import_s < 0.5
+
+
+@pytest.mark.parametrize("module", ["ImageRecognition.CrossDetection",
+                                    "ImageRecognition.cdio_utils",
+                                    "ImageRecognition.track_robot"])
+def test_vision_modules_import_without_side_effects(module):
+    result = measure(module, repeat=1)                    # no demo, no optional packages
+    assert result.output == ""
+    assert "matplotlib" not in result.heavy and "inference_sdk" not in result.heavy
@@ -0,0 +1,60 @@
+import sys
+sys.path.append("src")
+import socket
+import struct
+import time
+
+from Movement import wire
+from Movement.AutonomousClient import Ev3Session
+from Movement.ev3_standin import Ev3StandIn
+
+
+def _session(brick):
+    return Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+
+
+def test_crashed_processor_is_restarted_and_keeps_serving():
+    with Ev3StandIn(time_scale=0, telemetry=False) as brick:
+        session = _session(brick)
+        health = session.health()
+        assert health.ready and health.restarts == 0 and health.fault == ""
+        # SystemExit escapes the processor's error handling and ends its thread.
+        reply = session.request("raise SystemExit\n")
+        assert reply.startswith("Execution error: command_processor crashed")
+        t0 = time.monotonic()
+        assert session.request("drive_straight_mm(100)\n").startswith("Command executed")
+        assert time.monotonic() - t0 < 0.5
+        health = session.health()
+        session.close()
+    assert health.ready and health.restarts == 1
+    assert (health.completed, health.failed) == (1, 1)
+    assert "SystemExit" in health.fault
+    assert brick.sim.x == 300                             # same simulator, nothing re-made
+
+
+def test_queued_commands_survive_a_processor_crash():
+    with Ev3StandIn(time_scale=0.2, telemetry=False) as brick:
+        session = _session(brick)
+        tickets = [session.submit(s) for s in ("drive_straight_mm(100)\n", "exit()\n",
+                                               "turn_right_deg(90)\n")]
+        assert [t.wait(timeout=2) for t in tickets] == ["done", "failed", "done"]
+        assert "crashed" in tickets[1].error
+        session.close()
+    assert round(brick.sim.heading) == 90
+
+
+def test_listener_survives_a_reset_connection():
+    with Ev3StandIn(time_scale=0, telemetry=False) as brick:
+        rude = socket.create_connection(("127.0.0.1", brick.port))
+        rude.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        rude.close()                                      # RST before the protocol sniff
+        session = _session(brick)
+        assert session.request("turn_left_deg(30)\n").startswith("Command executed")
+        health = session.health()
+        session.close()
+    assert health.ready and health.restarts == 0 and health.fault == ""   # not a crash
+
+
+def test_health_payload_round_trips():
+    health = wire.Health(True, 12.5, 2, 40, 3, 1, False, "listener crashed: OSError()")
+    assert wire.unpack_health(wire.pack_health(health)) == health
@@ -0,0 +1,76 @@
+import sys
+sys.path.append("src")
+import socket
+import time
+
+import numpy as np
+
+from Movement import wire
+from Movement.telemetry import TelemetryReceiver
+
+
+def _datagram(seq, t, left=0, right=0, flags=0):
+    return wire.pack_telemetry(wire.TelemetrySample(seq, t, left, 10, right, 20, 0, 0, 0, 0, flags))
+
+
+def test_telemetry_round_trip():
+    flags = wire.motor_flags([["running"], ["running", "stalled"], [], ["holding"]])
+    sample = wire.unpack_telemetry(_datagram(7, 12.5, 100, -40, flags))
+    assert sample.seq == 7 and sample.t == 12.5
+    assert (sample.left_pos, sample.right_pos) == (100, -40)
+    assert flags == 0b1101
+
+
+def test_ring_keeps_latest_samples_in_order():
+    rx = TelemetryReceiver(capacity=8)
+    for seq in range(20):
+        assert rx.feed(_datagram(seq, seq * 0.05, left=seq), arrival=seq * 0.05 + 0.01)
+    assert len(rx) == 8
+    data = rx.samples()
+    assert list(data["seq"]) == list(range(12, 20))
+    assert rx.latest().left_pos == 19
+    assert list(rx.samples(since=0.8, until=0.9)["seq"]) == [16, 17, 18]
+    assert abs(rx.clock_offset - 0.01) < 1e-9
+
+
+def test_gaps_duplicates_and_garbage_are_counted():
+    rx = TelemetryReceiver()
+    rx.feed(_datagram(1, 0.0))
+    rx.feed(_datagram(4, 0.15))
+    assert not rx.feed(_datagram(3, 0.1))
+    assert not rx.feed(b"junk")
+    assert (rx.received, rx.lost, rx.rejected) == (2, 2, 2)
+
+
+def test_publisher_restart_starts_a_new_stream():
+    rx = TelemetryReceiver()
+    assert rx.feed(_datagram(500, 25.0)) and rx.feed(_datagram(501, 25.05))
+    assert all(rx.feed(_datagram(seq, 26.0 + seq * 0.05)) for seq in range(3))   # restarted
+    assert not rx.feed(_datagram(1, 26.05))                                        # duplicate
+    assert not rx.feed(_datagram(501, 25.05))                                      # late, old stream
+    assert (rx.received, rx.lost, rx.restarts) == (5, 0, 1)
+    assert list(rx.samples()["seq"]) == [500, 501, 0, 1, 2]
+
+
+def test_wheel_positions_are_interpolated():
+    rx = TelemetryReceiver()
+    assert rx.wheel_positions_at(0.0) is None
+    rx.feed(_datagram(0, 1.0, left=0, right=0))
+    rx.feed(_datagram(1, 1.1, left=36, right=-36))
+    left, right = rx.wheel_positions_at(1.05)
+    assert np.isclose(left, 18) and np.isclose(right, -18)
+    assert rx.wheel_positions_at(5.0) == (36.0, -36.0)
+
+
+def test_receiver_listens_on_udp():
+    with TelemetryReceiver(port=0, host="127.0.0.1") as rx:
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        flags = wire.motor_flags([[], [], ["running"], []])
+        tx.sendto(_datagram(0, time.time(), flags=flags), ("127.0.0.1", rx.port))
+        deadline = time.time() + 2
+        while rx.latest() is None and time.time() < deadline:
+            time.sleep(0.01)
+        tx.close()
+        assert rx.motor_state("gate") == (True, False)
+        assert rx.motor_state("left") == (False, False)
+    assert not rx.running
@@ -0,0 +1,154 @@
+import sys
+sys.path.append("src")
+import socket
+import time
+
+import pytest
+
+from ImageRecognition.track_robot import reset_tracker
+from Movement import drive_model as dm
+from Movement import wire
+from Movement.ev3_standin import Ev3StandIn
+from Movement.frame_navigator import FrameNavigator, calculate_wheel_speeds
+from Movement.simulator import SimulatedEV3, SimulatedCamera
+from Movement.velocity_stream import VelocityStreamer
+
+
+def test_velocity_datagram_round_trip():
+    data = wire.pack_velocity(5, 120.5, -80.0, 250)
+    assert wire.unpack_velocity(data) == (5, 120.5, -80.0, 250)
+    with pytest.raises(wire.ProtocolError):
+        wire.unpack_velocity(data[:-1])
+
+
+def test_wheel_speeds_for_turn_rate():
+    left, right = dm.wheel_speeds_dps(0, 90)
+    assert left == pytest.approx(-right) and left > 0
+    sim = SimulatedEV3(pose=(500, 500, 0))
+    sim.set_wheel_speeds(left, right)
+    sim.advance(0.4)
+    assert sim.heading == pytest.approx(36, abs=0.5)
+    assert sim.pose[0] == pytest.approx((500, 500))
+
+
+def test_simulator_watchdog_stops_the_robot():
+    sim = SimulatedEV3(pose=(500, 500, 0))
+    sim.set_wheel_speeds(*dm.wheel_speeds_dps(100, 0))
+    sim.advance(2.0)
+    assert sim.wheel_speed_dps == (0.0, 0.0)
+    assert sim.x == pytest.approx(500 + 100 * sim.stream_timeout_s, abs=2)
+
+
+def test_steering_law():
+    assert calculate_wheel_speeds((0, 0), 0, (50, 0)) == "capture"
+    left, right = calculate_wheel_speeds((0, 0), 0, (500, 100))
+    assert left > right > 0                       # target to the right (+y), keep driving
+    left, right = calculate_wheel_speeds((0, 0), 0, (-500, 1))
+    assert left == pytest.approx(-right)          # behind: turn in place
+
+
+def test_stream_navigation_captures_faster_than_stepping():
+    clocks = {}
+    for mode in ("step", "stream"):
+        reset_tracker()
+        sim = SimulatedEV3(pose=(300, 300, 0), balls=[(700, 500)])
+        cam = SimulatedCamera(sim, max_frames=600)
+        nav = FrameNavigator(list(sim.balls), capture=cam, send=sim.send_and_receive,
+                             mode=mode, drive=sim.set_wheel_speeds)
+        nav.run()
+        assert sim.captured == [(700, 500)], mode
+        clocks[mode] = sim.clock
+    assert clocks["stream"] < clocks["step"]
+
+
+def test_streamer_drives_standin_and_watchdog_stops_it():
+    with Ev3StandIn(telemetry=False) as brick:
+        brick.sim.x, brick.sim.y, brick.sim.heading = 500.0, 500.0, 0.0
+        streamer = VelocityStreamer("127.0.0.1", brick.velocity_port, rate_hz=50, hold_s=0.3)
+        with streamer:
+            streamer.set_body(100, 0)
+            time.sleep(0.3)
+            brick.sync()
+            assert brick.sim.wheel_speed_dps != (0.0, 0.0)
+            time.sleep(0.8)                       # set() not called again: stream goes quiet
+            brick.sync()
+            assert brick.sim.wheel_speed_dps == (0.0, 0.0)
+        assert streamer.sent > 5
+    assert 520 < brick.sim.x < 600
+
+
+def _session(brick):
+    from Movement.AutonomousClient import Ev3Session
+    return Ev3Session("127.0.0.1", brick.port, keepalive_s=None)
+
+
+def test_standin_stop_cuts_a_running_drive():
+    with Ev3StandIn(telemetry=False) as brick:
+        brick.sim.x, brick.sim.y, brick.sim.heading = 500.0, 500.0, 0.0
+        session = _session(brick)
+        ticket = session.submit("drive_straight_mm(1000)\n")
+        time.sleep(0.4)
+        brick.velocity_stop()                     # what the watchdog does on the brick
+        assert ticket.wait(timeout=2) == "done"   # _wait_motion just sees stopped motors
+        session.close()
+    assert 0 < brick.sim.history[-1].args[0] < 1000
+
+
+def test_stopped_stream_leaves_a_queued_drive_alone():
+    with Ev3StandIn(telemetry=False) as brick:
+        brick.sim.x, brick.sim.y, brick.sim.heading = 500.0, 500.0, 0.0
+        session = _session(brick)
+        with VelocityStreamer("127.0.0.1", brick.velocity_port, rate_hz=50,
+                              ttl_s=0.1, hold_s=0.5) as streamer:
+            streamer.set_body(100, 0)
+            time.sleep(0.2)
+            streamer.set(0, 0)                    # zero repeats keep coming for hold_s
+            time.sleep(0.05)
+            brick.sync()
+            start = brick.sim.x
+            assert session.request("drive_straight_mm(150)\n").startswith("Command executed")
+        session.close()
+    assert brick.sim.x - start == pytest.approx(150, abs=1)
+
+
+def test_watchdog_leaves_a_queued_drive_alone():
+    with Ev3StandIn(telemetry=False) as brick:
+        session = _session(brick)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+            # One setpoint and no repeats: its 100 ms ttl runs out mid-drive.
+            udp.sendto(wire.pack_velocity(1, 200, 200, 100), ("127.0.0.1", brick.velocity_port))
+            time.sleep(0.02)
+            ticket = session.submit("drive_straight_mm(150)\n")
+            assert ticket.wait(timeout=3) == "done"
+        session.close()
+    drives = [c for c in brick.sim.history if c.name == "drive_straight_mm"]
+    assert drives[-1].args[0] == 150
+
+
+def test_halt_stops_the_repeats():
+    with Ev3StandIn(telemetry=False) as brick:
+        with VelocityStreamer("127.0.0.1", brick.velocity_port, rate_hz=50) as streamer:
+            streamer.set_body(100, 0)
+            streamer.halt()
+            sent = streamer.sent
+            time.sleep(0.2)
+            assert streamer.sent == sent
+            brick.sync()
+            assert brick.sim.wheel_speed_dps == (0.0, 0.0)
+
+
+def test_setpoints_during_a_queued_drive_are_ignored():
+    with Ev3StandIn(telemetry=False) as brick:
+        session = _session(brick)
+        ticket = session.submit("drive_straight_mm(150)\n")
+        while ticket.status != "started":
+            time.sleep(0.005)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+            udp.sendto(wire.pack_velocity(1, 300, -300, 250), ("127.0.0.1", brick.velocity_port))
+            time.sleep(0.05)
+            brick.sync()
+            assert brick.sim.wheel_speed_dps == (0.0, 0.0)    # not spinning on the spot
+        assert ticket.wait(timeout=3) == "done"
+        session.close()
+    drives = [c for c in brick.sim.history if c.name == "drive_straight_mm"]
+    assert drives[-1].args[0] == 150